@@ -0,0 +1,300 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Dict, FrozenSet, Iterable, Optional
+
+from .metrics import ADMISSION, ADMISSION_WAIT_SECONDS, count, observe
+
+logger = logging.getLogger(__name__)
+
+# Corpo sem Content-Length (chunked) é contado como o maior upload aceito
+DEFAULT_REQUEST_BYTES = 4 * 1024 * 1024
+# Métodos que passam direto: /health, /stats, /metrics e GET /jobs/{id} são baratos
+EXEMPT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class Overloaded(RuntimeError):
+    """Sem vaga dentro do tempo de espera (ou fila de espera cheia): o app responde 503."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+
+
+class AdmissionController:
+    """
+    Controle de admissão por requisição, antes de ler o corpo.
+
+    - Limite por cliente (X-API-Key de ``api_keys`` ou IP): token bucket de
+      ``rate`` req/s com rajada de ``burst``; acima dele, 429 com Retry-After
+      (``rate`` 0 desliga). Chave fora de ``api_keys`` não conta: quem troca de
+      chave a cada requisição continua no balde do próprio IP.
+    - Limite global: no máximo ``max_in_flight`` requisições e ``max_bytes``
+      de corpo (Content-Length) em processamento. Quem passa disso espera numa
+      fila FIFO de até ``max_queue`` posições por até ``queue_timeout`` s;
+      fila cheia ou espera esgotada vira 503 com Retry-After.
+    - Streams (``stream_paths``, conexões longas como /classify-stream) não
+      ocupam vaga nem orçamento de bytes: contam num limite próprio de
+      ``max_streams`` conexões abertas, e cada registro lido gasta um token
+      do cliente (``pace``), então o stream não fura o limite por cliente.
+    """
+
+    def __init__(self, max_in_flight: int = 64, max_bytes: int = 64 * 1024 * 1024,
+                 max_queue: int = 128, queue_timeout: float = 2.0, rate: float = 0.0,
+                 burst: Optional[float] = None, max_clients: int = 10000,
+                 api_keys: Iterable[str] = (), max_streams: int = 16,
+                 stream_paths: Iterable[str] = ("/classify-stream",)):
+        self.max_in_flight = max_in_flight
+        self.max_bytes = max_bytes
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate * 2)
+        self.max_clients = max_clients
+        self.api_keys = frozenset(api_keys)
+        self.max_streams = max_streams
+        self.stream_paths = tuple(stream_paths)
+        self.streams = 0
+        self.in_flight = 0
+        self.bytes_in_flight = 0
+        self._waiters: deque = deque()  # (future, nbytes)
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"rate_limited": 0, "queue_full": 0, "timeout": 0, "streams": 0}
+        self.paced = 0  # registros de stream que esperaram token
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """
+        ADMISSION_MAX_INFLIGHT, ADMISSION_MAX_MB, ADMISSION_QUEUE, ADMISSION_QUEUE_TIMEOUT (s),
+        ADMISSION_MAX_STREAMS (conexões de stream abertas),
+        RATE_LIMIT_RPS (por cliente; 0 desliga), RATE_LIMIT_BURST e API_KEYS (chaves
+        X-API-Key com balde próprio, separadas por vírgula; as demais contam pelo IP).
+        """
+        burst = os.getenv("RATE_LIMIT_BURST")
+        return cls(
+            max_in_flight=int(os.getenv("ADMISSION_MAX_INFLIGHT", "64")),
+            max_bytes=int(float(os.getenv("ADMISSION_MAX_MB", "64")) * 1024 * 1024),
+            max_queue=int(os.getenv("ADMISSION_QUEUE", "128")),
+            queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2")),
+            rate=float(os.getenv("RATE_LIMIT_RPS", "0")),
+            burst=float(burst) if burst else None,
+            api_keys=(k.strip() for k in os.getenv("API_KEYS", "").split(",") if k.strip()),
+            max_streams=int(os.getenv("ADMISSION_MAX_STREAMS", "16")),
+        )
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    # --- limite por cliente ---
+
+    def check_rate(self, client: str, now: Optional[float] = None) -> float:
+        """Consome um token de ``client``; devolve 0 se passou ou os segundos até o próximo token."""
+        wait = self._consume(client, now)
+        if wait:
+            self.rejected["rate_limited"] += 1
+            count(ADMISSION, "rate_limited")
+        return wait
+
+    async def pace(self, client: str):
+        """Espera o token de ``client`` em vez de recusar (um registro de stream por token)."""
+        wait = self._consume(client)
+        if wait:
+            self.paced += 1
+            count(ADMISSION, "paced")
+        while wait:
+            await asyncio.sleep(wait)
+            wait = self._consume(client)
+
+    def _consume(self, client: str, now: Optional[float] = None) -> float:
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.burst, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)  # esquece o cliente mais antigo (cheio de novo)
+        else:
+            self._buckets.move_to_end(client)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+        if bucket.tokens >= 1.0:
+            bucket.tokens -= 1.0
+            return 0.0
+        return (1.0 - bucket.tokens) / self.rate
+
+    # --- limite global ---
+
+    def _fits(self, nbytes: int) -> bool:
+        return self.in_flight < self.max_in_flight and self.bytes_in_flight + nbytes <= self.max_bytes
+
+    def _take(self, nbytes: int):
+        self.in_flight += 1
+        self.bytes_in_flight += nbytes
+
+    async def acquire(self, nbytes: int) -> int:
+        """Reserva uma vaga e ``nbytes`` do orçamento; devolve os bytes reservados (para o release)."""
+        nbytes = min(max(nbytes, 0), self.max_bytes)  # um corpo maior que o orçamento ainda passa sozinho
+        started = time.perf_counter()
+        if not self._waiters and self._fits(nbytes):
+            self._take(nbytes)
+        else:
+            if len(self._waiters) >= self.max_queue:
+                self._reject("queue_full")
+            future = asyncio.get_running_loop().create_future()
+            entry = (future, nbytes)
+            self._waiters.append(entry)
+            try:
+                await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+            except asyncio.TimeoutError:
+                if future.done():  # vaga concedida no mesmo instante do timeout
+                    self.release(nbytes)
+                else:
+                    self._waiters.remove(entry)
+                    self._wake()
+                self._reject("timeout")
+            except asyncio.CancelledError:
+                if future.done():
+                    self.release(nbytes)
+                else:
+                    self._waiters.remove(entry)
+                    self._wake()
+                raise
+        self.admitted += 1
+        count(ADMISSION, "admitted")
+        observe(ADMISSION_WAIT_SECONDS, time.perf_counter() - started)
+        return nbytes
+
+    def release(self, nbytes: int):
+        self.in_flight -= 1
+        self.bytes_in_flight -= nbytes
+        self._wake()
+
+    def _wake(self):
+        # FIFO: o primeiro da fila que não cabe segura os de trás (não passa fome)
+        while self._waiters and self._fits(self._waiters[0][1]):
+            future, nbytes = self._waiters.popleft()
+            self._take(nbytes)
+            future.set_result(None)
+
+    def _reject(self, reason: str):
+        self.rejected[reason] += 1
+        count(ADMISSION, reason)
+        raise Overloaded(reason)
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "bytes_in_flight": self.bytes_in_flight,
+            "max_bytes": self.max_bytes,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "streams": self.streams,
+            "max_streams": self.max_streams,
+            "paced": self.paced,
+            "rate_limit_rps": self.rate or None,
+            "clients": len(self._buckets),
+            "api_keys": len(self.api_keys),
+        }
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for k, v in scope.get("headers", []):
+        if k == name:
+            return v
+    return None
+
+
+def client_key(scope, trust_proxy: bool = False, api_keys: FrozenSet[str] = frozenset()) -> str:
+    """
+    Cliente para o rate limit: X-API-Key se estiver em ``api_keys``, senão o IP
+    (X-Forwarded-For atrás de proxy confiável).
+    """
+    api_key = _header(scope, b"x-api-key")
+    if api_key:
+        api_key = api_key.decode("latin-1")
+        if api_key in api_keys:
+            return "key:" + api_key
+    if trust_proxy:
+        forwarded = _header(scope, b"x-forwarded-for")
+        if forwarded:
+            return "ip:" + forwarded.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "?")
+
+
+def _request_bytes(scope) -> int:
+    length = _header(scope, b"content-length")
+    try:
+        return int(length) if length is not None else DEFAULT_REQUEST_BYTES
+    except ValueError:
+        return DEFAULT_REQUEST_BYTES
+
+
+async def _reject(send, status: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI: aplica o AdmissionController antes de o app ler o corpo."""
+
+    def __init__(self, app, controller: AdmissionController, trust_proxy: bool = False):
+        self.app = app
+        self.controller = controller
+        self.trust_proxy = trust_proxy
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in EXEMPT_METHODS:
+            return await self.app(scope, receive, send)
+        ctl = self.controller
+        client = client_key(scope, self.trust_proxy, ctl.api_keys)
+        wait = ctl.check_rate(client)
+        if wait:
+            return await _reject(send, 429, "Muitas requisições, aguarde antes de tentar de novo.", wait)
+        # o app lê request.state.client_key para cobrar os registros de um stream
+        scope.setdefault("state", {})["client_key"] = client
+        if scope["path"].endswith(ctl.stream_paths):
+            if ctl.streams >= ctl.max_streams:
+                ctl.rejected["streams"] += 1
+                count(ADMISSION, "streams")
+                return await _reject(send, 503, "Muitos streams abertos, tente novamente em instantes.", 5)
+            ctl.streams += 1
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                ctl.streams -= 1
+        try:
+            reserved = await ctl.acquire(_request_bytes(scope))
+        except Overloaded:
+            return await _reject(send, 503, "Servidor ocupado, tente novamente em instantes.", 1)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ctl.release(reserved)
+
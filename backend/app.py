@@ -1,13 +1,22 @@
 # trechos essenciais do backend/app.py
 from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Form
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from pathlib import Path
-import inspect, logging
-from typing import Optional
+import asyncio, inspect, json, logging, os
+from typing import List, Optional
 from .email_classifier import EmailClassifier
-from .utils import preprocess_text, extract_text_from_file
+from .utils import analyze_text, preprocess_text, extract_text_with_info
+from .extractors import EXTRACTION_CACHE
+from .workers import BoundedExecutor, PoolSaturated
+from .jobs import PRIORITIES, Job, JobQueue, JobQueueFull
+from .responses import RESPONSES
+from .admission import AdmissionController, AdmissionMiddleware
+from .streaming import NDJSONResponse, StreamClassifier
+from .metrics import REGISTRY, REQUEST_BYTES, ServerTimingMiddleware, gauge, observe, stage
 
 logger = logging.getLogger(__name__)
 app = FastAPI(title="Email Classifier API", version="1.0.0")
@@ -19,49 +28,223 @@ try:
 except Exception:
     pass
 
+# Admissão: limite global de requisições/bytes em processamento e rate limit por cliente
+# (ADMISSION_*, RATE_LIMIT_RPS/RATE_LIMIT_BURST, API_KEYS; ADMISSION_TRUST_PROXY=1 usa X-Forwarded-For).
+# /classify-stream fica fora da vaga/orçamento de bytes: ADMISSION_MAX_STREAMS e um token por registro
+admission = AdmissionController.from_env()
+app.add_middleware(
+    AdmissionMiddleware, controller=admission,
+    trust_proxy=os.getenv("ADMISSION_TRUST_PROXY", "0") == "1",
+)
+# CORS_ORIGINS: origens separadas por vírgula (padrão: qualquer uma)
+CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",") if o.strip()]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"],
+    allow_origins=CORS_ORIGINS, allow_credentials=True, allow_methods=["*"], allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
+# Server-Timing por etapa (SERVER_TIMING=1 ou header "X-Server-Timing: 1")
+app.add_middleware(ServerTimingMiddleware)
 
 classifier = EmailClassifier()
+# Extração de anexos (PDF, DOCX, EML, HTML, CSV, TXT) fora do event loop (EXTRACT_POOL/EXTRACT_WORKERS/EXTRACT_QUEUE)
+extract_pool = BoundedExecutor.from_env("EXTRACT", workers=2, queue=8)
+
+def _runtime_gauges():
+    """Gauges lidos na hora do scrape do /metrics (pools, cache, micro-batcher)."""
+    pools = {f'{{pool="{name}"}}': pool.stats() for name, pool in (
+        ("inference", classifier.executor), ("extract", extract_pool)
+    )}
+    lines = gauge("classifier_pool_in_flight", "Tarefas em execução ou na fila do pool.",
+                  {labels: st["in_flight"] for labels, st in pools.items()})
+    lines += gauge("classifier_pool_rejected", "Tarefas recusadas por pool lotado (503).",
+                   {labels: st["rejected"] for labels, st in pools.items()})
+    if classifier.cache is not None:
+        st = classifier.cache.stats()
+        lines += gauge("classifier_cache_entries", "Entradas no cache de resultados.", {"": st["entries"]})
+        lines += gauge("classifier_cache_hit_rate", "Taxa de acerto do cache de resultados.", {"": st["hit_rate"]})
+    if classifier.batcher is not None:
+        st = classifier.batcher.stats()
+        lines += gauge("classifier_microbatch_avg_size", "Tamanho médio dos lotes do micro-batcher.", {"": st["avg_batch_size"]})
+        lines += gauge("classifier_microbatch_queued", "Pedidos aguardando o próximo lote.", {"": st["queued"]})
+    lines += gauge("classifier_job_queue_depth", "Jobs aguardando na fila.", {"": job_queue.depth})
+    lines += gauge("classifier_jobs_running", "Jobs em processamento.", {"": job_queue.running})
+    lines += gauge("classifier_admission_in_flight", "Requisições admitidas em processamento.", {"": admission.in_flight})
+    lines += gauge("classifier_admission_bytes_in_flight", "Bytes de corpo das requisições em processamento.",
+                   {"": admission.bytes_in_flight})
+    lines += gauge("classifier_admission_waiting", "Requisições na fila de admissão.", {"": admission.waiting})
+    if classifier.neardup is not None:
+        st = classifier.neardup.stats()
+        lines += gauge("classifier_neardup_entries", "Impressões no índice de quase-duplicados.", {"": st["entries"]})
+        lines += gauge("classifier_neardup_clusters", "Clusters de e-mails parecidos no índice.", {"": st["clusters"]})
+    lines += gauge("classifier_streams_open", "Conexões abertas no /classify-stream.", {"": streams.open})
+    lines += gauge("classifier_model_ready", "1 quando o modelo terminou o warm-up.", {"": 1 if classifier.model_loaded else 0})
+    return lines
+
+REGISTRY.add_collector(_runtime_gauges)
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Servidor ocupado, tente novamente em instantes."},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(JobQueueFull)
+async def job_queue_full_handler(request: Request, exc: JobQueueFull):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Fila de jobs cheia, tente novamente em instantes."},
+        headers={"Retry-After": "5"},
+    )
+
+# Intervalo (s) em que cada worker grava suas estatísticas no SQLite compartilhado
+STATS_FLUSH_SECONDS = float(os.getenv("STATS_FLUSH", "1"))
+_stats_task = None
+
+async def _publish_stats():
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(STATS_FLUSH_SECONDS)
+        try:
+            await loop.run_in_executor(None, classifier.shared_stats.publish, classifier.stats)
+        except Exception as e:
+            logger.warning(f"Falha ao publicar estatísticas: {e}")
 
 @app.on_event("startup")
 async def startup_event():
+    global _stats_task
     try:
         await classifier.initialize()
         logger.info("Models ready")
     except Exception as e:
         logger.exception(f"Startup failed: {e}")
+    job_queue.start()
+    if classifier.shared_stats is not None:
+        _stats_task = asyncio.get_running_loop().create_task(_publish_stats())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_queue.stop()
+    if _stats_task is not None:
+        _stats_task.cancel()
+        classifier.shared_stats.publish(classifier.stats)
+    classifier.executor.shutdown()
+    extract_pool.shutdown()
 
 @app.get("/health")
 async def health():
-    return {"status":"healthy","models_loaded":getattr(classifier,"is_initialized",False)}
+    # models_loaded só vira True depois do warm-up (MODEL_LOAD_MODE=background)
+    return {
+        "status": "healthy",
+        "ready": getattr(classifier, "is_initialized", False),
+        "models_loaded": getattr(classifier, "model_loaded", False),
+        "model_state": getattr(classifier, "model_state", None),
+        "model_load_seconds": getattr(classifier, "model_load_seconds", None),
+    }
 
 class ClassificationRequest(BaseModel):
     text: str
 
-async def _run_classifier(processed: str, original: str):
+class BatchClassificationRequest(BaseModel):
+    texts: List[str]
+
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "1000"))
+MAX_UPLOAD_BYTES = 4 * 1024 * 1024
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+async def _read_upload(file: UploadFile, detail: str) -> bytes:
+    """Lê o upload em blocos, recusando (413) assim que passar de MAX_UPLOAD_BYTES."""
+    size = getattr(file, "size", None)
+    if size is not None and size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=detail)
+    chunks, total = [], 0
+    with stage("upload_read"):
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail=detail)
+            chunks.append(chunk)
+    observe(REQUEST_BYTES, total, "file")
+    return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+async def _read_body(request: Request, detail: str) -> bytes:
+    """Corpo da requisição com o mesmo limite: recusa pelo Content-Length ou ao passar de MAX_UPLOAD_BYTES."""
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit() and int(length) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=detail)
+    chunks, total = [], 0
+    async for chunk in request.stream():
+        total += len(chunk)
+        if total > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=detail)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+async def _read_model(request: Request, model, detail: str):
+    """Corpo JSON lido por _read_body e validado em ``model`` (mesmo 422 do FastAPI)."""
+    raw = await _read_body(request, detail)
+    try:
+        return model.model_validate_json(raw)
+    except ValidationError as e:
+        raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)])
+
+def _json_body(model) -> dict:
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": model.model_json_schema()}}}}
+
+async def _extract(content: bytes, filename: str):
+    with stage("extract"):
+        return await extract_pool.run(extract_text_with_info, content, filename)
+
+async def _run_classifier(original: str):
     method = getattr(classifier, "classify_email", None) or getattr(classifier, "classify", None)
     if method is None:
         raise HTTPException(status_code=500, detail="Classifier missing method.")
-    out = method(processed_text=processed, original_text=original)
+    # normaliza uma vez: a mesma análise serve ao pré-processamento e ao classificador
+    analysis = analyze_text(original)
+    with stage("preprocess"):
+        processed = preprocess_text(original, analysis)
+    out = method(processed_text=processed, original_text=original, analysis=analysis)
     if inspect.isawaitable(out): return await out
     return out
 
-@app.post("/classify-text")
-async def classify_text(req: ClassificationRequest):
-    processed = preprocess_text(req.text)
-    return await _run_classifier(processed, req.text)
+# corpos lidos por _read_model (limitados, dentro do que a admissão reservou), não pelo
+# FastAPI; o schema segue no OpenAPI
+@app.post("/classify-text", openapi_extra=_json_body(ClassificationRequest))
+async def classify_text(request: Request):
+    req = await _read_model(request, ClassificationRequest, "Texto muito grande (máx 4 MB).")
+    observe(REQUEST_BYTES, len(req.text), "text")
+    return await _run_classifier(req.text)
+
+@app.post("/classify-batch", openapi_extra=_json_body(BatchClassificationRequest))
+async def classify_batch(request: Request):
+    req = await _read_model(request, BatchClassificationRequest, "Lote muito grande (máx 4 MB).")
+    if len(req.texts) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Lote muito grande (máx {MAX_BATCH_ITEMS} textos).")
+    for t in req.texts:
+        observe(REQUEST_BYTES, len(t), "batch")
+    analyses = [analyze_text(t) for t in req.texts]
+    with stage("preprocess"):
+        processed = [preprocess_text(t, a) for t, a in zip(req.texts, analyses)]
+    results = await classifier.classify_batch(processed, req.texts, analyses)
+    return {"results": results}
 
 @app.post("/classify-file")
 async def classify_file(file: UploadFile = File(...)):
-    content = await file.read()
-    if len(content) > 4*1024*1024:
-        raise HTTPException(status_code=413, detail="Arquivo muito grande (máx 4 MB)")
-    text = extract_text_from_file(content, file.filename)  # aceita .txt e .pdf com texto
-    processed = preprocess_text(text)
-    return await _run_classifier(processed, text)
+    content = await _read_upload(file, "Arquivo muito grande (máx 4 MB)")
+    # formato detectado pelo conteúdo (backend/extractors.py), não pela extensão
+    try:
+        text, extraction = await _extract(content, file.filename)
+    except ValueError as e:
+        # Ex.: binário sem extrator (imagem, .doc antigo) ou PDF sem texto extraível
+        raise HTTPException(status_code=400, detail=str(e))
+    del content  # libera o upload antes da classificação
+    result = await _run_classifier(text)
+    return {**result, "extraction": extraction}
 
 @app.post("/analyze")
 async def analyze(
@@ -79,35 +262,39 @@ async def analyze(
 
     try:
         text: str = ""
+        extraction = None
 
         # 1) Caminho 'oficial' para multipart: File/Form
         if file and getattr(file, "filename", ""):
-            content = await file.read()
-            if len(content) > 4 * 1024 * 1024:
-                raise HTTPException(status_code=413, detail="Arquivo muito grande (máx 4 MB).")
-            text = extract_text_from_file(content, file.filename)
+            content = await _read_upload(file, "Arquivo muito grande (máx 4 MB).")
+            text, extraction = await _extract(content, file.filename)
+            del content
 
         elif text_form and text_form.strip():
             text = text_form.strip()
+            observe(REQUEST_BYTES, len(text), "text")
 
         # 2) JSON {"text": "..."}
         elif "application/json" in ct or "text/json" in ct:
-            data = await request.json()
+            data = json.loads(await _read_body(request, "Texto muito grande (máx 4 MB)."))
             text = (data or {}).get("text", "")
             if not str(text).strip():
                 raise HTTPException(status_code=400, detail="Campo 'text' ausente.")
+            observe(REQUEST_BYTES, len(text), "text")
 
         # 3) text/plain
         elif "text/plain" in ct:
-            raw = await request.body()
+            raw = await _read_body(request, "Texto muito grande (máx 4 MB).")
             text = raw.decode("utf-8", errors="ignore").strip()
             if not text:
                 raise HTTPException(status_code=400, detail="Corpo de texto vazio.")
+            observe(REQUEST_BYTES, len(raw), "text")
 
         # 4) Fallback: tenta JSON mesmo se o header vier estranho
         else:
+            raw = await _read_body(request, "Texto muito grande (máx 4 MB).")
             try:
-                data = await request.json()
+                data = json.loads(raw)
                 text = (data or {}).get("text", "")
                 if not str(text).strip():
                     raise HTTPException(status_code=400, detail="Envie JSON {'text': ...} ou multipart com 'file'.")
@@ -115,28 +302,200 @@ async def analyze(
                 raise HTTPException(status_code=400, detail="Envie JSON {'text': ...} ou multipart com 'file'.")
 
         # --- pré-processa + classifica ---
-        processed = preprocess_text(text)
-        result = await _run_classifier(processed, text)
+        result = await _run_classifier(text)
+        if extraction is not None:
+            result = {**result, "extraction": extraction}
         return result
 
     except ValueError as e:
         # Ex.: PDF sem texto extraível
         raise HTTPException(status_code=400, detail=str(e))
     
+# --- Jobs assíncronos: POST /jobs devolve um id na hora; resultado por GET /jobs/{id} ou callback ---
+
+async def _until_admitted(fn, *args):
+    """Em segundo plano não há cliente esperando: pool lotado vira espera, não 503."""
+    delay = 0.05
+    while True:
+        try:
+            return await fn(*args)
+        except PoolSaturated:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+async def _process_job(job: Job) -> List[dict]:
+    results: List[Optional[dict]] = [None] * len(job.items)
+    texts = [(i, item["text"]) for i, item in enumerate(job.items) if "text" in item]
+    if texts:
+        originals = [t for _, t in texts]
+        analyses = [analyze_text(t) for t in originals]
+        processed = [preprocess_text(t, a) for t, a in zip(originals, analyses)]
+        # não passa por _until_admitted: repetir o lote inteiro contaria de novo os itens já decididos
+        batch = await classifier.classify_batch(processed, originals, analyses, wait_for_pool=True)
+        for (i, _), result in zip(texts, batch):
+            results[i] = result
+    for i, item in enumerate(job.items):
+        if "content" not in item:
+            continue
+        try:
+            text, extraction = await _until_admitted(_extract, item["content"], item["filename"])
+            result = await _until_admitted(_run_classifier, text)
+            results[i] = {**result, "filename": item["filename"], "extraction": extraction}
+        except ValueError as e:
+            results[i] = {"filename": item["filename"], "error": str(e)}
+        except Exception as e:
+            # PDF corrompido (PdfReadError) e afins: perde só o resultado deste anexo
+            logger.warning(f"Job {job.id}: falha ao processar {item['filename']}: {e!r}")
+            results[i] = {"filename": item["filename"], "error": f"Não foi possível ler o arquivo ({type(e).__name__})."}
+    return results
+
+job_queue = JobQueue.from_env(_process_job)
+
+def _job_response(request: Request, job: Job) -> dict:
+    return {
+        **job.to_dict(),
+        "queue_position": job_queue.position(job),
+        "status_url": f"{request.scope.get('root_path', '')}/jobs/{job.id}",
+    }
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: Request):
+    """
+    Aceita multipart com 'files' e/ou 'texts' (repetíveis), 'priority' (high|normal|low)
+    e 'callback_url' opcional, ou JSON {"texts": [...], "priority": ..., "callback_url": ...}.
+    """
+    ct = (request.headers.get("content-type") or "").lower()
+    items = []
+    if "application/json" in ct:
+        try:
+            data = json.loads(await _read_body(request, "Job muito grande (máx 4 MB em JSON; use multipart)."))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="JSON inválido.")
+        if not isinstance(data, dict):
+            raise HTTPException(status_code=400, detail="Envie JSON {'texts': [...]}.")
+        texts, files = data.get("texts") or [], []
+        if isinstance(texts, str):
+            texts = [texts]
+        priority = data.get("priority", "normal")
+        callback_url = data.get("callback_url")
+    elif "multipart/form-data" in ct:
+        # lê o form direto: List[UploadFile] com um único arquivo falha na validação desta versão do FastAPI
+        form = await request.form()
+        texts = form.getlist("texts")
+        files = [f for f in form.getlist("files") if not isinstance(f, str)]
+        priority = form.get("priority") or "normal"
+        callback_url = form.get("callback_url")
+    else:
+        raise HTTPException(status_code=415, detail="Envie JSON ou multipart/form-data.")
+
+    if len(texts) + len(files) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Job muito grande (máx {MAX_BATCH_ITEMS} itens).")
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"Prioridade inválida (use {', '.join(PRIORITIES)}).")
+    if callback_url:
+        try:
+            # resolve o host fora do event loop
+            await asyncio.get_running_loop().run_in_executor(None, job_queue.check_callback_url, str(callback_url))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    nbytes = 0
+    for text in texts:
+        if str(text).strip():
+            items.append({"text": str(text)})
+            nbytes += len(str(text))
+    for file in files:
+        if getattr(file, "filename", ""):
+            content = await _read_upload(file, f"Arquivo {file.filename} muito grande (máx 4 MB).")
+            nbytes += len(content)
+            # para de ler assim que o job não couber na fila (por bytes), em vez de juntar tudo antes
+            if nbytes > job_queue.max_bytes:
+                raise HTTPException(status_code=413, detail="Job muito grande para a fila (JOB_QUEUE_MB).")
+            if not job_queue.has_room(nbytes):
+                raise JobQueueFull("Fila de jobs sem espaço para os arquivos.")
+            items.append({"filename": file.filename, "content": content})
+
+    if not items:
+        raise HTTPException(status_code=400, detail="Envie ao menos um texto ou arquivo.")
+    if nbytes > job_queue.max_bytes:
+        raise HTTPException(status_code=413, detail="Job muito grande para a fila (JOB_QUEUE_MB).")
+
+    job = await job_queue.submit(Job(items, priority=priority, callback_url=callback_url or None))
+    return _job_response(request, job)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, request: Request):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado (ou expirado).")
+    return _job_response(request, job)
+
+# --- Stream NDJSON: uma conexão, um registro {"id", "text"} por linha, resultados conforme terminam ---
+
+streams = StreamClassifier.from_env(lambda text: _until_admitted(_run_classifier, text))
+
+@app.post("/classify-stream")
+async def classify_stream(request: Request, ordered: bool = False):
+    """
+    Corpo NDJSON (application/x-ndjson) com {"id": ..., "text": ...} por linha; a resposta
+    é NDJSON com {"id": ..., "category": ..., ...} por registro, na ordem em que terminam
+    (ou na de entrada com ?ordered=true). Registros inválidos viram {"id": ..., "error": ...}.
+    """
+    client = getattr(request.state, "client_key", None)
+    pace = (lambda: admission.pace(client)) if client is not None else None
+    return NDJSONResponse(streams.run(request.stream(), ordered=ordered, pace=pace))
+
 @app.get("/stats")
 async def stats():
+    batcher = getattr(classifier, "batcher", None)
+    cache = getattr(classifier, "cache", None)
+    shared = classifier.shared_stats
+    # com vários workers (STATS_BACKEND=sqlite) os números somam todos eles
+    engine = await asyncio.get_running_loop().run_in_executor(None, classifier.aggregated_stats)
+    productive = engine.by_category.get("Produtivo", 0)
+    return {
+        "total_classifications": engine.total,
+        "productive_count": productive,
+        "unproductive_count": engine.total - productive,
+        "average_confidence": engine.mean,
+        **engine.snapshot(),
+        "workers": shared.workers() if shared is not None else None,
+        "inference_pool": classifier.executor.stats(),
+        "microbatch": batcher.stats() if batcher is not None else None,
+        "cache": cache.stats() if cache is not None else None,
+        "jobs": job_queue.stats(),
+        "templates": RESPONSES.stats(),
+        "admission": admission.stats(),
+        "streams": streams.stats(),
+        "neardup": classifier.neardup.stats() if classifier.neardup is not None else None,
+        # com EXTRACT_POOL=process cada processo tem o próprio cache, fora desta conta
+        "extraction_cache": (EXTRACTION_CACHE.stats()
+                             if EXTRACTION_CACHE is not None and extract_pool.kind == "thread" else None),
+    }
+
+@app.get("/clusters")
+async def clusters(min_size: int = 2, limit: int = 50, window: Optional[float] = None):
+    """E-mails recentes agrupados por similaridade (maiores primeiro), para tratar em lote."""
+    index = classifier.neardup
+    if index is None:
+        raise HTTPException(status_code=404, detail="Índice de quase-duplicados desligado (use NEAR_DUP=index ou reuse).")
     return {
-        "total_classifications": getattr(classifier, "total_classifications", 0),
-        "productive_count": getattr(classifier, "productive_count", 0),
-        "unproductive_count": getattr(classifier, "unproductive_count", 0),
-        "average_confidence": (
-            sum(getattr(classifier, "confidence_scores", []) or [0]) /
-            max(1, len(getattr(classifier, "confidence_scores", [])))
-        ),
+        "clusters": index.clusters(min_size=max(1, min_size), limit=min(max(1, limit), 1000), window=window),
+        "index": index.stats(),
     }
 
+@app.get("/metrics")
+async def metrics():
+    # formato de exposição em texto do Prometheus
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 _internal_app = app  # guarda o app atual
 
 from fastapi import FastAPI as _FastAPI
-app = _FastAPI(title="Email Classifier (mounted)")
+# O Starlette não repassa startup/shutdown para apps montados: registra no app externo
+app = _FastAPI(
+    title="Email Classifier (mounted)",
+    on_startup=_internal_app.router.on_startup,
+    on_shutdown=_internal_app.router.on_shutdown,
+)
 app.mount("/api", _internal_app)
\ No newline at end of file
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, List
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Agrupa pedidos de inferência concorrentes num único forward em lote.
+
+    Cada ``submit`` entra numa fila; o lote é disparado quando junta
+    ``max_batch`` textos ou quando o primeiro da fila espera ``max_wait_ms``.
+    O resultado de cada posição resolve a future do respectivo chamador.
+    """
+
+    def __init__(self, run_batch: Callable[[List[str]], Awaitable[List]],
+                 max_batch: int = 16, max_wait_ms: float = 2.0):
+        self.run_batch = run_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._pending = []  # (texto, future, instante de chegada)
+        self._timer = None
+        self._tasks = set()  # lotes em execução (referência forte: o loop só guarda referência fraca)
+        self._started = time.monotonic()
+        # contadores
+        self.items = 0
+        self.batches = 0
+        self.errors = 0
+        self.largest_batch = 0
+        self._wait_total = 0.0
+        self._batch_time_total = 0.0
+
+    @classmethod
+    def from_env(cls, run_batch) -> "MicroBatcher":
+        """Lê ``MICROBATCH_MAX_SIZE`` e ``MICROBATCH_MAX_WAIT_MS``."""
+        return cls(
+            run_batch,
+            max_batch=int(os.getenv("MICROBATCH_MAX_SIZE", "16")),
+            max_wait_ms=float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2")),
+        )
+
+    async def submit(self, text: str):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        started = time.perf_counter()
+        self._wait_total += sum(started - t for _, _, t in batch)
+        try:
+            results = await self.run_batch([text for text, _, _ in batch])
+        except asyncio.CancelledError:
+            for _, future, _ in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            self.errors += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self._batch_time_total += time.perf_counter() - started
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+        if len(results) < len(batch):
+            # sem isso os chamadores das posições sem resultado esperariam para sempre
+            self.errors += 1
+            error = RuntimeError(f"Pipeline devolveu {len(results)} resultados para {len(batch)} textos.")
+            for _, future, _ in batch[len(results):]:
+                if not future.done():
+                    future.set_exception(error)
+
+    def stats(self) -> dict:
+        elapsed = max(1e-9, time.monotonic() - self._started)
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "items": self.items,
+            "batches": self.batches,
+            "errors": self.errors,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "avg_queue_wait_ms": 1000 * self._wait_total / self.items if self.items else 0.0,
+            "avg_batch_latency_ms": 1000 * self._batch_time_total / self.batches if self.batches else 0.0,
+            "items_per_sec": self.items / elapsed,
+            "queued": len(self._pending),
+        }
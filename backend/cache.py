@@ -0,0 +1,221 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(text: str) -> str:
+    """Hash do texto normalizado (minúsculas, espaços colapsados)."""
+    return normalized_cache_key(re.sub(r"\s+", " ", text.lower()))
+
+
+def normalized_cache_key(normalized: str) -> str:
+    """Mesmo hash de cache_key, para texto já em minúsculas e com espaços colapsados."""
+    return hashlib.sha256(normalized.strip().encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Cache LRU + TTL em memória para resultados de classificação.
+
+    Limitado por número de entradas e por bytes (tamanho do JSON do valor).
+    Conta hits, misses e evicções por motivo (lru, ttl, bytes).
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 32 * 1024 * 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expira_em, tamanho, valor)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = {"lru": 0, "ttl": 0, "bytes": 0}
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, size, value = entry
+            if expires < time.monotonic():
+                self._remove(key, "ttl")
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return dict(value)
+
+    def set(self, key: str, value: Dict):
+        size = len(json.dumps(value, ensure_ascii=False))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key, None)
+            self._data[key] = (time.monotonic() + self.ttl, size, dict(value))
+            self._bytes += size
+            while len(self._data) > self.max_entries:
+                self._remove(next(iter(self._data)), "lru")
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._data)), "bytes")
+
+    def _remove(self, key: str, reason: Optional[str]):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+        if reason:
+            self.evictions[reason] += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "entries": len(self),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": dict(self.evictions),
+        }
+
+
+class SQLiteResultCache(ResultCache):
+    """
+    Mesmo contrato do ResultCache, persistido em SQLite (sobrevive a restarts).
+    A evicção LRU usa a coluna ``accessed_at``; os limites são por número de
+    entradas e por bytes (coluna ``size``, o tamanho do JSON). Contagem e bytes
+    ficam em contadores, recontados a cada ``resync`` segundos porque outros
+    processos (workers do prefork) podem gravar no mesmo arquivo.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000, max_bytes: int = 32 * 1024 * 1024,
+                 ttl: float = 86400, resync: float = 60.0):
+        super().__init__(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+        self.path = path
+        self.resync = resync
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+        if "size" not in columns:  # arquivo criado antes da coluna de tamanho
+            self._conn.execute("ALTER TABLE results ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE results SET size = length(value)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results(accessed_at)")
+        self._count = 0
+        self._synced_at = 0.0
+        with self._lock:
+            self._sync()
+            self._trim()
+
+    def _sync(self):
+        self._count, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+        self._synced_at = time.monotonic()
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, size FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[1] < now:
+                if self._conn.execute("DELETE FROM results WHERE key = ?", (key,)).rowcount:
+                    self._count -= 1
+                    self._bytes -= row[2]
+                self.evictions["ttl"] += 1
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Dict):
+        now = time.time()
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires_at, accessed_at, size) VALUES (?, ?, ?, ?, ?)",
+                (key, data, now + self.ttl, now, size),
+            )
+            if old is None:
+                self._count += 1
+            else:
+                self._bytes -= old[0]
+            self._bytes += size
+            if time.monotonic() - self._synced_at > self.resync:
+                self._sync()
+            self._trim()
+
+    def _trim(self):
+        """Remove as entradas menos usadas (pelo índice de accessed_at) até caber nos dois limites."""
+        excess, excess_bytes = self._count - self.max_entries, self._bytes - self.max_bytes
+        if excess <= 0 and excess_bytes <= 0:
+            return
+        victims = []
+        cursor = self._conn.execute("SELECT key, size FROM results ORDER BY accessed_at")
+        try:
+            for key, size in cursor:
+                if excess <= 0 and excess_bytes <= 0:
+                    break
+                self.evictions["lru" if excess > 0 else "bytes"] += 1
+                victims.append((key,))
+                excess -= 1
+                excess_bytes -= size
+                self._count -= 1
+                self._bytes -= size
+        finally:
+            cursor.close()
+        self._conn.executemany("DELETE FROM results WHERE key = ?", victims)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def stats(self) -> Dict:
+        st = super().stats()
+        st.update(backend="sqlite", path=self.path, max_bytes=self.max_bytes)
+        return st
+
+
+def build_cache_from_env() -> Optional[ResultCache]:
+    """
+    RESULT_CACHE=memory (padrão) | sqlite | off
+    RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_MB, RESULT_CACHE_TTL (s), RESULT_CACHE_PATH
+    """
+    kind = os.getenv("RESULT_CACHE", "memory").lower()
+    if kind in ("off", "0", "none", ""):
+        return None
+    ttl = float(os.getenv("RESULT_CACHE_TTL", "3600"))
+    max_entries = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+    max_bytes = int(float(os.getenv("RESULT_CACHE_MAX_MB", "32")) * 1024 * 1024)
+    if kind == "sqlite":
+        path = os.getenv("RESULT_CACHE_PATH", "classification_cache.sqlite3")
+        try:
+            return SQLiteResultCache(path, max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+        except sqlite3.Error as e:
+            logger.warning(f"Cache SQLite indisponível ({e}); usando cache em memória.")
+    return ResultCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
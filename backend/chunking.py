@@ -0,0 +1,142 @@
+import os
+import re
+from typing import Dict, List, Optional
+
+# truncate: só os primeiros 512 caracteres vão ao modelo (padrão)
+# chunked: remove histórico citado/assinatura e divide em janelas de tokens
+LONG_EMAIL_MODE = os.getenv("LONG_EMAIL_MODE", "truncate").lower()
+TRUNCATE_CHARS = 512
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "256"))
+CHUNK_STRIDE = int(os.getenv("CHUNK_STRIDE", "32"))      # sobreposição entre janelas
+CHUNK_MAX = int(os.getenv("CHUNK_MAX", "4"))              # teto de custo por e-mail
+CHUNK_AGGREGATE = os.getenv("CHUNK_AGGREGATE", "latest").lower()  # latest | max | mean
+CHUNK_LATEST_DECAY = float(os.getenv("CHUNK_LATEST_DECAY", "0.5"))
+# Sem tokenizer à mão (pool de processos), estima tokens por palavra (BPE em português)
+TOKENS_PER_WORD = 1.5
+
+# Início do histórico citado: tudo dali para baixo é descartado
+_REPLY_HEADER_RE = re.compile(
+    r"^\s*(?:"
+    r"em [^\n]{0,200}(?:\n[^\n]{0,200})?escreveu:\s*$"  # o Gmail quebra a linha às vezes
+    r"|on [^\n]{0,200}(?:\n[^\n]{0,200})?wrote:\s*$"
+    r"|-{2,}\s*(?:mensagem original|original message|mensagem encaminhada|forwarded message)\s*-{2,}"
+    r"|(?:de|from):\s.+\n\s*(?:enviad[ao](?: em)?|sent|data|date):\s"
+    r")",
+    re.I | re.M,
+)
+_QUOTED_LINE_RE = re.compile(r"^[ \t]*>.*\n?", re.M)
+# Delimitador padrão de assinatura ("-- ") e rodapés de celular
+_SIGNATURE_RE = re.compile(
+    r"^(?:-- ?$|_{5,}$|enviado do meu |sent from my |enviado de )",
+    re.I | re.M,
+)
+
+
+def strip_quoted(text: str) -> str:
+    """Remove o histórico citado (cabeçalhos de resposta, linhas com ``>``) e a assinatura."""
+    m = _REPLY_HEADER_RE.search(text)
+    if m and m.start() > 0:
+        text = text[:m.start()]
+    text = _QUOTED_LINE_RE.sub("", text)
+    m = _SIGNATURE_RE.search(text)
+    if m and m.start() > 0:
+        text = text[:m.start()]
+    return text.strip()
+
+
+def _window_starts(n: int, size: int, step: int, max_chunks: int) -> List[int]:
+    """Inícios das janelas; acima do teto, fica com as primeiras e a última (fim da resposta)."""
+    starts = list(range(0, max(1, n - size + step), step)) if n > size else [0]
+    if len(starts) > max_chunks:
+        starts = starts[:max_chunks - 1] + [n - size] if max_chunks > 1 else starts[:1]
+    return starts
+
+
+def split_windows(text: str, max_tokens: int = CHUNK_TOKENS, stride: int = CHUNK_STRIDE,
+                  max_chunks: int = CHUNK_MAX, tokenizer=None) -> List[str]:
+    """
+    Janelas de até ``max_tokens`` tokens, sobrepostas em ``stride``, no máximo
+    ``max_chunks``. Se o texto pede mais janelas que o teto, ficam as primeiras
+    e a última: o começo da resposta e o fim, onde costuma estar o pedido.
+    Com ``tokenizer`` (fast, do Hugging Face) as janelas seguem os offsets reais;
+    sem ele, usa palavras com TOKENS_PER_WORD.
+    """
+    if not text:
+        return []
+    max_tokens = max(1, max_tokens)
+    max_chunks = max(1, max_chunks)
+    step = max(1, max_tokens - stride)
+
+    if tokenizer is not None:
+        # não tokeniza além do que as janelas permitidas conseguem cobrir
+        head_chars = (step * (max_chunks - 1) + max_tokens) * 16
+        tail_chars = max_tokens * 16
+        try:
+            if len(text) <= head_chars + tail_chars or max_chunks == 1:
+                parts = [text[:head_chars + tail_chars]]
+            else:
+                parts = [text[:head_chars], text[-tail_chars:]]
+            offsets = [tokenizer(p, add_special_tokens=False, return_offsets_mapping=True,
+                                 truncation=False)["offset_mapping"] for p in parts]
+        except Exception:
+            offsets = None
+        if offsets and offsets[0]:
+            head = parts[0]
+            if len(parts) == 1:
+                starts = _window_starts(len(offsets[0]), max_tokens, step, max_chunks)
+            else:  # as primeiras janelas do começo; a última vem do fim do texto
+                starts = list(range(0, len(offsets[0]), step))[:max_chunks - 1]
+            chunks = [head[offsets[0][i][0]:offsets[0][min(i + max_tokens, len(offsets[0])) - 1][1]]
+                      for i in starts]
+            if len(parts) == 2 and offsets[1]:
+                tail = offsets[1][-max_tokens:]
+                chunks.append(parts[1][tail[0][0]:tail[-1][1]])
+            return chunks
+
+    words = text.split()
+    per_window = max(1, int(max_tokens / TOKENS_PER_WORD))
+    word_step = max(1, int(step / TOKENS_PER_WORD))
+    return [" ".join(words[i:i + per_window])
+            for i in _window_starts(len(words), per_window, word_step, max_chunks)]
+
+
+def model_inputs(text: str, tokenizer=None) -> List[str]:
+    """Textos que vão ao modelo para um e-mail, conforme LONG_EMAIL_MODE."""
+    if LONG_EMAIL_MODE != "chunked":
+        return [text[:TRUNCATE_CHARS]]
+    latest = strip_quoted(text) or text
+    return split_windows(latest, tokenizer=tokenizer) or [text[:TRUNCATE_CHARS]]
+
+
+def aggregate(outputs: List[Dict], mode: str = CHUNK_AGGREGATE,
+              decay: float = CHUNK_LATEST_DECAY) -> Dict:
+    """
+    Junta as saídas ``{"label", "score"}`` das janelas em uma só, no mesmo formato.
+
+    - max: a janela não neutra mais confiante;
+    - mean: média do score de cada rótulo sobre todas as janelas;
+    - latest: média das janelas não neutras com peso ``decay**i`` (a janela 0 é
+      o topo da resposta mais recente).
+    Janelas neutras só decidem quando nenhuma janela tem rótulo decisivo.
+    """
+    if len(outputs) == 1:
+        return outputs[0]
+    decisive = [(i, o) for i, o in enumerate(outputs) if "neu" not in str(o.get("label", "")).lower()]
+    if mode == "max":
+        return max((o for _, o in decisive) or outputs, key=lambda o: float(o.get("score", 0.0)))
+
+    if mode == "mean":
+        weighted = [(1.0, o) for o in outputs]
+    else:
+        weighted = [(decay ** i, o) for i, o in (decisive or enumerate(outputs))]
+    totals: Dict[str, float] = {}
+    for w, o in weighted:
+        label = o.get("label", "")
+        totals[label] = totals.get(label, 0.0) + w * float(o.get("score", 0.0))
+    label = max(totals, key=totals.get)
+    return {"label": label, "score": totals[label] / sum(w for w, _ in weighted)}
+
+
+def pipeline_tokenizer(pipe) -> Optional[object]:
+    tokenizer = getattr(pipe, "tokenizer", None)
+    return tokenizer if getattr(tokenizer, "is_fast", False) else None
@@ -0,0 +1,315 @@
+"""
+Classificação em lote, offline (sem HTTP), de caixas de e-mail históricas.
+
+    python -m backend.cli caixa.mbox emails/ extra.jsonl -o resultados.jsonl --workers 4
+    python -m backend.cli caixa.mbox -o resultados.csv --resume
+
+Entradas: arquivos mbox, arquivos ``.eml``, diretórios (``.eml`` recursivo) e
+JSONL (``{"id": ..., "text": ...}`` por linha). As mensagens são lidas em
+streaming, parseadas (corpo + anexos em qualquer formato de backend/extractors.py) e classificadas num pool de
+processos, em blocos de ``--chunk-size``. Cada processo tem o próprio
+EmailClassifier. Os resultados saem em ordem, gravados à medida que ficam
+prontos, e o checkpoint (``<saida>.ckpt``) guarda quantas mensagens e quantos
+bytes da saída já estão gravados. ``--resume`` corta a saída nesse ponto e
+continua de onde parou. No máximo ``2 x workers`` blocos ficam em memória,
+então o uso de memória não depende do tamanho da caixa.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+from .extractors import parse_message  # parse MIME (nos workers), mesmos extratores do /classify-file
+
+logger = logging.getLogger(__name__)
+
+# Mensagens maiores são truncadas antes do parse (anexos enormes não valem a memória)
+MAX_MESSAGE_BYTES = int(os.getenv("CLI_MAX_MESSAGE_BYTES", str(25 * 1024 * 1024)))
+CSV_COLUMNS = ["id", "source", "message_id", "subject", "category", "confidence",
+               "decided_by", "suggested_response", "chars", "attachments", "error"]
+
+_MBOXRD_QUOTED = re.compile(rb"^>+From ")
+
+
+# --- leitura das fontes (processo principal: só bytes, sem parse) ---
+
+def iter_mbox(path: str) -> Iterator[bytes]:
+    """Mensagens de um mbox, uma por vez (separador ``From `` após linha em branco)."""
+    with open(path, "rb") as f:
+        lines: List[bytes] = []
+        size = 0
+        prev_blank = True
+        for line in f:
+            if line.startswith(b"From ") and prev_blank:
+                if lines:
+                    yield b"".join(lines)
+                lines, size = [], 0
+                prev_blank = False
+                continue
+            prev_blank = line in (b"\n", b"\r\n")
+            if _MBOXRD_QUOTED.match(line):
+                line = line[1:]
+            if size + len(line) <= MAX_MESSAGE_BYTES:
+                lines.append(line)
+                size += len(line)
+        if lines:
+            yield b"".join(lines)
+
+
+def _read_eml(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(MAX_MESSAGE_BYTES)
+
+
+def iter_records(paths: List[str]) -> Iterator[Dict]:
+    """
+    Gera ``{"id", "source", "raw"}`` (mbox/eml) ou ``{"id", "source", "text"}``
+    (JSONL) numa ordem determinística — o checkpoint conta posições nela.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(".eml"):
+                        full = os.path.join(root, name)
+                        yield {"id": full, "source": full, "raw": _read_eml(full)}
+        elif path.lower().endswith(".eml"):
+            yield {"id": path, "source": path, "raw": _read_eml(path)}
+        elif path.lower().endswith((".jsonl", ".ndjson")):
+            with open(path, encoding="utf-8") as f:
+                for n, line in enumerate(f):
+                    if not line.strip():
+                        continue
+                    try:
+                        item = json.loads(line)
+                    except ValueError as e:
+                        yield {"id": f"{path}:{n}", "source": path, "text": "", "error": f"JSON inválido: {e}"}
+                        continue
+                    text = item.get("text", "") if isinstance(item, dict) else str(item)
+                    rec_id = item.get("id") if isinstance(item, dict) else None
+                    yield {"id": str(rec_id if rec_id is not None else f"{path}:{n}"), "source": path,
+                           "text": str(text or "")}
+        else:
+            for n, raw in enumerate(iter_mbox(path)):
+                yield {"id": f"{path}:{n}", "source": path, "raw": raw}
+
+
+# --- classificação (nos workers) ---
+
+_worker = None  # (EmailClassifier, event loop) do processo
+
+
+def _init_worker():
+    global _worker
+    from .email_classifier import EmailClassifier
+
+    loop = asyncio.new_event_loop()
+    classifier = EmailClassifier()
+    loop.run_until_complete(classifier.initialize())
+    if classifier._load_task is not None:  # MODEL_LOAD_MODE=background: espera o modelo aqui
+        loop.run_until_complete(classifier._load_task)
+    _worker = (classifier, loop)
+
+
+def classify_chunk(records: List[Dict]) -> List[Dict]:
+    """Parseia e classifica um bloco de registros; erros ficam no campo ``error`` do registro."""
+    from .utils import analyze_text, preprocess_text
+
+    if _worker is None:
+        _init_worker()
+    classifier, loop = _worker
+
+    rows, texts = [], []
+    for rec in records:
+        row = {"id": rec["id"], "source": rec["source"], "message_id": "", "subject": "",
+               "attachments": [], "error": rec.get("error")}
+        text = rec.get("text", "")
+        if "raw" in rec:
+            try:
+                parsed = parse_message(rec["raw"])
+                text = parsed.pop("text")
+                row.update(parsed)
+            except Exception as e:
+                row["error"] = f"parse: {e}"
+        if not row["error"] and not text.strip():
+            row["error"] = "sem texto"
+        row["chars"] = len(text)
+        rows.append(row)
+        texts.append(None if row["error"] else text)
+
+    todo = [i for i, t in enumerate(texts) if t is not None]
+    if todo:
+        originals = [texts[i] for i in todo]
+        analyses = [analyze_text(t) for t in originals]
+        processed = [preprocess_text(t, a) for t, a in zip(originals, analyses)]
+        results = loop.run_until_complete(classifier.classify_batch(processed, originals, analyses))
+        for i, result in zip(todo, results):
+            rows[i].update(
+                category=result["category"],
+                confidence=result["confidence"],
+                decided_by=result["decided_by"],
+                suggested_response=result["suggested_response"],
+            )
+    return rows
+
+
+# --- saída e checkpoint ---
+
+class ResultWriter:
+    """Grava JSONL ou CSV em modo append; ``offset`` é o tamanho já gravado (para o checkpoint)."""
+
+    def __init__(self, path: str, fmt: str, offset: Optional[int] = None):
+        self.path = path
+        self.fmt = fmt
+        if offset is not None and os.path.exists(path):
+            os.truncate(path, offset)  # descarta o que foi escrito depois do último checkpoint
+        elif offset is None and os.path.exists(path):
+            os.truncate(path, 0)
+        self._file = open(path, "a", encoding="utf-8", newline="")
+        self._csv = csv.DictWriter(self._file, fieldnames=CSV_COLUMNS, extrasaction="ignore") if fmt == "csv" else None
+        if self._csv is not None and self._file.tell() == 0:
+            self._csv.writeheader()
+
+    def write(self, rows: List[Dict]):
+        for row in rows:
+            if self._csv is not None:
+                self._csv.writerow({**row, "attachments": ";".join(row.get("attachments") or [])})
+            else:
+                self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    @property
+    def offset(self) -> int:
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+def load_checkpoint(path: str) -> Optional[Dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path: str, state: Dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)  # atômico: nunca fica um checkpoint pela metade
+
+
+def _chunks(records: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    chunk = []
+    for rec in records:
+        chunk.append(rec)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _Inline:
+    """``--workers 0``: roda no próprio processo, com a mesma interface do pool."""
+
+    class _Done:
+        def __init__(self, value):
+            self._value = value
+
+        def result(self):
+            return self._value
+
+    def submit(self, fn, *args):
+        return self._Done(fn(*args))
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+def run(inputs: List[str], output: str, fmt: str = "jsonl", workers: int = 1, chunk_size: int = 32,
+        resume: bool = False, progress_every: float = 5.0, limit: Optional[int] = None) -> Dict:
+    checkpoint_path = output + ".ckpt"
+    state = load_checkpoint(checkpoint_path) if resume else None
+    if state is not None and state.get("inputs") != inputs:
+        raise SystemExit(f"Checkpoint {checkpoint_path} é de outras entradas: {state.get('inputs')}")
+    skip = state["done"] if state else 0
+    writer = ResultWriter(output, fmt, offset=state["offset"] if state else None)
+
+    records = iter_records(inputs)
+    for _ in range(skip):
+        if next(records, None) is None:
+            break
+    if limit is not None:
+        records = (rec for n, rec in zip(range(limit), records))
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers > 0 else _Inline()
+    window = max(2, 2 * workers)
+    done, errors, started = skip, 0, time.perf_counter()
+    last_report = started
+    pending = deque()
+
+    def drain_one():
+        nonlocal done, errors, last_report
+        rows = pending.popleft().result()
+        writer.write(rows)
+        done += len(rows)
+        errors += sum(1 for r in rows if r.get("error"))
+        save_checkpoint(checkpoint_path, {"inputs": inputs, "done": done, "offset": writer.offset})
+        now = time.perf_counter()
+        if progress_every and now - last_report >= progress_every:
+            last_report = now
+            rate = (done - skip) / (now - started)
+            print(f"{done} mensagens ({rate:.1f}/s, {errors} com erro)", file=sys.stderr, flush=True)
+
+    try:
+        for chunk in _chunks(records, chunk_size):
+            pending.append(pool.submit(classify_chunk, chunk))
+            while len(pending) >= window:  # resultados em ordem e no máximo `window` blocos em voo
+                drain_one()
+        while pending:
+            drain_one()
+    finally:
+        pool.shutdown(cancel_futures=True)
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    summary = {"done": done, "new": done - skip, "errors": errors, "seconds": round(elapsed, 3),
+               "per_sec": round((done - skip) / elapsed, 2) if elapsed else 0.0}
+    print(f"Concluído: {summary}", file=sys.stderr)
+    return summary
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(prog="python -m backend.cli", description="Classificação offline de e-mails.")
+    ap.add_argument("inputs", nargs="+", help="mbox, .eml, diretórios de .eml ou .jsonl")
+    ap.add_argument("-o", "--output", required=True, help="arquivo .jsonl ou .csv")
+    ap.add_argument("--format", choices=("jsonl", "csv"), help="padrão: pela extensão da saída")
+    ap.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                    help="processos (cada um carrega o modelo); 0 roda no processo atual")
+    ap.add_argument("--chunk-size", type=int, default=32)
+    ap.add_argument("--resume", action="store_true", help="continua do checkpoint <saida>.ckpt")
+    ap.add_argument("--progress", type=float, default=5.0, help="intervalo do progresso em s (0 desliga)")
+    ap.add_argument("--limit", type=int, help="processa no máximo N mensagens (além das já feitas)")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    run(args.inputs, args.output, fmt=fmt, workers=args.workers, chunk_size=args.chunk_size,
+        resume=args.resume, progress_every=args.progress, limit=args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,185 +1,692 @@
+import asyncio
 import os
 import logging
-from typing import Dict, Optional
+import time
+from typing import Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-pipeline = None
-try:
-    if os.getenv("DISABLE_MODEL") != "1":
-        from transformers import pipeline as hf_pipeline  
-        pipeline = hf_pipeline
-except Exception as e:
-    logger.info(f"Transformers indisponível/omitido: {e}")
+# Tamanho do mini-lote enviado ao pipeline em classify_batch
+BATCH_SIZE = int(os.getenv("CLASSIFIER_BATCH_SIZE", "16"))
+
+# eager: startup espera modelo + warm-up | background: serve por keywords enquanto carrega
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "eager").lower()
+WARMUP_TEXT = "Bom dia, poderiam verificar o status do meu chamado?"
 
 from .utils import (
+    TextAnalysis,
+    analyze_text,
     calculate_keyword_score,
     get_device_info,
-    is_greeting_no_action,
     suggest_response,
 )
+from .batching import MicroBatcher
+from .chunking import aggregate, model_inputs, pipeline_tokenizer
+from .linear import LINEAR_MIN_CONFIDENCE, LinearModel
+from .cache import build_cache_from_env, normalized_cache_key
+from .neardup import Cluster, NearDuplicateIndex, reuse_signature
+from .responses import RESPONSES
+from .metrics import CLASSIFICATIONS, DECISIONS, MODEL_CALLS, SHORT_CIRCUITS, count, stage
+from .stats import SharedStats, StatsEngine
+from .workers import BoundedExecutor, PoolSaturated
+
+MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+# Nome no Hub ou diretório local (sem rede)
+MODEL_PATH = os.getenv("MODEL_PATH", MODEL_NAME)
+# torch (pipeline do transformers) | onnx (ONNX Runtime, ver backend/inference.py)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+
+# A partir desse score de keywords as regras decidem e o resultado do modelo é ignorado
+KEYWORD_DECISIVE_SCORE = 3
+
+
+class CascadePolicy:
+    """
+    Ordem da cascata: cache → saudação → keywords → modelo. O modelo só roda
+    quando ainda pode mudar a decisão.
+
+    ``keyword_score``: score de keywords a partir do qual as keywords decidem
+    sozinhas. O padrão é KEYWORD_DECISIVE_SCORE, o corte de _combine_results,
+    então pular o modelo não muda nenhum resultado. Valores menores economizam
+    mais chamadas, mas podem mudar o resultado de casos limítrofes.
+    ``enabled=False`` chama o modelo sempre (comportamento antigo).
+    """
+
+    def __init__(self, keyword_score: int = KEYWORD_DECISIVE_SCORE, enabled: bool = True):
+        self.keyword_score = keyword_score
+        self.enabled = enabled
+
+    @classmethod
+    def from_env(cls) -> "CascadePolicy":
+        """CASCADE=0 desliga; CASCADE_KEYWORD_SCORE ajusta o corte."""
+        return cls(
+            keyword_score=int(os.getenv("CASCADE_KEYWORD_SCORE", str(KEYWORD_DECISIVE_SCORE))),
+            enabled=os.getenv("CASCADE", "1") == "1",
+        )
+
+    def needs_model(self, keyword_result: Dict) -> bool:
+        return not self.enabled or keyword_result["score"] < self.keyword_score
+
+
+def _pipeline_factory():
+    """Importa transformers só quando o modelo vai ser carregado (o import leva segundos)."""
+    if os.getenv("DISABLE_MODEL") == "1":
+        return None
+    try:
+        from transformers import pipeline as hf_pipeline
+        return hf_pipeline
+    except Exception as e:
+        logger.info(f"Transformers indisponível/omitido: {e}")
+        return None
+
+
+def _load_onnx_pipeline():
+    """ONNX_MODEL_DIR (padrão: MODEL_PATH), ONNX_QUANTIZE=1 para int8, INFERENCE_THREADS."""
+    model_dir = os.getenv("ONNX_MODEL_DIR") or MODEL_PATH
+    try:
+        from .inference import OnnxSentimentPipeline, inference_threads
+        return OnnxSentimentPipeline(
+            model_dir, quantize=os.getenv("ONNX_QUANTIZE") == "1", threads=inference_threads()
+        )
+    except Exception as e:
+        logger.warning(f"Could not load ONNX model from {model_dir}: {e}")
+        return None
+
+
+def load_pipeline():
+    """Carrega o pipeline de sentimento; devolve None se o modelo não puder ser usado."""
+    if os.getenv("DISABLE_MODEL") == "1":
+        return None
+    if INFERENCE_BACKEND == "onnx":
+        return _load_onnx_pipeline()
+
+    pipeline = _pipeline_factory()
+    if pipeline is None:
+        return None
+
+    device = -1
+    try:
+        import torch  # opcional
+        from .inference import inference_threads
+        if inference_threads():
+            torch.set_num_threads(inference_threads())
+        if torch.cuda.is_available():
+            device = 0
+    except Exception:
+        # torch ausente ou indisponível → CPU
+        device = -1
+
+    # Tenta carregar o modelo; se falhar, usa somente regras/keywords
+    try:
+        return pipeline(
+            "sentiment-analysis",
+            model=MODEL_PATH,
+            tokenizer=MODEL_PATH,
+            device=device,
+            max_length=512,
+            truncation=True,
+        )
+    except Exception as e:
+        logger.warning(f"Could not load transformer model: {e}")
+        return None
+
+
+# --- INFERENCE_POOL=process: cada processo worker carrega o próprio pipeline ---
+_worker_pipeline = None
+
+
+def _init_worker_pipeline():
+    global _worker_pipeline
+    _worker_pipeline = load_pipeline()
+
+
+def _worker_has_model() -> bool:
+    return _worker_pipeline is not None
+
+
+def _worker_infer(texts: List[str], batch_size: int) -> List[Dict]:
+    if _worker_pipeline is None:
+        raise RuntimeError("Modelo indisponível no processo worker.")
+    return _worker_pipeline(texts, batch_size=batch_size)
+
+
+# --- backend/server.py: pipeline carregado uma vez, antes do fork dos workers ---
+_preloaded_pipeline = None
+
+
+def set_preloaded_pipeline(pipe):
+    """Pipeline pronto (compartilhado copy-on-write ou cliente do processo de inferência)."""
+    global _preloaded_pipeline
+    _preloaded_pipeline = pipe
 
 
 class EmailClassifier:
     def __init__(self):
         self.classifier_pipeline = None
+        self.model_loaded = False
+        self.model_state = "not_loaded"  # loading → warming → ready | unavailable | failed | disabled
+        self.model_load_seconds = None
         self.is_initialized = False
-        self.total_classifications = 0
-        self.productive_count = 0
-        self.unproductive_count = 0
-        self.confidence_scores = []
-        
+        self._load_task = None
+        # Contadores, média/variância, quantis e janelas em memória constante
+        self.stats = StatsEngine()
+        # Soma entre workers do mesmo servidor (STATS_BACKEND=sqlite, STATS_PATH)
+        self.shared_stats = SharedStats.from_env()
+        # Inferência roda fora do event loop (INFERENCE_POOL/INFERENCE_WORKERS/INFERENCE_QUEUE)
+        self.executor = BoundedExecutor.from_env(
+            "INFERENCE", workers=1, queue=16, process_initializer=_init_worker_pipeline
+        )
+        # Cache de resultados por hash do texto normalizado (RESULT_CACHE=memory|sqlite|off)
+        self.cache = build_cache_from_env()
+        # Pedidos concorrentes de classify_email viram um forward em lote (MICROBATCH=0 desliga)
+        self.batcher = (
+            MicroBatcher.from_env(self._run_pipeline) if os.getenv("MICROBATCH", "1") == "1" else None
+        )
+        # Quando o modelo pode ser pulado (CASCADE, CASCADE_KEYWORD_SCORE)
+        self.cascade = CascadePolicy.from_env()
+        # Regressão logística sobre n-gramas do texto pré-processado (LINEAR_MODEL)
+        self.linear = LinearModel.from_env()
+        # SimHash dos tokens: clusters para /clusters e, com NEAR_DUP=reuse, decisão de quase-duplicados
+        self.neardup = NearDuplicateIndex.from_env()
+
     async def initialize(self):
         """Initialize AI models"""
         if os.getenv("DISABLE_MODEL") == "1":
             self.classifier_pipeline = None
             self.model_loaded = False
+            self.model_state = "disabled"
             self.is_initialized = True
             logger.info("Model disabled by env (DISABLE_MODEL=1). Using keyword-only classification.")
             return
+
+        if MODEL_LOAD_MODE == "background":
+            # keywords atendem desde já; o modelo entra quando terminar o warm-up
+            self.is_initialized = True
+            self._load_task = asyncio.get_running_loop().create_task(self._load_model())
+            logger.info("Serving keyword-only classification while the model loads in background.")
+            return
+
+        await self._load_model()
+        self.is_initialized = True
+
+    async def _load_model(self):
+        """Carrega o modelo no pool de inferência e faz um forward de warm-up antes de liberá-lo."""
+        started = time.perf_counter()
         try:
             logger.info("Loading sentiment analysis model...")
-            
-            model_name = "cardiffnlp/twitter-roberta-base-sentiment-latest"
-            
-            device = -1
-            try:
-                import torch  # opcional
-                if torch.cuda.is_available():
-                    device = 0
-            except Exception:
-                # torch ausente ou indisponível → CPU
-                device = -1
-
-            # Tenta carregar o modelo; se falhar, usa somente regras/keywords
-            try:
-                self.classifier_pipeline = pipeline(
-                    "sentiment-analysis",
-                    model=model_name,
-                    tokenizer=model_name,
-                    device=device,
-                    max_length=512,
-                    truncation=True,
-                )
-                self.model_loaded = True
-            except Exception as e:
-                self.classifier_pipeline = None
-                self.model_loaded = False
-            
-            logger.info(f"Model loaded successfully on device: {get_device_info()}")
-            self.is_initialized = True
-            
+            self.model_state = "loading"
+
+            pipe = None
+            if self.executor.kind == "process":
+                # o pipeline vive nos workers; aqui só confirmamos que carregou
+                loaded = await self.executor.run(_worker_has_model)
+            else:
+                pipe = _preloaded_pipeline
+                if pipe is None:
+                    pipe = await self.executor.run(load_pipeline)
+                loaded = pipe is not None
+            if not loaded:
+                self.model_state = "unavailable"
+                logger.info("Using fallback keyword-based classification")
+                return
+
+            self.model_state = "warming"
+            if self.executor.kind == "process":
+                await self.executor.run(_worker_infer, [WARMUP_TEXT], 1)
+            else:
+                await self.executor.run(pipe, [WARMUP_TEXT], batch_size=1)
+                self.classifier_pipeline = pipe
+
+            self.model_loaded = True
+            self.model_state = "ready"
+            logger.info(f"Model loaded successfully on device: {get_device_info()} (backend: {INFERENCE_BACKEND})")
+
         except Exception as e:
+            self.model_state = "failed"
             logger.warning(f"Could not load transformer model: {e}")
             logger.info("Using fallback keyword-based classification")
-            self.is_initialized = True  # Still functional with keyword-based approach
+        finally:
+            self.model_load_seconds = round(time.perf_counter() - started, 3)
+
+    def _has_model(self) -> bool:
+        if self.executor.kind == "process":
+            return self.model_loaded
+        return self.classifier_pipeline is not None
+
+    def _model_pending(self) -> bool:
+        """Modelo ainda carregando/aquecendo em segundo plano (MODEL_LOAD_MODE=background)."""
+        return self._load_task is not None and not self._load_task.done()
+
+    async def _run_pipeline(self, texts: List[str]) -> List[Dict]:
+        """Roda o pipeline no pool de inferência (levanta PoolSaturated se lotado)."""
+        if self.executor.kind == "process":
+            return await self.executor.run(_worker_infer, texts, BATCH_SIZE)
+        return await self.executor.run(self.classifier_pipeline, texts, batch_size=BATCH_SIZE)
+
+    async def _run_pipeline_waiting(self, texts: List[str]) -> List[Dict]:
+        """Como _run_pipeline, mas espera vaga no pool em vez de levantar PoolSaturated."""
+        delay = 0.05
+        while True:
+            try:
+                return await self._run_pipeline(texts)
+            except PoolSaturated:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 1.0)
 
-    async def classify_email(self, processed_text: str, original_text: str) -> Dict:
+    async def _infer_many(self, texts: List[str]) -> List[Dict]:
+        """Inferência das janelas de um e-mail, coalescida com pedidos concorrentes quando há batcher."""
+        if self.batcher is not None:
+            if len(texts) == 1:
+                return [await self.batcher.submit(texts[0])]
+            return list(await asyncio.gather(*(self.batcher.submit(t) for t in texts)))
+        return await self._run_pipeline(texts)
+
+    def _model_inputs(self, original_text: str) -> List[str]:
+        """Truncado em 512 caracteres ou em janelas de tokens (LONG_EMAIL_MODE=chunked)."""
+        return model_inputs(original_text, pipeline_tokenizer(self.classifier_pipeline))
+
+    async def classify_email(self, processed_text: str, original_text: str,
+                             analysis: Optional[TextAnalysis] = None) -> Dict:
         """Classify email using hybrid approach: AI + Keywords"""
+        # Uma varredura do texto, reaproveitada por todas as etapas
+        if analysis is None:
+            analysis = analyze_text(original_text)
+
+        key = None
+        if self.cache is not None:
+            key = normalized_cache_key(analysis.normalized)
+            cached = self._cache_get(key)
+            if cached is not None:
+                count(SHORT_CIRCUITS, "cache")
+                return self._cached_result(cached, original_text)
+
+        # Quase-duplicado de um e-mail recente: herda a decisão da âncora do cluster
+        near = self._near_lookup(processed_text, analysis)
+        if near is not None and near[2]:
+            count(SHORT_CIRCUITS, "neardup")
+            return self._remember(key, self._neardup_result(near[1], analysis), analysis, near=near)
+
         # 0) Curto-circuito: felicitação/agradecimento sem pedido ⇒ Improdutivo
-        if is_greeting_no_action(original_text):
-            category = "Improdutivo"
-            confidence = 0.95
-            suggested = suggest_response(category, original_text)
-            self._update_stats(category, confidence)
-            return {
-                "category": category,
-                "confidence": confidence,
-                "original_text": original_text,
-                "suggested_response": suggested,
-            }
+        with stage("greeting"):
+            greeting = analysis.greeting_no_action
+        if greeting:
+            count(SHORT_CIRCUITS, "greeting")
+            return self._remember(key, self._greeting_result(analysis), analysis, full_text=True, near=near)
 
         try:
             # 1) Score por keywords deve usar o TEXTO ORIGINAL (lower)
-            keyword_result = calculate_keyword_score(original_text.lower())
+            with stage("keywords"):
+                keyword_result = calculate_keyword_score(analysis.lowered, analysis)
+            linear = self._linear_signal(processed_text, keyword_result)
 
             ai_category = None
             ai_confidence = 0.5
-            if self.classifier_pipeline:
+            if not self._has_model():
+                count(MODEL_CALLS, "unavailable")
+                if self._model_pending():
+                    key = near = None  # só keywords até o modelo ficar pronto: não fixa no cache nem no índice
+            elif not self.cascade.needs_model(keyword_result):
+                # keywords decisivas: o modelo não mudaria o resultado
+                count(SHORT_CIRCUITS, "keywords")
+            else:
                 try:
-                    text_for_ai = original_text[:512]
-                    ai_result = self.classifier_pipeline(text_for_ai)
-                    lbl = str(ai_result[0].get("label", "")).lower()
-                    ai_confidence = float(ai_result[0].get("score", 0.0))
-
-                    # Heurística robusta p/ rótulos possíveis do modelo (negative/neutral/positive ou LABEL_*)
-                    if "neg" in lbl or lbl == "label_0":
-                        ai_category = "Produtivo"      # negativo costuma indicar problema → ação
-                    elif "pos" in lbl or lbl == "label_2":
-                        ai_category = "Improdutivo"    # positivo tende a ser elogio/agradecimento
-                    else:
-                        ai_category = None             # neutral → não força decisão
+                    inputs = self._model_inputs(original_text)
+                    with stage("model"):
+                        ai_result = aggregate(await self._infer_many(inputs))
+                    ai_category, ai_confidence = self._map_ai_label(ai_result)
+                    count(MODEL_CALLS, "ok")
+                except PoolSaturated:
+                    raise
                 except Exception as e:
+                    count(MODEL_CALLS, "error")
                     logger.warning(f"AI classification failed: {e}")
+                    key = near = None  # não fixa no cache (nem no índice) um resultado degradado
 
-            # 3) Combinação
-            final_category, final_confidence = self._combine_results(
-                keyword_result, ai_category, ai_confidence
+            return self._remember(
+                key, self._finalize(analysis, keyword_result, ai_category, ai_confidence, linear), analysis,
+                near=near,
             )
 
-            # 4) Sugestão e métricas
-            suggested = suggest_response(final_category, original_text)  
-            self._update_stats(final_category, final_confidence)
-
-            return {
-                "category": final_category,
-                "confidence": final_confidence,
-                "original_text": original_text[:100] + "..." if len(original_text) > 100 else original_text,
-                "suggested_response": suggested,
-            }
-
+        except PoolSaturated:
+            raise
         except Exception as e:
             logger.exception(f"Classification error: {e}")
-            # Fallback seguro: usa keywords no TEXTO ORIGINAL, atualiza métricas e inclui sugestão
-            keyword_result = calculate_keyword_score(original_text.lower())
-            fallback_category = keyword_result.get("category", "Produtivo")
-            fallback_confidence = float(keyword_result.get("confidence", 0.5))
-            suggested = suggest_response(fallback_category, original_text)
-            self._update_stats(fallback_category, fallback_confidence)
-            return {
-                "category": fallback_category,
-                "confidence": fallback_confidence,
-                "original_text": original_text[:100] + "..." if len(original_text) > 100 else original_text,
-                "suggested_response": suggested,
-            }
-
-
-    def _combine_results(self, keyword_result: Dict, ai_category: str, ai_confidence: float) -> tuple:
+            return self._fallback_result(analysis)
+
+    async def classify_batch(self, processed_texts: List[str], original_texts: List[str],
+                             analyses: Optional[List[TextAnalysis]] = None,
+                             wait_for_pool: bool = False) -> List[Dict]:
+        """
+        Classify many emails at once. Greeting and decisive keyword cases are
+        resolved without the model; only the remaining texts go through the
+        pipeline, in mini-batches of BATCH_SIZE. Results keep the input order.
+
+        Com ``wait_for_pool`` um pool lotado faz o mini-lote esperar vaga em vez
+        de levantar PoolSaturated: os itens já decididos (stats, cache, índice)
+        não são refeitos, como aconteceria repetindo a chamada inteira.
+        """
+        run_pipeline = self._run_pipeline_waiting if wait_for_pool else self._run_pipeline
+        results: List[Optional[Dict]] = [None] * len(original_texts)
+        keys: List[Optional[str]] = [None] * len(original_texts)
+        nears: List[Optional[Tuple]] = [None] * len(original_texts)
+        pending = []  # (posição, análise, keyword_result, sinal linear)
+
+        for i, original_text in enumerate(original_texts):
+            analysis = analyses[i] if analyses is not None else analyze_text(original_text)
+            if self.cache is not None:
+                keys[i] = normalized_cache_key(analysis.normalized)
+                cached = self._cache_get(keys[i])
+                if cached is not None:
+                    count(SHORT_CIRCUITS, "cache")
+                    results[i] = self._cached_result(cached, original_text)
+                    continue
+            nears[i] = near = self._near_lookup(processed_texts[i], analysis)
+            if near is not None and near[2]:
+                count(SHORT_CIRCUITS, "neardup")
+                results[i] = self._remember(keys[i], self._neardup_result(near[1], analysis), analysis, near=near)
+                continue
+            with stage("greeting"):
+                greeting = analysis.greeting_no_action
+            if greeting:
+                count(SHORT_CIRCUITS, "greeting")
+                results[i] = self._remember(
+                    keys[i], self._greeting_result(analysis), analysis, full_text=True, near=near
+                )
+                continue
+            try:
+                with stage("keywords"):
+                    keyword_result = calculate_keyword_score(analysis.lowered, analysis)
+                linear = self._linear_signal(processed_texts[i], keyword_result)
+            except Exception as e:
+                logger.exception(f"Classification error: {e}")
+                results[i] = self._fallback_result(analysis)
+                continue
+            # keywords decisivas não gastam inferência (ver CascadePolicy)
+            if self._has_model() and self.cascade.needs_model(keyword_result):
+                pending.append((i, analysis, keyword_result, linear))
+            else:
+                if self._has_model():
+                    count(SHORT_CIRCUITS, "keywords")
+                else:
+                    count(MODEL_CALLS, "unavailable")
+                    if self._model_pending():
+                        keys[i] = nears[i] = None
+                results[i] = self._remember(
+                    keys[i], self._finalize(analysis, keyword_result, None, 0.5, linear), analysis,
+                    near=nears[i],
+                )
+
+        for start in range(0, len(pending), BATCH_SIZE):
+            chunk = pending[start:start + BATCH_SIZE]
+            ai_outputs = [(None, 0.5)] * len(chunk)
+            ai_ok = False
+            try:
+                # todas as janelas do mini-lote num forward só; depois agrega por e-mail
+                inputs = [self._model_inputs(original_texts[i]) for i, _, _, _ in chunk]
+                with stage("model"):
+                    flat = await run_pipeline([t for texts in inputs for t in texts])
+                ai_results, pos = [], 0
+                for texts in inputs:
+                    ai_results.append(aggregate(flat[pos:pos + len(texts)]))
+                    pos += len(texts)
+                ai_outputs = [self._map_ai_label(r) for r in ai_results]
+                ai_ok = True
+                count(MODEL_CALLS, "ok")
+            except PoolSaturated:
+                raise
+            except Exception as e:
+                count(MODEL_CALLS, "error")
+                logger.warning(f"AI batch classification failed: {e}")
+
+            for (i, analysis, keyword_result, linear), (ai_category, ai_confidence) in zip(chunk, ai_outputs):
+                try:
+                    results[i] = self._remember(
+                        keys[i] if ai_ok else None,
+                        self._finalize(analysis, keyword_result, ai_category, ai_confidence, linear),
+                        analysis,
+                        near=nears[i] if ai_ok else None,
+                    )
+                except Exception as e:
+                    logger.exception(f"Classification error: {e}")
+                    results[i] = self._fallback_result(analysis)
+
+        return results
+
+    @staticmethod
+    def _map_ai_label(ai_result: Dict) -> tuple:
+        """Mapeia a saída do pipeline (label/score) para (categoria, confiança)."""
+        lbl = str(ai_result.get("label", "")).lower()
+        ai_confidence = float(ai_result.get("score", 0.0))
+
+        # Heurística robusta p/ rótulos possíveis do modelo (negative/neutral/positive ou LABEL_*)
+        if "neg" in lbl or lbl == "label_0":
+            ai_category = "Produtivo"      # negativo costuma indicar problema → ação
+        elif "pos" in lbl or lbl == "label_2":
+            ai_category = "Improdutivo"    # positivo tende a ser elogio/agradecimento
+        else:
+            ai_category = None             # neutral → não força decisão
+        return ai_category, ai_confidence
+
+    def _greeting_result(self, analysis: TextAnalysis) -> Dict:
+        original_text = analysis.text
+        category = "Improdutivo"
+        confidence = 0.95
+        suggested = suggest_response(category, original_text, analysis)
+        self._update_stats(category, confidence)
+        count(DECISIONS, "greeting")
+        return {
+            "category": category,
+            "confidence": confidence,
+            "original_text": original_text,
+            "suggested_response": suggested,
+            "decided_by": "greeting",
+        }
+
+    def _finalize(self, analysis: TextAnalysis, keyword_result: Dict,
+                  ai_category: Optional[str], ai_confidence: float,
+                  linear: Optional[Tuple[str, float]] = None) -> Dict:
+        original_text = analysis.text
+        # 3) Combinação
+        with stage("combine"):
+            final_category, final_confidence, decided_by = self._decide(
+                keyword_result, ai_category, ai_confidence, linear
+            )
+
+        # 4) Sugestão e métricas
+        with stage("suggest"):
+            suggested = suggest_response(final_category, original_text, analysis)
+        self._update_stats(final_category, final_confidence, self._stat_intent(final_category, analysis))
+        count(DECISIONS, decided_by)
+
+        return {
+            "category": final_category,
+            "confidence": final_confidence,
+            "original_text": original_text[:100] + "..." if len(original_text) > 100 else original_text,
+            "suggested_response": suggested,
+            "decided_by": decided_by,
+        }
+
+    def _remember(self, key: Optional[str], result: Dict, analysis: TextAnalysis,
+                  full_text: bool = False, near: Optional[Tuple] = None) -> Dict:
+        """
+        Guarda o resultado no cache (sem o texto, que é refeito a cada hit) e,
+        com ``near`` (de _near_lookup), registra o e-mail no índice de quase-duplicados.
+        """
+        if near is not None:
+            fp, cluster, reused, signature = near
+            self.neardup.add(fp, cluster, None if reused else result, analysis.text, reused=reused,
+                             signature=signature)
+        if key is not None and self.cache is not None:
+            self.cache.set(key, {
+                "category": result["category"],
+                "confidence": result["confidence"],
+                "suggested_response": result["suggested_response"],
+                "intent": self._stat_intent(result["category"], analysis),
+                "full_text": full_text,
+                "templates": RESPONSES.version,
+                "fingerprint": near[0] if near is not None else None,
+                "signature": near[3] if near is not None else 0,
+            })
+        return result
+
+    def _near_lookup(self, processed_text: str,
+                     analysis: TextAnalysis) -> Optional[Tuple[int, Optional[Cluster], bool, int]]:
+        """
+        (impressão, cluster mais próximo, se a decisão dele vale aqui, reuse_signature do e-mail)
+        ou None sem índice/tokens. A assinatura vem do texto original: o preprocess descarta
+        negações e "?".
+        """
+        if self.neardup is None:
+            return None
+        with stage("neardup"):
+            fp = self.neardup.fingerprint(processed_text)
+            if fp is None:
+                return None
+            signature = reuse_signature(analysis.lowered, analysis.has_question, analysis.greeting_no_action)
+            cluster, reusable = self.neardup.match(fp, signature=signature)
+        return fp, cluster, reusable, signature
+
+    def _neardup_result(self, cluster: Cluster, analysis: TextAnalysis) -> Dict:
+        original_text = analysis.text
+        category, confidence = cluster.category, cluster.confidence
+        # a decisão é do cluster; a resposta usa os campos (chamado, NF) deste e-mail
+        with stage("suggest"):
+            suggested = suggest_response(category, original_text, analysis)
+        self._update_stats(category, confidence, self._stat_intent(category, analysis))
+        count(DECISIONS, "neardup")
+        return {
+            "category": category,
+            "confidence": confidence,
+            "original_text": original_text[:100] + "..." if len(original_text) > 100 else original_text,
+            "suggested_response": suggested,
+            "decided_by": "neardup",
+        }
+
+    def _cache_get(self, key: str) -> Optional[Dict]:
+        cached = self.cache.get(key)
+        # resposta gerada com outra versão dos modelos (arquivo recarregado): refaz
+        if cached is not None and cached.get("templates") != RESPONSES.version:
+            return None
+        return cached
+
+    @staticmethod
+    def _stat_intent(category: str, analysis: TextAnalysis) -> Optional[str]:
+        # a intenção só é calculada (e usada na resposta) para e-mails produtivos
+        return analysis.intent if category == "Produtivo" else None
+
+    def _cached_result(self, cached: Dict, original_text: str) -> Dict:
+        self._update_stats(cached["category"], cached["confidence"], cached.get("intent"))
+        count(DECISIONS, "cache")
+        fp = cached.get("fingerprint")
+        if self.neardup is not None and fp is not None:
+            # repetição exata também conta no cluster (visão de /clusters)
+            signature = cached.get("signature", 0)
+            cluster, _ = self.neardup.match(fp, signature=signature)
+            self.neardup.add(fp, cluster, cached, original_text, signature=signature)
+        if cached.get("full_text") or len(original_text) <= 100:
+            shown = original_text
+        else:
+            shown = original_text[:100] + "..."
+        return {
+            "category": cached["category"],
+            "confidence": cached["confidence"],
+            "original_text": shown,
+            "suggested_response": cached["suggested_response"],
+            "decided_by": "cache",
+        }
+
+    def _fallback_result(self, analysis: TextAnalysis) -> Dict:
+        original_text = analysis.text
+        # Fallback seguro: usa keywords no TEXTO ORIGINAL, atualiza métricas e inclui sugestão
+        keyword_result = calculate_keyword_score(analysis.lowered, analysis)
+        fallback_category = keyword_result.get("category", "Produtivo")
+        fallback_confidence = float(keyword_result.get("confidence", 0.5))
+        suggested = suggest_response(fallback_category, original_text, analysis)
+        self._update_stats(fallback_category, fallback_confidence, self._stat_intent(fallback_category, analysis))
+        count(DECISIONS, "fallback")
+        return {
+            "category": fallback_category,
+            "confidence": fallback_confidence,
+            "original_text": original_text[:100] + "..." if len(original_text) > 100 else original_text,
+            "suggested_response": suggested,
+            "decided_by": "fallback",
+        }
+
+    def _combine_results(self, keyword_result: Dict, ai_category: str, ai_confidence: float,
+                         linear: Optional[Tuple[str, float]] = None) -> tuple:
         """Combine keyword and AI classification results"""
+        category, confidence, _ = self._decide(keyword_result, ai_category, ai_confidence, linear)
+        return category, confidence
+
+    def _linear_signal(self, processed_text: str, keyword_result: Dict) -> Optional[Tuple[str, float]]:
+        """(categoria, confiança) do modelo linear; só roda quando as keywords não decidem sozinhas."""
+        if self.linear is None or keyword_result["score"] >= KEYWORD_DECISIVE_SCORE:
+            return None
+        with stage("linear"):
+            return self.linear.classify(processed_text)
+
+    @staticmethod
+    def _decide(keyword_result: Dict, ai_category: Optional[str], ai_confidence: float,
+                linear: Optional[Tuple[str, float]] = None) -> tuple:
+        """
+        (categoria, confiança, etapa que decidiu: keywords | model | hybrid | linear)
+
+        O modelo linear só entra quando o transformer não deu um resultado
+        confiante (indisponível, neutro ou abaixo de 0.7).
+        """
         keyword_category = keyword_result['category']
         keyword_confidence = keyword_result['confidence']
         keyword_score = keyword_result['score']
         
-        if keyword_score >= 3:  
-            return keyword_category, min(0.85 + (keyword_score * 0.03), 0.95)
+        if keyword_score >= KEYWORD_DECISIVE_SCORE:
+            return keyword_category, min(0.85 + (keyword_score * 0.03), 0.95), "keywords"
         
         if ai_category and ai_confidence > 0.7:
             if ai_category == keyword_category:
                 
                 combined_confidence = min(0.8 + (ai_confidence * 0.15), 0.95)
-                return keyword_category, combined_confidence
+                return keyword_category, combined_confidence, "hybrid"
             else:
                 
                 if keyword_confidence > ai_confidence:
-                    return keyword_category, keyword_confidence
+                    return keyword_category, keyword_confidence, "keywords"
                 else:
-                    return ai_category, ai_confidence
-        
-        return keyword_category, keyword_confidence
+                    return ai_category, ai_confidence, "model"
+
+        if linear is not None and linear[1] > LINEAR_MIN_CONFIDENCE:
+            linear_category, linear_confidence = linear
+            if linear_category == keyword_category:
+                return keyword_category, min(0.75 + (linear_confidence * 0.15), 0.9), "hybrid"
+            if linear_confidence > keyword_confidence:
+                return linear_category, linear_confidence, "linear"
+
+        return keyword_category, keyword_confidence, "keywords"
 
 
-    def _update_stats(self, category: str, confidence: float):
+    def _update_stats(self, category: str, confidence: float, intent: Optional[str] = None):
         """Update classification statistics"""
-        self.total_classifications += 1
-        self.confidence_scores.append(confidence)
-        
-        if category == 'Produtivo':
-            self.productive_count += 1
-        else:
-            self.unproductive_count += 1
+        self.stats.record(category, confidence, intent)
+        count(CLASSIFICATIONS, category)
+
+    @property
+    def total_classifications(self) -> int:
+        return self.stats.total
+
+    @property
+    def productive_count(self) -> int:
+        return self.stats.by_category.get('Produtivo', 0)
+
+    @property
+    def unproductive_count(self) -> int:
+        return self.stats.total - self.productive_count
+
+    def aggregated_stats(self) -> StatsEngine:
+        """Estatísticas deste processo ou, com estatísticas compartilhadas, de todos os workers."""
+        if self.shared_stats is None:
+            return self.stats
+        self.shared_stats.publish(self.stats)
+        return self.shared_stats.collect(self.stats.buckets)
 
     def get_average_confidence(self) -> float:
         """Get average confidence score"""
-        if not self.confidence_scores:
-            return 0.0
-        return sum(self.confidence_scores) / len(self.confidence_scores)
\ No newline at end of file
+        return self.stats.mean
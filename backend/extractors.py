@@ -0,0 +1,506 @@
+"""
+Extração de texto de anexos: um extrator por formato, escolhido pelo conteúdo.
+
+O formato vem dos bytes (assinatura no início do arquivo, estrutura do zip,
+cabeçalhos RFC 822, marcação HTML) e não da extensão do nome: um PDF chamado
+``nota.txt`` é lido como PDF, e um ``.docx`` que na verdade é texto é lido
+como texto. A extensão só desempata entre formatos de texto puro (csv/txt).
+
+Novos formatos entram com ``@register``::
+
+    @register("rtf", extensions=(".rtf",), sniff=lambda content: content.startswith(b"{\\rtf"))
+    def _extract_rtf(content: bytes, limits: ExtractLimits, info: Dict) -> str:
+        ...
+
+O texto extraído fica num cache por hash do conteúdo (EXTRACT_CACHE): o
+mesmo PDF anexado a uma thread inteira, ou reenviado depois de um erro, é
+lido uma vez só.
+"""
+import codecs
+import csv
+import hashlib
+import io
+import logging
+import os
+import re
+import time
+import zipfile
+from email import policy
+from email.parser import BytesParser
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+from xml.etree import ElementTree
+
+from .cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+# Limites da extração (0 desliga o respectivo limite)
+EXTRACT_CHAR_BUDGET = int(os.getenv("EXTRACT_CHAR_BUDGET", "20000"))
+EXTRACT_MAX_PAGES = int(os.getenv("EXTRACT_MAX_PAGES", "50"))
+EXTRACT_TIME_LIMIT = float(os.getenv("EXTRACT_TIME_LIMIT", "10"))
+# Bytes do início do arquivo usados para detectar formato e encoding
+SNIFF_BYTES = int(os.getenv("EXTRACT_SNIFF_BYTES", str(64 * 1024)))
+# Anexos dentro de anexos (.eml encaminhado com .eml anexado...)
+MAX_DEPTH = 3
+# word/document.xml descompactado acima disso é recusado (zip bomb)
+DOCX_MAX_XML = 64 * 1024 * 1024
+
+
+class ExtractLimits(NamedTuple):
+    char_budget: int = EXTRACT_CHAR_BUDGET
+    max_pages: int = EXTRACT_MAX_PAGES
+    time_limit: float = EXTRACT_TIME_LIMIT
+    depth: int = 0
+
+
+class Extractor(NamedTuple):
+    name: str
+    extensions: Tuple[str, ...]
+    sniff: Optional[Callable[[bytes], bool]]  # None: formato de texto, escolhido pela extensão
+    extract: Callable[[bytes, ExtractLimits, Dict], str]
+    cache: bool  # vale guardar o resultado (parse caro) ou é mais barato refazer
+
+
+# Ordem de registro = ordem de detecção
+EXTRACTORS: Dict[str, Extractor] = {}
+
+
+def register(name: str, extensions: Tuple[str, ...] = (), sniff: Optional[Callable[[bytes], bool]] = None,
+             cache: bool = True):
+    """Registra ``fn(content, limits, info) -> texto`` como extrator do formato ``name``."""
+    def decorator(fn):
+        EXTRACTORS[name] = Extractor(name, tuple(extensions), sniff, fn, cache)
+        return fn
+    return decorator
+
+
+def _extension(filename: str) -> str:
+    name = (filename or "").lower()
+    return name[name.rfind("."):] if "." in name else ""
+
+
+def detect_format(content: bytes, filename: str = "") -> Extractor:
+    """Extrator para ``content``; ValueError se for binário sem extrator registrado."""
+    for extractor in EXTRACTORS.values():
+        if extractor.sniff is not None and extractor.sniff(content):
+            return extractor
+    binary = content.find(b"\x00", 0, SNIFF_BYTES) != -1
+    if binary and not content.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        raise ValueError(f"Formato de arquivo não suportado: {filename}")
+    ext = _extension(filename)
+    for extractor in EXTRACTORS.values():
+        if extractor.sniff is None and ext in extractor.extensions:
+            return extractor
+    return EXTRACTORS["txt"]
+
+
+# --- encoding ---
+
+# 0x80-0x9F: aspas curvas, travessão e reticências no cp1252; controles sem uso no latin-1.
+# Um ``in`` por byte (memchr) custa bem menos que um regex sobre os 64 KB da amostra.
+_C1_BYTES = range(0x80, 0xA0)
+
+
+def detect_encoding(sample: bytes, complete: bool = False) -> str:
+    """
+    Encoding provável a partir de uma amostra do início do arquivo: BOM,
+    senão UTF-8 se a amostra for UTF-8 válido (o decoder incremental aceita
+    um caractere cortado no fim da amostra, a menos que ``complete`` diga que
+    a amostra é o arquivo inteiro), senão cp1252/latin-1.
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=complete)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    return "cp1252" if any(b in sample for b in _C1_BYTES) else "latin-1"
+
+
+def decode_text(content: bytes, encoding: Optional[str] = None) -> Tuple[str, str]:
+    """(texto, encoding): decodifica o arquivo inteiro uma vez, com o encoding detectado na amostra."""
+    if encoding is None and not content.startswith(codecs.BOM_UTF8):
+        try:
+            return content.decode("utf-8"), "utf-8"  # caso comum: sem amostra nem segunda passada
+        except UnicodeDecodeError:
+            pass
+    encoding = encoding or detect_encoding(content[:SNIFF_BYTES], complete=len(content) <= SNIFF_BYTES)
+    return content.decode(encoding, errors="replace"), encoding
+
+
+def _budget(text: str, limits: ExtractLimits, info: Dict) -> str:
+    if limits.char_budget and len(text) > limits.char_budget:
+        info["stop_reason"] = "budget"
+        return text[:limits.char_budget]
+    return text
+
+
+# --- PDF ---
+
+def iter_pdf_pages(file_content: bytes, max_pages: int = 0, time_limit: float = 0,
+                   info: Optional[Dict] = None) -> Iterator[str]:
+    """
+    Gera o texto de cada página sob demanda; para no limite de páginas ou de tempo.
+    Se ``info`` for passado, registra ``pages_total`` e ``stop_reason`` ("pages"/"time").
+    """
+    from PyPDF2 import PdfReader  # adiado: só quem extrai PDF paga o import
+
+    reader = PdfReader(io.BytesIO(file_content))
+    total = len(reader.pages)
+    if info is not None:
+        info["pages_total"] = total
+    deadline = time.monotonic() + time_limit if time_limit else None
+    for i in range(total):
+        if max_pages and i >= max_pages:
+            if info is not None:
+                info["stop_reason"] = "pages"
+            return
+        if deadline is not None and time.monotonic() > deadline:
+            if info is not None:
+                info["stop_reason"] = "time"
+            return
+        yield reader.pages[i].extract_text() or ""
+
+
+@register("pdf", extensions=(".pdf",), sniff=lambda content: content.find(b"%PDF-", 0, 1024) != -1)
+def _extract_pdf(content: bytes, limits: ExtractLimits, info: Dict) -> str:
+    """Página a página até juntar ``char_budget`` caracteres."""
+    pages = []
+    gathered = 0
+    for page_text in iter_pdf_pages(content, limits.max_pages, limits.time_limit, info):
+        pages.append(page_text)
+        gathered += len(page_text) + 1
+        if limits.char_budget and gathered >= limits.char_budget:
+            info["stop_reason"] = "budget"
+            break
+    info["pages"] = len(pages)
+    text = "\n".join(pages).strip()
+    if limits.char_budget:
+        text = text[:limits.char_budget]
+    if not text:
+        raise ValueError("Não foi possível extrair texto do PDF (páginas vazias).")
+    return text
+
+
+# --- DOCX (zip com word/document.xml; sem python-docx) ---
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P, _W_T, _W_TAB, _W_BR, _W_CR = _W + "p", _W + "t", _W + "tab", _W + "br", _W + "cr"
+
+
+def _is_docx(content: bytes) -> bool:
+    if not content.startswith(b"PK\x03\x04"):
+        return False
+    try:
+        with zipfile.ZipFile(io.BytesIO(content)) as zf:
+            zf.getinfo("word/document.xml")
+        return True
+    except (zipfile.BadZipFile, KeyError):
+        return False
+
+
+@register("docx", extensions=(".docx",), sniff=_is_docx)
+def _extract_docx(content: bytes, limits: ExtractLimits, info: Dict) -> str:
+    """Parágrafos de word/document.xml, lidos em streaming até ``char_budget``."""
+    paragraphs = []
+    gathered = 0
+    with zipfile.ZipFile(io.BytesIO(content)) as zf:
+        member = zf.getinfo("word/document.xml")
+        if member.file_size > DOCX_MAX_XML:
+            raise ValueError(f"Documento .docx grande demais ({member.file_size} bytes descompactados).")
+        with zf.open(member) as xml:
+            for _, elem in ElementTree.iterparse(xml):
+                if elem.tag != _W_P:
+                    continue
+                parts = []
+                for node in elem.iter():
+                    if node.tag == _W_T:
+                        parts.append(node.text or "")
+                    elif node.tag == _W_TAB:
+                        parts.append("\t")
+                    elif node.tag in (_W_BR, _W_CR):
+                        parts.append("\n")
+                elem.clear()  # parágrafos aninhados (tabelas, caixas de texto) não se repetem
+                paragraph = "".join(parts).strip()
+                if not paragraph:
+                    continue
+                paragraphs.append(paragraph)
+                gathered += len(paragraph) + 1
+                if limits.char_budget and gathered >= limits.char_budget:
+                    info["stop_reason"] = "budget"
+                    break
+    info["paragraphs"] = len(paragraphs)
+    return _budget("\n".join(paragraphs), limits, info)
+
+
+# --- e-mail (.eml, message/rfc822) ---
+
+_HEADER_LINE_RE = re.compile(rb"[!-9;-~]+:")
+_KNOWN_HEADERS = (b"from:", b"to:", b"subject:", b"date:", b"received:", b"message-id:",
+                  b"mime-version:", b"return-path:", b"content-type:", b"delivered-to:")
+
+
+def _is_email(content: bytes) -> bool:
+    """Bloco de cabeçalhos RFC 822 no início, com pelo menos dois cabeçalhos conhecidos."""
+    if not content.startswith((b" ", b"\t")) and not _HEADER_LINE_RE.match(content):
+        return False  # texto comum: nem separa as linhas
+    known = 0
+    for line in content[:4096].splitlines()[:30]:
+        if not line.strip():
+            break
+        if line[:1] in (b" ", b"\t"):  # continuação do cabeçalho anterior
+            continue
+        if not _HEADER_LINE_RE.match(line):
+            return False
+        known += line.lower().startswith(_KNOWN_HEADERS)
+    return known >= 2
+
+
+def _part_text(part) -> str:
+    try:
+        return part.get_content()
+    except Exception:
+        payload = part.get_payload(decode=True) or b""
+        return payload.decode(part.get_content_charset() or "utf-8", errors="replace")
+
+
+def _attachment_bytes(part) -> bytes:
+    if part.get_content_type() == "message/rfc822":
+        inner = part.get_payload()
+        return (inner[0] if isinstance(inner, list) else inner).as_bytes()
+    return part.get_payload(decode=True) or b""
+
+
+def parse_message(raw: bytes, limits: Optional[ExtractLimits] = None) -> Dict:
+    """
+    Assunto, Message-ID, texto (corpo preferindo text/plain + anexos em formatos
+    registrados) e os nomes dos anexos extraídos.
+    """
+    limits = limits or ExtractLimits()
+    msg = BytesParser(policy=policy.default).parsebytes(raw)
+    parts = []
+    subject = str(msg.get("subject", "") or "").strip()
+    if subject:
+        parts.append(subject)
+
+    body = msg.get_body(preferencelist=("plain", "html"))
+    if body is not None:
+        text = _part_text(body)
+        parts.append(html_to_text(text) if body.get_content_subtype() == "html" else text)
+
+    attachments = []
+    if limits.depth < MAX_DEPTH:
+        inner = limits._replace(depth=limits.depth + 1)
+        for part in msg.iter_attachments():
+            filename = part.get_filename() or ""
+            try:
+                text, _ = _extract(_attachment_bytes(part), filename, inner)
+            except Exception as e:
+                logger.info(f"Anexo {filename or part.get_content_type()} ignorado: {e}")
+                continue
+            attachments.append(filename or part.get_content_type())
+            parts.append(text)
+
+    return {
+        "subject": subject,
+        "message_id": str(msg.get("message-id", "") or "").strip(),
+        "text": "\n\n".join(p.strip() for p in parts if p and p.strip()),
+        "attachments": attachments,
+    }
+
+
+@register("eml", extensions=(".eml",), sniff=_is_email)
+def _extract_eml(content: bytes, limits: ExtractLimits, info: Dict) -> str:
+    message = parse_message(content, limits)
+    info["attachments"] = message["attachments"]
+    return message["text"]
+
+
+# --- HTML ---
+
+_HTML_START_RE = re.compile(rb"\s*(<!--.*?-->\s*)*<(!doctype\s+html|html|head|body)\b", re.I | re.S)
+_META_CHARSET_RE = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+_BLOCK_TAGS = frozenset({
+    "address", "article", "blockquote", "br", "dd", "div", "dl", "dt", "footer", "h1", "h2", "h3",
+    "h4", "h5", "h6", "header", "hr", "li", "ol", "p", "pre", "section", "table", "td", "th", "tr", "ul",
+})
+_SKIP_TAGS = frozenset({"head", "script", "style", "template"})
+_SPACES_RE = re.compile(r"[ \t\r\f\v\xa0]+")
+
+
+class _HTMLText(HTMLParser):
+    """Texto visível: ignora head/script/style e quebra linha nos elementos de bloco."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.chars = 0
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+            self.chars += len(data)
+
+
+def _html_text(markup: str, limit: int = 0) -> Tuple[str, bool]:
+    """(texto, se parou antes do fim): com ``limit``, o parse para ao juntar esse tanto de texto."""
+    parser = _HTMLText()
+    step = 64 * 1024
+    truncated = False
+    for start in range(0, len(markup), step):
+        parser.feed(markup[start:start + step])
+        if limit and parser.chars >= limit and start + step < len(markup):
+            truncated = True
+            break
+    else:
+        parser.close()
+    lines = (_SPACES_RE.sub(" ", line).strip() for line in "".join(parser.parts).split("\n"))
+    return "\n".join(line for line in lines if line), truncated
+
+
+def html_to_text(markup: str) -> str:
+    return _html_text(markup)[0]
+
+
+def _html_encoding(head: bytes) -> Optional[str]:
+    """Charset declarado no <meta>, se o Python conhecer; BOM tem precedência."""
+    if head.startswith((codecs.BOM_UTF8, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return None
+    match = _META_CHARSET_RE.search(head)
+    if match is None:
+        return None
+    try:
+        return codecs.lookup(match.group(1).decode("ascii")).name
+    except LookupError:
+        return None
+
+
+def _is_html(content: bytes) -> bool:
+    head = content[:1024]
+    if head.startswith(codecs.BOM_UTF8):
+        head = head[3:]
+    return _HTML_START_RE.match(head) is not None
+
+
+@register("html", extensions=(".html", ".htm"), sniff=_is_html)
+def _extract_html(content: bytes, limits: ExtractLimits, info: Dict) -> str:
+    markup, info["encoding"] = decode_text(content, _html_encoding(content[:SNIFF_BYTES]))
+    text, truncated = _html_text(markup, limits.char_budget)
+    if truncated:
+        info["stop_reason"] = "budget"
+    return _budget(text, limits, info)
+
+
+# --- texto puro (sem assinatura: a extensão decide) ---
+
+@register("csv", extensions=(".csv", ".tsv"))
+def _extract_csv(content: bytes, limits: ExtractLimits, info: Dict) -> str:
+    """Uma linha por registro, células não vazias separadas por espaço."""
+    text, info["encoding"] = decode_text(content)
+    try:
+        dialect = csv.Sniffer().sniff(text[:8192], delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    rows = []
+    gathered = 0
+    for row in csv.reader(io.StringIO(text), dialect):
+        line = " ".join(cell.strip() for cell in row if cell.strip())
+        if not line:
+            continue
+        rows.append(line)
+        gathered += len(line) + 1
+        if limits.char_budget and gathered >= limits.char_budget:
+            info["stop_reason"] = "budget"
+            break
+    info["rows"] = len(rows)
+    return _budget("\n".join(rows), limits, info)
+
+
+@register("txt", extensions=(".txt",), cache=False)
+def _extract_txt(content: bytes, limits: ExtractLimits, info: Dict) -> str:
+    text, info["encoding"] = decode_text(content)
+    return text
+
+
+# --- cache e ponto de entrada ---
+
+def _cache_from_env() -> Optional[ResultCache]:
+    """EXTRACT_CACHE=on|off, EXTRACT_CACHE_ENTRIES, EXTRACT_CACHE_MB, EXTRACT_CACHE_TTL (s)."""
+    if os.getenv("EXTRACT_CACHE", "on").lower() in ("off", "0", "false", "none"):
+        return None
+    return ResultCache(
+        max_entries=int(os.getenv("EXTRACT_CACHE_ENTRIES", "256")),
+        max_bytes=int(float(os.getenv("EXTRACT_CACHE_MB", "16")) * 1024 * 1024),
+        ttl=float(os.getenv("EXTRACT_CACHE_TTL", "3600")),
+    )
+
+
+EXTRACTION_CACHE = _cache_from_env()
+
+
+def _extract(content: bytes, filename: str, limits: ExtractLimits) -> Tuple[str, Dict]:
+    started = time.perf_counter()
+    extractor = detect_format(content, filename)
+    key = None
+    text = None
+    if EXTRACTION_CACHE is not None and extractor.cache:
+        key = f"{hashlib.sha256(content).hexdigest()}:{limits.char_budget}:{limits.max_pages}:{limits.depth}"
+        hit = EXTRACTION_CACHE.get(key)
+        if hit is not None:
+            text, info = hit["text"], {**hit["info"], "cached": True}
+    if text is None:
+        info = {"format": extractor.name, "stop_reason": None}
+        text = extractor.extract(content, limits, info)
+        info["chars"] = len(text)
+        if key is not None and info["stop_reason"] != "time":  # corte por tempo depende da carga: não guarda
+            EXTRACTION_CACHE.set(key, {"text": text, "info": dict(info)})
+        info["cached"] = False
+
+    ext = _extension(filename)
+    if ext and ext not in extractor.extensions:
+        info["declared_format"] = ext.lstrip(".")
+    info["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return text, info
+
+
+def extract_text_with_info(file_content: bytes, filename: str,
+                           char_budget: Optional[int] = None,
+                           max_pages: Optional[int] = None,
+                           time_limit: Optional[float] = None) -> Tuple[str, Dict]:
+    """
+    Igual a extract_text_from_file, devolvendo também métricas da extração
+    (formato detectado, páginas/parágrafos/linhas lidas, caracteres, tempo em
+    ms, motivo de parada e se veio do cache).
+    """
+    limits = ExtractLimits(
+        EXTRACT_CHAR_BUDGET if char_budget is None else char_budget,
+        EXTRACT_MAX_PAGES if max_pages is None else max_pages,
+        EXTRACT_TIME_LIMIT if time_limit is None else time_limit,
+    )
+    return _extract(file_content, filename, limits)
+
+
+def extract_text_from_file(file_content: bytes, filename: str) -> str:
+    """Extrai texto de PDF, DOCX, e-mail, HTML, CSV ou texto puro (formato detectado pelo conteúdo)."""
+    return extract_text_with_info(file_content, filename)[0]
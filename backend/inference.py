@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class OnnxSentimentPipeline:
+    """
+    Backend ONNX Runtime com o mesmo contrato do pipeline "sentiment-analysis"
+    do transformers: ``pipe(texts, batch_size=...) -> [{"label", "score"}]``.
+
+    ``model_dir`` é um diretório local no formato do Hugging Face (config.json +
+    arquivos do tokenizer) contendo também o ``model.onnx`` exportado. Com
+    ``quantize=True`` usa ``model.int8.onnx``, gerado por quantização dinâmica
+    int8 na primeira vez se ainda não existir.
+    """
+
+    def __init__(self, model_dir: str, quantize: bool = False, threads: Optional[int] = None,
+                 max_length: int = 512):
+        import numpy as np
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self._np = np
+        self.model_dir = Path(model_dir)
+        self.max_length = max_length
+        self.model_path = self.model_dir / "model.onnx"
+        if not self.model_path.exists():
+            raise FileNotFoundError(f"model.onnx não encontrado em {self.model_dir}")
+        if quantize:
+            self.model_path = quantize_onnx(self.model_path)
+
+        config = json.loads((self.model_dir / "config.json").read_text(encoding="utf-8"))
+        self.id2label = {int(k): v for k, v in config.get("id2label", {}).items()}
+
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.model_dir))
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(self.model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = [i.name for i in self.session.get_inputs()]
+
+    def __call__(self, texts: Union[str, List[str]], batch_size: int = 16, **kwargs) -> List[Dict]:
+        if isinstance(texts, str):
+            texts = [texts]
+        np = self._np
+        results = []
+        for start in range(0, len(texts), max(1, batch_size)):
+            chunk = texts[start:start + batch_size]
+            enc = self.tokenizer(
+                chunk, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+            )
+            feeds = {name: enc[name].astype(np.int64) for name in self._input_names if name in enc}
+            logits = self.session.run(None, feeds)[0]
+            logits = logits - logits.max(axis=-1, keepdims=True)
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=-1, keepdims=True)
+            for row in probs:
+                idx = int(row.argmax())
+                results.append({"label": self.id2label.get(idx, f"LABEL_{idx}"), "score": float(row[idx])})
+        return results
+
+
+def quantize_onnx(model_path: Path) -> Path:
+    """Quantização dinâmica int8 (pesos) ao lado do modelo original; reaproveita se já existir."""
+    target = model_path.with_name(model_path.stem + ".int8.onnx")
+    if not target.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info(f"Quantizando {model_path.name} → {target.name} (int8 dinâmico)...")
+        quantize_dynamic(str(model_path), str(target), weight_type=QuantType.QInt8)
+    return target
+
+
+def export_onnx(model_dir: str, opset: int = 14) -> Path:
+    """Exporta ``model_dir`` (PyTorch/HF) para ``model_dir/model.onnx`` — offline, sem rede."""
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    model_dir = Path(model_dir)
+    target = model_dir / "model.onnx"
+    tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+    model = AutoModelForSequenceClassification.from_pretrained(str(model_dir)).eval()
+    sample = tokenizer(["exportação"], return_tensors="pt")
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic = {n: {0: "batch", 1: "sequence"} for n in names}
+    dynamic["logits"] = {0: "batch"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model, tuple(sample[n] for n in names), str(target),
+            input_names=names, output_names=["logits"], dynamic_axes=dynamic, opset_version=opset,
+        )
+    return target
+
+
+def inference_threads() -> Optional[int]:
+    value = os.getenv("INFERENCE_THREADS")
+    return int(value) if value else None
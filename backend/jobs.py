@@ -0,0 +1,282 @@
+import asyncio
+import fnmatch
+import heapq
+import ipaddress
+import itertools
+import json
+import logging
+import os
+import socket
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .metrics import JOB_RUN_SECONDS, JOB_WAIT_SECONDS, JOBS, count, observe
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class JobQueueFull(RuntimeError):
+    """Fila de jobs cheia: o pedido é recusado na hora (o app responde 503)."""
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Callback não segue redirect: um 3xx poderia apontar para um host interno."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_CALLBACK_OPENER = urllib.request.build_opener(_NoRedirect)
+
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+class Job:
+    """Um pedido assíncrono: itens (textos ou arquivos) classificados em segundo plano."""
+
+    def __init__(self, items: List[Dict], priority: str = "normal", callback_url: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.items = items  # {"text": ...} ou {"filename": ..., "content": bytes}; esvaziado ao terminar
+        self.size = len(items)
+        self.nbytes = sum(len(it.get("content") or b"") + len(it.get("text") or "") for it in items)
+        self.seq = 0
+        self.priority = priority
+        self.callback_url = callback_url
+        self.state = "queued"  # queued → running → done | failed
+        self.results: List[Dict] = []
+        self.error: Optional[str] = None
+        self.callback_status: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "priority": self.priority,
+            "items": self.size,
+            "results": self.results if self.state in ("done", "failed") else None,
+            "error": self.error,
+            "callback_url": self.callback_url,
+            "callback_status": self.callback_status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    Fila de jobs com prioridade e tamanho limitado, atendida por ``workers``
+    tarefas asyncio no mesmo event loop do app.
+
+    ``process(job)`` devolve a lista de resultados do job. Os jobs ficam
+    consultáveis até ``ttl`` segundos depois de terminarem. Quando há
+    ``callback_url``, o resultado é enviado por POST (JSON) ao terminar.
+
+    A fila é limitada em jobs (``max_queue``) e em bytes (``max_bytes``:
+    textos e arquivos de jobs na fila ou rodando, liberados ao terminar).
+    Callbacks só vão para ``callback_hosts`` (padrões como ``*.exemplo.com``)
+    ou, sem lista, para hosts que resolvem apenas para IPs públicos.
+    """
+
+    def __init__(self, process: Callable[[Job], Awaitable[List[Dict]]], workers: int = 2,
+                 max_queue: int = 64, ttl: float = 3600, callback_timeout: float = 10,
+                 callback_retries: int = 3, max_bytes: int = 256 * 1024 * 1024,
+                 callback_hosts: Tuple[str, ...] = ()):
+        self.process = process
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.max_bytes = max_bytes
+        self.held_bytes = 0
+        self.callback_hosts = tuple(h.lower() for h in callback_hosts)
+        self.ttl = ttl
+        self.callback_timeout = callback_timeout
+        self.callback_retries = callback_retries
+        self.jobs: Dict[str, Job] = {}
+        self._heap = []  # (prioridade, sequência, job)
+        self._seq = itertools.count()
+        self._ready: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+        self.running = 0
+        self.rejected = 0
+        self.expired = 0
+
+    @classmethod
+    def from_env(cls, process) -> "JobQueue":
+        """
+        JOB_WORKERS, JOB_QUEUE, JOB_QUEUE_MB, JOB_TTL (s), JOB_CALLBACK_TIMEOUT (s) e
+        JOB_CALLBACK_HOSTS (hosts aceitos em callback_url, separados por vírgula).
+        """
+        hosts = os.getenv("JOB_CALLBACK_HOSTS", "")
+        return cls(
+            process,
+            workers=int(os.getenv("JOB_WORKERS", "2")),
+            max_queue=int(os.getenv("JOB_QUEUE", "64")),
+            ttl=float(os.getenv("JOB_TTL", "3600")),
+            callback_timeout=float(os.getenv("JOB_CALLBACK_TIMEOUT", "10")),
+            max_bytes=int(float(os.getenv("JOB_QUEUE_MB", "256")) * 1024 * 1024),
+            callback_hosts=tuple(h.strip() for h in hosts.split(",") if h.strip()),
+        )
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._ready = asyncio.Condition()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(loop.create_task(self._cleanup()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def depth(self) -> int:
+        return len(self._heap)
+
+    def has_room(self, nbytes: int) -> bool:
+        """Se um job com ``nbytes`` caberia agora (para recusar antes de ler o upload inteiro)."""
+        return self.depth < self.max_queue and self.held_bytes + nbytes <= self.max_bytes
+
+    async def submit(self, job: Job) -> Job:
+        if not self.has_room(job.nbytes):
+            self.rejected += 1
+            count(JOBS, "rejected")
+            raise JobQueueFull(f"Fila de jobs cheia ({self.depth}/{self.max_queue} jobs, "
+                               f"{self.held_bytes + job.nbytes}/{self.max_bytes} bytes).")
+        self.held_bytes += job.nbytes
+        self.jobs[job.id] = job
+        job.seq = next(self._seq)
+        heapq.heappush(self._heap, (PRIORITIES.get(job.priority, 1), job.seq, job))
+        count(JOBS, "queued")
+        async with self._ready:
+            self._ready.notify()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def position(self, job: Job) -> Optional[int]:
+        """Quantos jobs saem da fila antes deste (None se já saiu)."""
+        if job.state != "queued":
+            return None
+        key = (PRIORITIES.get(job.priority, 1), job.seq)
+        return sum(1 for p, s, _ in self._heap if (p, s) < key)
+
+    async def _worker(self):
+        while True:
+            async with self._ready:
+                await self._ready.wait_for(lambda: self._heap)
+                _, _, job = heapq.heappop(self._heap)
+            await self._run(job)
+
+    async def _run(self, job: Job):
+        job.state = "running"
+        job.started_at = time.time()
+        observe(JOB_WAIT_SECONDS, job.started_at - job.created_at)
+        self.running += 1
+        try:
+            job.results = await self.process(job)
+            job.state = "done"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Job {job.id} falhou: {e}")
+            job.state = "failed"
+            job.error = str(e)
+        finally:
+            self.running -= 1
+            job.items = []  # libera textos e arquivos; o resultado fica em job.results
+            self.held_bytes -= job.nbytes
+            job.finished_at = time.time()
+            observe(JOB_RUN_SECONDS, job.finished_at - job.started_at)
+        count(JOBS, job.state)
+        if job.callback_url:
+            await self._callback(job)
+
+    def check_callback_url(self, url: str) -> str:
+        """
+        Valida ``url`` como destino de callback (ValueError se recusada). Resolve
+        o host: bloqueia rede interna, loopback, link-local (metadados de nuvem).
+        """
+        parts = urllib.parse.urlsplit(url)
+        host = (parts.hostname or "").lower()
+        if parts.scheme not in ("http", "https") or not host:
+            raise ValueError("callback_url deve ser http(s)://host/...")
+        if self.callback_hosts:
+            if not any(fnmatch.fnmatchcase(host, pattern) for pattern in self.callback_hosts):
+                raise ValueError(f"callback_url: host {host} fora de JOB_CALLBACK_HOSTS.")
+            return url
+        try:
+            infos = socket.getaddrinfo(host, parts.port or (443 if parts.scheme == "https" else 80),
+                                       proto=socket.IPPROTO_TCP)
+        except (socket.gaierror, UnicodeError):
+            raise ValueError(f"callback_url: host {host} não resolve.")
+        if not all(_is_public(info[4][0]) for info in infos):
+            raise ValueError(f"callback_url: host {host} aponta para endereço interno.")
+        return url
+
+    async def _callback(self, job: Job):
+        body = json.dumps(job.to_dict(), ensure_ascii=False).encode("utf-8")
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.callback_retries):
+            try:
+                status = await loop.run_in_executor(None, self._post, job.callback_url, body)
+                job.callback_status = f"ok ({status})"
+                return
+            except Exception as e:
+                job.callback_status = f"erro: {e}"
+                if attempt + 1 < self.callback_retries:
+                    await asyncio.sleep(2 ** attempt)
+        logger.warning(f"Callback do job {job.id} falhou: {job.callback_status}")
+
+    def _post(self, url: str, body: bytes) -> int:
+        self.check_callback_url(url)  # de novo: o DNS pode ter mudado desde o submit
+        req = urllib.request.Request(url, data=body, method="POST",
+                                     headers={"Content-Type": "application/json"})
+        with _CALLBACK_OPENER.open(req, timeout=self.callback_timeout) as resp:
+            return resp.status
+
+    async def _cleanup(self):
+        while True:
+            await asyncio.sleep(min(60.0, max(1.0, self.ttl / 4)))
+            self.expire()
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Remove jobs terminados há mais de ``ttl`` segundos."""
+        now = time.time() if now is None else now
+        old = [jid for jid, job in self.jobs.items()
+               if job.finished_at is not None and now - job.finished_at > self.ttl]
+        for jid in old:
+            del self.jobs[jid]
+        self.expired += len(old)
+        return len(old)
+
+    def stats(self) -> Dict:
+        states: Dict[str, int] = {}
+        for job in self.jobs.values():
+            states[job.state] = states.get(job.state, 0) + 1
+        return {
+            "depth": self.depth,
+            "max_queue": self.max_queue,
+            "bytes": self.held_bytes,
+            "max_bytes": self.max_bytes,
+            "workers": self.workers,
+            "running": self.running,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "stored": len(self.jobs),
+            "by_state": states,
+        }
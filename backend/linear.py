@@ -0,0 +1,258 @@
+"""
+Classificador linear leve sobre o texto pré-processado (preprocess_text).
+
+Unigramas e bigramas dos tokens viram índices num vetor de 2**bits pesos
+(hashing trick com crc32, estável entre processos); a regressão logística
+dá P(Produtivo). Os pesos ficam num arquivo binário compacto (float32) e a
+predição é uma soma de poucas dezenas de pesos, na casa dos microssegundos.
+
+Treino offline a partir de JSONL (``{"text", "label"}``) ou CSV:
+
+    python -m backend.linear train rotulados.jsonl -o linear.bin
+    python -m backend.linear eval linear.bin teste.csv
+
+No serviço, LINEAR_MODEL=linear.bin liga a etapa: o resultado entra em
+_combine_results como terceiro sinal e assume o papel do modelo quando o
+transformer não está disponível.
+"""
+import argparse
+import csv
+import json
+import logging
+import math
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"CEML"
+_VERSION = 1
+POSITIVE = "Produtivo"
+NEGATIVE = "Improdutivo"
+
+# Abaixo desta confiança o sinal linear é ignorado na combinação
+LINEAR_MIN_CONFIDENCE = float(os.getenv("LINEAR_MIN_CONFIDENCE", "0.7"))
+
+
+def feature_indices(processed: str, bits: int, ngrams: int = 2) -> List[int]:
+    """Índices (sem repetição) dos n-gramas de ``processed`` no vetor de 2**bits pesos."""
+    tokens = processed.split()
+    mask = (1 << bits) - 1
+    seen = set()
+    for n in range(1, ngrams + 1):
+        for i in range(len(tokens) - n + 1):
+            gram = tokens[i] if n == 1 else " ".join(tokens[i:i + n])
+            seen.add(zlib.crc32(gram.encode("utf-8")) & mask)
+    return list(seen)
+
+
+def _sigmoid(z: float) -> float:
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+
+class LinearModel:
+    """Regressão logística com features por hashing; ``weights`` é um array('f') de 2**bits."""
+
+    def __init__(self, weights: array, bias: float = 0.0, bits: int = 18, ngrams: int = 2,
+                 meta: Optional[Dict] = None):
+        if len(weights) != 1 << bits:
+            raise ValueError(f"Esperados {1 << bits} pesos, recebidos {len(weights)}")
+        self.weights = weights
+        self.bias = bias
+        self.bits = bits
+        self.ngrams = ngrams
+        self.meta = meta or {}
+
+    @classmethod
+    def zeros(cls, bits: int = 18, ngrams: int = 2) -> "LinearModel":
+        return cls(array("f", bytes(4 << bits)), bits=bits, ngrams=ngrams)
+
+    def score(self, indices: List[int]) -> float:
+        if not indices:
+            return self.bias
+        w = self.weights
+        return self.bias + sum(w[i] for i in indices) / math.sqrt(len(indices))
+
+    def predict_proba(self, processed: str) -> float:
+        """P(Produtivo) para um texto já passado por preprocess_text."""
+        return _sigmoid(self.score(feature_indices(processed, self.bits, self.ngrams)))
+
+    def classify(self, processed: str) -> Tuple[str, float]:
+        p = self.predict_proba(processed)
+        return (POSITIVE, p) if p >= 0.5 else (NEGATIVE, 1.0 - p)
+
+    # --- arquivo: magic, versão, cabeçalho JSON, pesos float32 little-endian ---
+
+    def save(self, path: str):
+        header = json.dumps({"bits": self.bits, "ngrams": self.ngrams, "bias": self.bias, **self.meta},
+                            ensure_ascii=False).encode("utf-8")
+        weights = array("f", self.weights)
+        if sys.byteorder == "big":
+            weights.byteswap()
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC + struct.pack("<HI", _VERSION, len(header)) + header)
+            weights.tofile(f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LinearModel":
+        with open(path, "rb") as f:
+            if f.read(4) != _MAGIC:
+                raise ValueError(f"{path} não é um modelo linear")
+            version, header_len = struct.unpack("<HI", f.read(6))
+            if version != _VERSION:
+                raise ValueError(f"Versão de modelo linear não suportada: {version}")
+            meta = json.loads(f.read(header_len))
+            if not isinstance(meta, dict):
+                raise ValueError(f"Cabeçalho inválido em {path}")
+            weights = array("f")
+            weights.frombytes(f.read())
+        if sys.byteorder == "big":
+            weights.byteswap()
+        bits, ngrams, bias = meta.pop("bits"), meta.pop("ngrams"), meta.pop("bias")
+        return cls(weights, bias=bias, bits=bits, ngrams=ngrams, meta=meta)
+
+    @classmethod
+    def from_env(cls) -> Optional["LinearModel"]:
+        """LINEAR_MODEL: caminho do arquivo de pesos (sem ele a etapa fica desligada)."""
+        path = os.getenv("LINEAR_MODEL")
+        if not path:
+            return None
+        try:
+            model = cls.load(path)
+        except (OSError, ValueError, KeyError, TypeError, struct.error) as e:
+            # arquivo truncado ou editado à mão: a API sobe só com keywords em vez de falhar no import
+            logger.warning(f"Modelo linear {path} indisponível: {e!r}")
+            return None
+        stemmed = _stemmer_available()
+        if model.meta.get("stemmed", stemmed) != stemmed:
+            logger.warning("Modelo linear treinado com stemming %s, mas este ambiente está %s: "
+                           "as features podem não bater (dados do NLTK).",
+                           "ligado" if model.meta.get("stemmed") else "desligado",
+                           "com stemming" if stemmed else "sem stemming")
+        logger.info(f"Modelo linear carregado de {path} ({1 << model.bits} pesos)")
+        return model
+
+
+def _stemmer_available() -> bool:
+    from .utils import get_nlp_resources
+    return get_nlp_resources()[1] is not None
+
+
+# --- treino ---
+
+def read_labeled(path: str, text_col: str = "text", label_col: str = "label") -> Iterator[Tuple[str, str]]:
+    """(texto, rótulo) de um JSONL ou CSV; linhas sem rótulo conhecido são ignoradas."""
+    if path.lower().endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = [(r.get(text_col) or "", r.get(label_col) or "") for r in csv.DictReader(f)]
+    else:
+        with open(path, encoding="utf-8") as f:
+            rows = [(d.get(text_col) or "", d.get(label_col) or "")
+                    for d in (json.loads(line) for line in f if line.strip())]
+    for text, label in rows:
+        if label in (POSITIVE, NEGATIVE) and text.strip():
+            yield text, label
+
+
+def train(examples: List[Tuple[List[int], int]], bits: int = 18, ngrams: int = 2, epochs: int = 10,
+          lr: float = 0.5, l2: float = 1e-5, seed: int = 0) -> LinearModel:
+    """SGD com AdaGrad sobre (índices, y) já extraídos; y = 1 para Produtivo."""
+    model = LinearModel.zeros(bits, ngrams)
+    w = model.weights
+    grad_sq: Dict[int, float] = {}
+    bias_sq = 0.0
+    rng = random.Random(seed)
+    order = list(range(len(examples)))
+    for _ in range(epochs):
+        rng.shuffle(order)
+        for k in order:
+            indices, y = examples[k]
+            scale = 1.0 / math.sqrt(len(indices)) if indices else 0.0
+            g = _sigmoid(model.score(indices)) - y
+            for i in indices:
+                gi = g * scale + l2 * w[i]
+                grad_sq[i] = grad_sq.get(i, 0.0) + gi * gi
+                w[i] -= lr * gi / math.sqrt(grad_sq[i] + 1e-12)
+            bias_sq += g * g
+            model.bias -= lr * g / math.sqrt(bias_sq + 1e-12)
+    return model
+
+
+def evaluate(model: LinearModel, processed: List[str], labels: List[str]) -> Dict:
+    started = time.perf_counter()
+    predicted = [model.classify(p)[0] for p in processed]
+    elapsed = time.perf_counter() - started
+    correct = sum(p == y for p, y in zip(predicted, labels))
+    return {
+        "n": len(labels),
+        "accuracy": correct / len(labels) if labels else 0.0,
+        "us_per_email": elapsed / len(labels) * 1e6 if labels else 0.0,
+    }
+
+
+def _preprocess_all(texts: List[str]) -> List[str]:
+    from .utils import analyze_text, preprocess_text
+    return [preprocess_text(t, analyze_text(t)) for t in texts]
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(prog="python -m backend.linear", description="Modelo linear de e-mails.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    tr = sub.add_parser("train", help="treina a partir de JSONL/CSV rotulados")
+    tr.add_argument("inputs", nargs="+")
+    tr.add_argument("-o", "--output", required=True)
+    tr.add_argument("--bits", type=int, default=18, help="2**bits pesos (18 = 1 MB)")
+    tr.add_argument("--ngrams", type=int, default=2)
+    tr.add_argument("--epochs", type=int, default=10)
+    tr.add_argument("--lr", type=float, default=0.5)
+    tr.add_argument("--l2", type=float, default=1e-5)
+    tr.add_argument("--holdout", type=float, default=0.2, help="fração separada para avaliar (0 treina em tudo)")
+    tr.add_argument("--seed", type=int, default=0)
+    ev = sub.add_parser("eval", help="acurácia e latência num conjunto rotulado")
+    ev.add_argument("model")
+    ev.add_argument("inputs", nargs="+")
+    for p in (tr, ev):
+        p.add_argument("--text-col", default="text")
+        p.add_argument("--label-col", default="label")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    rows = [r for path in args.inputs for r in read_labeled(path, args.text_col, args.label_col)]
+    if not rows:
+        ap.error("nenhum exemplo rotulado (Produtivo/Improdutivo) nas entradas")
+    processed = _preprocess_all([t for t, _ in rows])
+    labels = [y for _, y in rows]
+
+    if args.command == "eval":
+        print(json.dumps(evaluate(LinearModel.load(args.model), processed, labels)))
+        return
+
+    order = list(range(len(rows)))
+    random.Random(args.seed).shuffle(order)
+    cut = int(len(order) * (1 - args.holdout)) if args.holdout else len(order)
+    train_idx, test_idx = order[:cut], order[cut:]
+    examples = [(feature_indices(processed[i], args.bits, args.ngrams), int(labels[i] == POSITIVE))
+                for i in train_idx]
+    model = train(examples, bits=args.bits, ngrams=args.ngrams, epochs=args.epochs,
+                  lr=args.lr, l2=args.l2, seed=args.seed)
+    report = {"train": len(train_idx)}
+    if test_idx:
+        report["holdout"] = evaluate(model, [processed[i] for i in test_idx], [labels[i] for i in test_idx])
+    model.meta = {"stemmed": _stemmer_available(), "trained_at": int(time.time()), **report}
+    model.save(args.output)
+    print(json.dumps({"output": args.output, "bytes": os.path.getsize(args.output), **report}))
+
+
+if __name__ == "__main__":
+    main()
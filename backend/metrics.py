@@ -0,0 +1,246 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+# METRICS_ENABLED=0 desliga a coleta: stage() vira um context manager vazio compartilhado
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# SERVER_TIMING=1 anexa Server-Timing a toda resposta; sem ele, só quando o cliente
+# manda o header "X-Server-Timing: 1"
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# (etapa, segundos) medidos na requisição corrente, quando há Server-Timing
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def _fmt_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_bound(bound: float) -> str:
+    return str(int(bound)) if float(bound).is_integer() else repr(float(bound))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f"{self.name}{_fmt_labels(self.labels, k)} {v:g}" for k, v in items]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...], labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}  # labels -> [contagens..., soma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                le = f'le="{_fmt_bound(bound)}"'
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {series[-2]:g}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, fn: Callable[[], List[str]]):
+        """``fn`` devolve linhas prontas (gauges lidos na hora do scrape)."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for fn in self._collectors:
+            lines += fn()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "classifier_stage_seconds", "Latência por etapa do pipeline de classificação.", LATENCY_BUCKETS, ("stage",)
+))
+REQUEST_BYTES = REGISTRY.register(Histogram(
+    "classifier_request_bytes", "Tamanho do conteúdo recebido por requisição.", SIZE_BUCKETS, ("kind",)
+))
+CLASSIFICATIONS = REGISTRY.register(Counter(
+    "classifier_classifications_total", "E-mails classificados.", ("category",)
+))
+SHORT_CIRCUITS = REGISTRY.register(Counter(
+    "classifier_short_circuit_total", "Classificações resolvidas sem o pipeline completo.", ("reason",)
+))
+MODEL_CALLS = REGISTRY.register(Counter(
+    "classifier_model_calls_total", "Chamadas ao modelo por resultado (ok, error, unavailable).", ("outcome",)
+))
+DECISIONS = REGISTRY.register(Counter(
+    "classifier_decided_by_total", "Classificações por etapa da cascata que decidiu.", ("stage",)
+))
+JOBS = REGISTRY.register(Counter(
+    "classifier_jobs_total", "Jobs assíncronos por transição de estado.", ("state",)
+))
+JOB_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "classifier_job_wait_seconds", "Tempo dos jobs na fila até um worker pegar.", LATENCY_BUCKETS + (30.0, 60.0, 300.0)
+))
+JOB_RUN_SECONDS = REGISTRY.register(Histogram(
+    "classifier_job_run_seconds", "Tempo de processamento dos jobs.", LATENCY_BUCKETS + (30.0, 60.0, 300.0)
+))
+ADMISSION = REGISTRY.register(Counter(
+    "classifier_admission_total",
+    "Requisições por decisão da admissão (admitted, rate_limited, queue_full, timeout, streams, paced).",
+    ("outcome",)
+))
+ADMISSION_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "classifier_admission_wait_seconds", "Espera na fila de admissão até a requisição entrar.", LATENCY_BUCKETS
+))
+STREAM_RECORDS = REGISTRY.register(Counter(
+    "classifier_stream_records_total", "Registros do /classify-stream por resultado (ok, error).", ("outcome",)
+))
+
+
+def gauge(name: str, help: str, samples: Dict[str, float]) -> List[str]:
+    """Linhas de um gauge; ``samples`` mapeia rótulos já formatados (``'{pool="x"}'`` ou "") ao valor."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+    lines += [f"{name}{labels} {value:g}" for labels, value in samples.items()]
+    return lines
+
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopStage()
+
+
+class _Stage:
+    __slots__ = ("name", "timings", "started")
+
+    def __init__(self, name: str, timings):
+        self.name = name
+        self.timings = timings
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        if METRICS_ENABLED:
+            STAGE_SECONDS.observe(elapsed, self.name)
+        if self.timings is not None:
+            self.timings.append((self.name, elapsed))
+        return False
+
+
+def stage(name: str):
+    """``with stage("keywords"): ...`` mede a etapa (no-op se métricas e Server-Timing estão desligados)."""
+    timings = _request_timings.get()
+    if not METRICS_ENABLED and timings is None:
+        return _NOOP
+    return _Stage(name, timings)
+
+
+def count(counter: Counter, *label_values: str):
+    if METRICS_ENABLED:
+        counter.inc(*label_values)
+
+
+def observe(histogram: Histogram, value: float, *label_values: str):
+    if METRICS_ENABLED:
+        histogram.observe(value, *label_values)
+
+
+def server_timing_header(timings: List[Tuple[str, float]]) -> str:
+    totals: Dict[str, float] = {}
+    for name, elapsed in timings:
+        totals[name] = totals.get(name, 0.0) + elapsed
+    return ", ".join(f"{name};dur={elapsed * 1000:.3f}" for name, elapsed in totals.items())
+
+
+class ServerTimingMiddleware:
+    """Middleware ASGI que expõe as etapas medidas por stage() no header Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        wanted = SERVER_TIMING or any(
+            k == b"x-server-timing" and v.strip() == b"1" for k, v in scope.get("headers", [])
+        )
+        if not wanted:
+            return await self.app(scope, receive, send)
+
+        timings: List[Tuple[str, float]] = []
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                value = server_timing_header(timings + [("total", time.perf_counter() - started)])
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"server-timing", value.encode("latin-1"))
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
@@ -0,0 +1,329 @@
+"""
+Índice de quase-duplicados: SimHash de 64 bits sobre os tokens de preprocess_text.
+
+E-mails repetidos com pequenas edições (o mesmo "status do chamado" com outro
+número, respostas em massa) caem a poucos bits de distância. O índice acha o
+vizinho mais próximo até ``max_distance`` bits (Hamming) dividindo a
+impressão em ``max_distance + 1`` faixas: pelo princípio da casa dos pombos,
+um vizinho dentro do limite coincide em pelo menos uma faixa inteira, então a
+busca olha poucos baldes em vez de todas as entradas.
+
+Cada entrada pertence a um cluster. O cluster guarda a decisão do e-mail que o
+abriu (passou pelo pipeline completo); com ``reuse`` ligado, um e-mail a até
+``max_distance`` bits dessa âncora herda a categoria sem rodar keywords nem
+modelo (a resposta sugerida é refeita com os dados do próprio e-mail).
+O preprocess remove "?" e, pela lista de stopwords, "não", "nem" e "sem":
+"o sistema voltou a funcionar" e "o sistema não voltou a funcionar?" caem no
+mesmo cluster. Por isso o reaproveitamento também exige que a assinatura do
+e-mail (``reuse_signature``: negações, pergunta, saudação sem pedido) seja a
+mesma da âncora.
+
+Memória limitada: as impressões ficam num anel de ``max_entries`` posições
+(a mais antiga sai primeiro) e cada balde guarda no máximo ``max_bucket``
+entradas, o que também limita o custo da busca quando um modelo de e-mail se
+repete milhares de vezes.
+"""
+import heapq
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+# Hashes de 64 bits por token, memorizados (o vocabulário se repete muito entre e-mails)
+_TOKEN_HASHES: Dict[str, int] = {}
+_TOKEN_HASHES_MAX = 200_000
+# Negação + a palavra seguinte ("não voltou", "sem acesso", "can't login")
+_NEGATION_RE = re.compile(
+    r"\b(?:não|nao|nem|sem|nunca|jamais|nenhum|nenhuma|nada|not|no|never|without|cannot|\w+n['’]t)\s+(\w+)"
+)
+
+
+def _token_hash(token: str) -> int:
+    h = _TOKEN_HASHES.get(token)
+    if h is None:
+        if len(_TOKEN_HASHES) >= _TOKEN_HASHES_MAX:
+            _TOKEN_HASHES.clear()
+        h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+        _TOKEN_HASHES[token] = h
+    return h
+
+
+def reuse_signature(lowered: str, question: bool = False, greeting: bool = False) -> int:
+    """
+    Hash do que muda a categoria sem mudar os tokens da impressão: as negações do
+    texto em minúsculas (cada uma com a palavra seguinte), se é pergunta e se é
+    saudação sem pedido. 0 para texto afirmativo, sem negação nem saudação.
+    """
+    found = sorted({m.group(0).split()[0] + " " + m.group(1) for m in _NEGATION_RE.finditer(lowered)})
+    if question:
+        found.append("?")
+    if greeting:
+        found.append("!saudação")
+    if not found:
+        return 0
+    return int.from_bytes(hashlib.blake2b("\n".join(found).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def feature_hashes(tokens: List[str]) -> List[int]:
+    """Hashes (sem repetição) dos unigramas e bigramas; o do bigrama mistura os dos dois tokens."""
+    hashes = [_token_hash(t) for t in tokens]
+    features = set(hashes)
+    for a, b in zip(hashes, hashes[1:]):
+        h = (a * _GOLDEN + (b ^ (b >> 29))) & _MASK64
+        features.add(h ^ (h >> 31))
+    return list(features)
+
+
+def simhash(hashes: Iterable[int]) -> int:
+    """
+    Bit i da impressão = maioria do bit i entre os hashes. Em vez de contar
+    bit a bit por hash, separa cada byte dos hashes numa coluna (um inteiro
+    com um byte por hash) e conta cada posição com deslocamento, máscara e
+    bit_count: 64 operações por e-mail, cada uma sobre ``len(hashes)`` bytes.
+    """
+    packed = array("Q", hashes)
+    n = len(packed)
+    if not n:
+        return 0
+    if sys.byteorder == "big":
+        packed.byteswap()
+    raw = packed.tobytes()
+    ones = int.from_bytes(b"\x01" * n, "little")
+    fp = 0
+    for j in range(8):
+        column = int.from_bytes(raw[j::8], "little")
+        for k in range(8):
+            if ((column >> k) & ones).bit_count() * 2 > n:
+                fp |= 1 << (8 * j + k)
+    return fp
+
+
+class Cluster:
+    """E-mails parecidos: a decisão da âncora e contadores para a visão de /clusters."""
+
+    __slots__ = ("id", "anchor", "signature", "category", "confidence", "size", "members", "reused",
+                 "first_seen", "last_seen", "sample")
+
+    def __init__(self, cluster_id: int, anchor: int, decision: Optional[Dict], sample: str, now: float,
+                 signature: int = 0):
+        self.id = cluster_id
+        self.anchor = anchor
+        self.signature = signature  # reuse_signature da âncora
+        self.category = decision.get("category") if decision else None
+        self.confidence = decision.get("confidence") if decision else None
+        self.size = 0  # e-mails atribuídos desde que o cluster abriu
+        self.members = 0  # entradas ainda no índice
+        self.reused = 0
+        self.first_seen = now
+        self.last_seen = now
+        self.sample = sample
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "size": self.size,
+            "category": self.category,
+            "confidence": self.confidence,
+            "reused": self.reused,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "sample": self.sample,
+        }
+
+
+class NearDuplicateIndex:
+    """
+    SimHash + LSH por faixas, com clusters de e-mails parecidos.
+
+    ``fingerprint`` calcula a impressão; ``match`` devolve o cluster do
+    vizinho mais próximo (e se a decisão dele pode ser reaproveitada);
+    ``add`` registra o e-mail nesse cluster ou abre um novo com a decisão.
+    Entradas mais velhas que ``ttl`` segundos não casam nem reaproveitam.
+    """
+
+    def __init__(self, max_entries: int = 100_000, max_distance: int = 3, ttl: float = 86400,
+                 min_tokens: int = 5, reuse: bool = False, max_bucket: int = 32, sample_chars: int = 200):
+        if not 0 <= max_distance < 32:
+            raise ValueError(f"max_distance deve ficar entre 0 e 31 (recebido {max_distance})")
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.reuse = reuse
+        self.max_bucket = max_bucket
+        self.sample_chars = sample_chars
+        self.band_bits = 64 // (max_distance + 1)
+        self._band_mask = (1 << self.band_bits) - 1
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(max_distance + 1)]
+        self._fps = array("Q")
+        self._seen = array("d")
+        self._slot_cluster: List[Optional[Cluster]] = []
+        self._next = 0
+        self._clusters: Dict[int, Cluster] = {}
+        self._cluster_ids = 0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.matches = 0
+        self.reuses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["NearDuplicateIndex"]:
+        """
+        NEAR_DUP=off (padrão) | index (só agrupa para /clusters) | reuse (também reaproveita decisões)
+        NEAR_DUP_MAX_ENTRIES, NEAR_DUP_MAX_DISTANCE (bits de 64), NEAR_DUP_TTL (s), NEAR_DUP_MIN_TOKENS
+        """
+        mode = os.getenv("NEAR_DUP", "off").lower()
+        if mode in ("off", "0", "none", ""):
+            return None
+        if mode not in ("index", "reuse"):
+            logger.warning(f"NEAR_DUP={mode} desconhecido; usando 'index'.")
+        return cls(
+            max_entries=int(os.getenv("NEAR_DUP_MAX_ENTRIES", "100000")),
+            max_distance=int(os.getenv("NEAR_DUP_MAX_DISTANCE", "3")),
+            ttl=float(os.getenv("NEAR_DUP_TTL", "86400")),
+            min_tokens=int(os.getenv("NEAR_DUP_MIN_TOKENS", "5")),
+            reuse=mode == "reuse",
+        )
+
+    def __len__(self) -> int:
+        return len(self._fps)
+
+    def fingerprint(self, processed: str) -> Optional[int]:
+        """Impressão do texto pré-processado, ou None se tiver poucos tokens para comparar."""
+        tokens = processed.split()
+        if len(tokens) < self.min_tokens:
+            return None
+        return simhash(feature_hashes(tokens))
+
+    def _bands(self, fp: int):
+        bits, mask = self.band_bits, self._band_mask
+        for b, buckets in enumerate(self._buckets):
+            yield buckets, (fp >> (b * bits)) & mask
+
+    def _nearest(self, fp: int, now: float) -> Tuple[Optional[int], int]:
+        best, best_d = None, self.max_distance + 1
+        oldest = now - self.ttl
+        fps, seen = self._fps, self._seen
+        for buckets, key in self._bands(fp):
+            for slot in buckets.get(key, ()):
+                d = (fps[slot] ^ fp).bit_count()
+                if d < best_d and seen[slot] >= oldest:
+                    best, best_d = slot, d
+                    if d == 0:
+                        return best, 0
+        return best, best_d
+
+    def match(self, fp: int, now: Optional[float] = None, signature: int = 0) -> Tuple[Optional[Cluster], bool]:
+        """
+        (cluster do vizinho mais próximo ou None, se a decisão do cluster vale para ``fp``).
+        ``signature`` é a reuse_signature do e-mail: só reaproveita se for a da âncora.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self.lookups += 1
+            slot, _ = self._nearest(fp, now)
+            if slot is None:
+                return None, False
+            self.matches += 1
+            cluster = self._slot_cluster[slot]
+            # a decisão vem da âncora: sem isso, uma cadeia de vizinhos derivaria para longe dela
+            reusable = (
+                self.reuse and cluster.category is not None
+                and (cluster.anchor ^ fp).bit_count() <= self.max_distance
+                and cluster.signature == signature
+                and cluster.first_seen >= now - self.ttl
+            )
+            return cluster, reusable
+
+    def add(self, fp: int, cluster: Optional[Cluster], decision: Optional[Dict], text: str,
+            reused: bool = False, now: Optional[float] = None, signature: int = 0) -> Cluster:
+        """
+        Registra ``fp`` em ``cluster`` (de um match anterior) ou, sem ele, num cluster
+        novo cuja âncora é ``fp`` com ``decision`` ({"category", "confidence"}) e ``signature``.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if cluster is not None and self._clusters.get(cluster.id) is not cluster:
+                cluster = None  # saiu do índice enquanto o e-mail era classificado
+            if cluster is None:
+                self._cluster_ids += 1
+                cluster = Cluster(self._cluster_ids, fp, decision, text[:self.sample_chars], now, signature)
+                self._clusters[cluster.id] = cluster
+            cluster.size += 1
+            cluster.last_seen = now
+            if reused:
+                cluster.reused += 1
+                self.reuses += 1
+            slot, d = self._nearest(fp, now)
+            if slot is not None and d == 0 and self._slot_cluster[slot] is cluster:
+                self._seen[slot] = now  # repetição exata: renova a entrada em vez de ocupar outra
+            else:
+                self._insert(fp, cluster, now)
+            return cluster
+
+    def _insert(self, fp: int, cluster: Cluster, now: float):
+        if len(self._fps) < self.max_entries:
+            slot = len(self._fps)
+            self._fps.append(fp)
+            self._seen.append(now)
+            self._slot_cluster.append(cluster)
+        else:
+            slot = self._next
+            self._next = (slot + 1) % self.max_entries
+            self._evict(slot)
+            self._fps[slot] = fp
+            self._seen[slot] = now
+            self._slot_cluster[slot] = cluster
+        cluster.members += 1
+        for buckets, key in self._bands(fp):
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [slot]
+                continue
+            bucket.append(slot)
+            if len(bucket) > self.max_bucket:
+                del bucket[0]  # a entrada continua nas outras faixas
+
+    def _evict(self, slot: int):
+        old = self._slot_cluster[slot]
+        for buckets, key in self._bands(self._fps[slot]):
+            bucket = buckets.get(key)
+            if bucket is not None and slot in bucket:
+                bucket.remove(slot)
+                if not bucket:
+                    del buckets[key]
+        old.members -= 1
+        if old.members == 0:
+            del self._clusters[old.id]
+        self.evictions += 1
+
+    def clusters(self, min_size: int = 2, limit: int = 50, window: Optional[float] = None) -> List[Dict]:
+        """Maiores clusters com atividade nos últimos ``window`` segundos (padrão: ttl)."""
+        since = time.time() - (self.ttl if window is None else window)
+        with self._lock:
+            recent = [c for c in self._clusters.values() if c.last_seen >= since and c.size >= min_size]
+            top = heapq.nlargest(limit, recent, key=lambda c: (c.size, c.last_seen))
+            return [c.to_dict() for c in top]
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "clusters": len(self._clusters),
+            "max_distance": self.max_distance,
+            "reuse": self.reuse,
+            "lookups": self.lookups,
+            "matches": self.matches,
+            "reuses": self.reuses,
+            "evictions": self.evictions,
+        }
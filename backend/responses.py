@@ -0,0 +1,213 @@
+import hashlib
+import json
+import logging
+import os
+import string
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Campos que os modelos podem usar; preenchidos a partir de TextAnalysis.slots
+SLOTS = ("ticket", "invoice")
+
+# Chave → modelos, do mais específico ao genérico. Vale o primeiro cujos campos
+# foram todos encontrados no e-mail; o último de cada lista não deve ter campos.
+# Chaves: "saudacao" e "improdutivo" (Improdutivo), a intenção do e-mail
+# (Produtivo) e "outro" para intenções sem modelo próprio.
+DEFAULT_TEMPLATES: Dict[str, List[str]] = {
+    "saudacao": [
+        "Obrigado pela mensagem e pelas felicitações! "
+        "Agradecemos o contato e permanecemos à disposição.",
+    ],
+    "improdutivo": [
+        "Obrigado pelo retorno! "
+        "Se precisar de alguma ação específica, é só nos sinalizar.",
+    ],
+    "status": [
+        "Claro! Vamos conferir o status do chamado #{ticket} e retornamos em seguida. "
+        "Se puder, informe o nome do solicitante e a data de abertura para agilizarmos o retorno.",
+        "Claro! Para conferir o status com precisão, poderia informar o número do chamado/solicitação "
+        "e, se possível, o nome do solicitante e a data de abertura? Assim agilizamos o retorno.",
+    ],
+    "login": [
+        "Entendi o problema de acesso. Para avançarmos, envie por favor: usuário/e-mail, sistema/URL, "
+        "data e horário aproximados do erro e, se houver, a mensagem exibida (print ajuda). Vamos verificar.",
+    ],
+    "fatura": [
+        "Recebido sobre a fatura {invoice}. Para tratarmos, confirme a competência, o valor e o vencimento. "
+        "Se houver comprovante ou boleto atualizado, anexe por gentileza.",
+        "Recebido sobre a fatura. Para tratarmos, confirme o número/competência, valor e vencimento. "
+        "Se houver comprovante ou boleto atualizado, anexe por gentileza.",
+    ],
+    "anexo": [
+        "Recebemos o(s) arquivo(s). Vamos validar e retornamos com os próximos passos. "
+        "Se houver alguma ação específica esperada, nos informe.",
+    ],
+    "prazo": [
+        "Vamos verificar o cronograma e retornar a previsão. "
+        "Se houver datas críticas, avise para priorizarmos.",
+    ],
+    "api": [
+        "Para a integração via API, compartilharemos endpoint, autenticação e exemplos de payload. "
+        "Avise o caso de uso (consulta/envio) e, se necessário, um IP/caller para liberação.",
+    ],
+    "contrato": [
+        "Vamos checar as assinaturas pendentes do contrato e retornamos com a situação e o próximo passo.",
+    ],
+    "reabrir_ticket": [
+        "Vamos reabrir o ticket #{ticket}. Pode informar se houve alguma mudança antes da recorrência "
+        "e anexar logs/prints?",
+        "Vamos reabrir o ticket. Pode informar se houve alguma mudança antes da recorrência e anexar logs/prints?",
+    ],
+    "cadastro": [
+        "Para atualizar o cadastro, envie os campos a ajustar (endereço, responsáveis, contatos) "
+        "e os documentos, se houver.",
+    ],
+    "auditoria": [
+        "Certo, podemos liberar acesso temporário (leitura) para auditoria. "
+        "Informe o e-mail do usuário e o período desejado.",
+    ],
+    "divergencia": [
+        "Obrigado pelo alerta de divergência. Compartilhe um exemplo (período, filtro e valor esperado) "
+        "para reproduzirmos e corrigirmos.",
+    ],
+    "pagamento": [
+        "Vamos consultar o financeiro sobre a previsão de pagamento da NF {invoice} e retornamos. "
+        "Se puder, informe a data de vencimento.",
+        "Vamos consultar o financeiro sobre a previsão de pagamento e retornamos. "
+        "Se puder, informe número da NF e data de vencimento.",
+    ],
+    "outro": [
+        "Recebido! Vamos verificar o chamado #{ticket}. "
+        "Para avançarmos mais rápido, poderia detalhar contexto e objetivo?",
+        "Recebido! Para avançarmos mais rápido, poderia detalhar contexto, objetivo e algum ID (chamado/NF/contrato)?",
+    ],
+}
+
+
+class Template:
+    """Modelo compilado: sem campos, o texto já vem pronto (sem format a cada uso)."""
+
+    __slots__ = ("text", "slots")
+
+    def __init__(self, text: str):
+        fields = {name for _, name, _, _ in string.Formatter().parse(text) if name is not None}
+        unknown = fields - set(SLOTS)
+        if unknown:
+            raise ValueError(f"Campos desconhecidos no modelo: {sorted(unknown)} (use {list(SLOTS)})")
+        self.slots = tuple(sorted(fields))
+        self.text = text if self.slots else text.format()
+
+    def render(self, values: Dict[str, str]) -> Optional[str]:
+        if not self.slots:
+            return self.text
+        if all(values.get(s) for s in self.slots):
+            return self.text.format_map(values)
+        return None
+
+
+def _compile(table: Dict) -> Dict[str, List[Template]]:
+    compiled = {}
+    for key, texts in table.items():
+        if isinstance(texts, str):
+            texts = [texts]
+        if not texts or not all(isinstance(t, str) for t in texts):
+            raise ValueError(f"Modelos de '{key}' devem ser um texto ou uma lista de textos")
+        compiled[key] = [Template(t) for t in texts]
+        if compiled[key][-1].slots:
+            raise ValueError(f"O último modelo de '{key}' não pode ter campos (é o padrão)")
+    return compiled
+
+
+class ResponseTemplates:
+    """
+    Registro de modelos de resposta, compilado uma vez e consultado por chave.
+
+    Com ``path`` (JSON ``{chave: texto | [textos]}``), as chaves do arquivo
+    substituem as padrão. O arquivo é relido quando muda (mtime conferido no
+    máximo a cada ``check_interval`` segundos); um arquivo inválido é
+    ignorado e os modelos anteriores continuam valendo.
+    """
+
+    def __init__(self, path: Optional[str] = None, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        self._table = _compile(DEFAULT_TEMPLATES)
+        self.version = self._digest(DEFAULT_TEMPLATES)
+        self.reloads = 0
+        if path:
+            self.reload()
+
+    @classmethod
+    def from_env(cls) -> "ResponseTemplates":
+        """RESPONSE_TEMPLATES (caminho do JSON), RESPONSE_TEMPLATES_CHECK (s)."""
+        return cls(
+            path=os.getenv("RESPONSE_TEMPLATES") or None,
+            check_interval=float(os.getenv("RESPONSE_TEMPLATES_CHECK", "2")),
+        )
+
+    @staticmethod
+    def _digest(table: Dict) -> str:
+        raw = json.dumps(table, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return hashlib.sha1(raw).hexdigest()[:12]
+
+    def reload(self) -> bool:
+        """Relê o arquivo; devolve False (mantendo os modelos atuais) se estiver inválido."""
+        mtime = None
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, encoding="utf-8") as f:
+                overrides = json.load(f)
+            if not isinstance(overrides, dict):
+                raise ValueError("o arquivo deve conter um objeto JSON")
+            merged = {**DEFAULT_TEMPLATES, **overrides}
+            table = _compile(merged)
+        except (OSError, ValueError) as e:
+            logger.error(f"Modelos de resposta em {self.path} ignorados: {e}")
+            self._mtime = mtime  # não relê (nem loga de novo) até o arquivo mudar
+            return False
+        with self._lock:
+            self._table = table
+            self._mtime = mtime
+            self.version = self._digest(merged)
+            self.reloads += 1
+        logger.info(f"Modelos de resposta carregados de {self.path} (versão {self.version})")
+        return True
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+
+    def render(self, key: str, analysis) -> str:
+        """Primeiro modelo de ``key`` (ou "outro") cujos campos o e-mail preenche."""
+        if self.path:
+            self._maybe_reload()
+        templates = self._table.get(key) or self._table["outro"]
+        values = None
+        for template in templates:
+            if template.slots and values is None:
+                values = analysis.slots  # só extrai campos se algum modelo pede
+            text = template.render(values)
+            if text is not None:
+                return text
+        return templates[-1].text
+
+    def stats(self) -> Dict:
+        return {"path": self.path, "version": self.version, "reloads": self.reloads, "keys": len(self._table)}
+
+
+# Carregado na importação: o primeiro pedido já encontra os modelos compilados
+RESPONSES = ResponseTemplates.from_env()
@@ -0,0 +1,283 @@
+"""
+Servidor prefork: vários workers uvicorn com um único modelo carregado.
+
+Com ``uvicorn --workers N`` cada processo carrega a própria cópia do RoBERTa
+e guarda as próprias estatísticas. Aqui o processo mestre abre o socket e
+faz o fork dos workers, e o modelo é carregado uma vez só:
+
+- preload (padrão): o mestre carrega o pipeline antes do fork; os pesos
+  ficam compartilhados copy-on-write entre os workers;
+- socket: um processo de inferência dedicado atende os workers por um
+  socket Unix e junta os pedidos de todos num mesmo lote;
+- per-worker: cada worker carrega o seu (comportamento do uvicorn, para
+  comparação).
+
+As estatísticas do /stats são somadas entre workers por um SQLite
+(STATS_BACKEND=sqlite, ligado automaticamente com mais de um worker).
+
+    python -m backend.server --workers 4 --port 8000
+    python -m backend.server --workers 4 --model-mode socket
+"""
+import argparse
+import gc
+import importlib
+import logging
+import os
+import queue
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import get_context
+from multiprocessing.connection import Client, Listener
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MODEL_MODES = ("preload", "socket", "per-worker")
+
+
+class RemotePipeline:
+    """Cliente do processo de inferência, com o mesmo contrato do pipeline (textos → rótulos)."""
+
+    tokenizer = None  # sem tokenizer local: o chunking estima tokens por palavra
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self._local = threading.local()  # uma conexão por thread do pool de inferência
+
+    def __call__(self, texts, batch_size: int = 1, **kwargs) -> List[Dict]:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+        try:
+            conn.send(list(texts))
+            ok, payload = conn.recv()
+        except (EOFError, OSError):
+            self._local.conn = None
+            raise
+        if not ok:
+            raise RuntimeError(payload)
+        return payload
+
+
+def _inference_loop(pipe, requests: "queue.Queue", max_batch: int):
+    """Junta pedidos de todos os workers num forward só (até ``max_batch`` textos)."""
+    while True:
+        batch = [requests.get()]
+        size = len(batch[0][0])
+        while size < max_batch:
+            try:
+                item = requests.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        texts = [t for item_texts, _ in batch for t in item_texts]
+        try:
+            outputs, error = pipe(texts, batch_size=min(len(texts), max_batch)), None
+        except Exception as e:
+            outputs, error = None, f"{type(e).__name__}: {e}"
+        pos = 0
+        for item_texts, reply in batch:
+            reply.put((False, error) if error else (True, outputs[pos:pos + len(item_texts)]))
+            pos += len(item_texts)
+
+
+def _serve_connection(conn, requests: "queue.Queue"):
+    reply = queue.Queue(maxsize=1)
+    with conn:
+        while True:
+            try:
+                texts = conn.recv()
+            except (EOFError, OSError):
+                return
+            requests.put((texts, reply))
+            conn.send(reply.get())
+
+
+def serve_inference(address: str, authkey: bytes, factory: Callable, ready, max_batch: int):
+    """Processo de inferência: carrega o pipeline e atende os workers até ser encerrado."""
+    pipe = factory()
+    if pipe is None:
+        ready.send(False)
+        return
+    requests: "queue.Queue" = queue.Queue()
+    threading.Thread(target=_inference_loop, args=(pipe, requests, max_batch), daemon=True).start()
+    listener = Listener(address, family="AF_UNIX", authkey=authkey)
+    ready.send(True)
+    while True:
+        conn = listener.accept()
+        threading.Thread(target=_serve_connection, args=(conn, requests), daemon=True).start()
+
+
+def _load_factory(spec: Optional[str]) -> Callable:
+    """``modulo:funcao`` que devolve um pipeline; sem ``spec``, o load_pipeline do classificador."""
+    if not spec:
+        from .email_classifier import load_pipeline
+        return load_pipeline
+    module, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module), attr or "load_pipeline")
+
+
+def _run_worker(sock: socket.socket, args, factory: Callable):
+    """Processo filho: importa o app só aqui (SQLite, pools e tasks são por processo)."""
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)
+    if args.model_mode == "per-worker" and args.pipeline:
+        from .email_classifier import set_preloaded_pipeline
+        set_preloaded_pipeline(factory())
+
+    import uvicorn
+    from .app import app
+
+    config = uvicorn.Config(app, log_level=args.log_level, timeout_keep_alive=args.keep_alive)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Prefork:
+    """Mestre: abre o socket, faz o fork dos workers e repõe os que morrerem."""
+
+    def __init__(self, args):
+        self.args = args
+        self.children: Dict[int, float] = {}  # pid → início
+        self.stopping = False
+        self.inference = None
+        self.socket_path = None
+
+    def _bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.args.host, self.args.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _prepare_model(self, factory: Callable):
+        from .email_classifier import BATCH_SIZE, set_preloaded_pipeline
+
+        mode = self.args.model_mode
+        if mode == "preload":
+            pipe = factory()
+            if pipe is None:
+                logger.info("Modelo indisponível no mestre; workers seguem só com keywords.")
+                os.environ["DISABLE_MODEL"] = "1"
+                return
+            set_preloaded_pipeline(pipe)
+        elif mode == "socket":
+            ctx = get_context("fork")
+            self.socket_path = os.path.join(tempfile.gettempdir(), f"classemail-infer-{os.getpid()}.sock")
+            authkey = os.urandom(16)
+            parent_end, child_end = ctx.Pipe(duplex=False)
+            self.inference = ctx.Process(
+                target=serve_inference, name="inference", daemon=True,
+                args=(self.socket_path, authkey, factory, child_end, max(BATCH_SIZE, self.args.infer_batch)),
+            )
+            self.inference.start()
+            if not parent_end.recv():
+                logger.info("Modelo indisponível no processo de inferência; workers seguem só com keywords.")
+                os.environ["DISABLE_MODEL"] = "1"
+                return
+            set_preloaded_pipeline(RemotePipeline(self.socket_path, authkey))
+        # o que foi criado até aqui vai para a geração permanente: o GC dos
+        # workers não percorre (nem suja) essas páginas compartilhadas
+        gc.collect()
+        gc.freeze()
+
+    def _spawn(self, sock: socket.socket, factory: Callable):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(sock, self.args, factory)
+            except BaseException:
+                logger.exception("Worker encerrou com erro")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        logger.info(f"Worker {pid} iniciado")
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        args = self.args
+        factory = _load_factory(args.pipeline)
+        self._prepare_model(factory)
+        sock = self._bind()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        logger.info(f"Servindo em http://{args.host}:{args.port} com {args.workers} workers ({args.model_mode})")
+        for _ in range(args.workers):
+            self._spawn(sock, factory)
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            if pid not in self.children:
+                if self.inference is not None and pid == self.inference.pid:
+                    logger.error(f"Processo de inferência saiu (status {status}); o modelo fica indisponível")
+                continue
+            started = self.children.pop(pid)
+            if self.stopping:
+                continue
+            logger.warning(f"Worker {pid} saiu (status {status}); iniciando outro")
+            if time.monotonic() - started < 1:
+                time.sleep(1)  # não entra em laço se o worker morre ao subir
+            self._spawn(sock, factory)
+
+        sock.close()
+        if self.inference is not None:
+            self.inference.terminate()
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def _configure_env(args):
+    """Ajustes de ambiente herdados pelos workers (lidos na importação do app)."""
+    if os.getenv("INFERENCE_POOL", "thread").lower() == "process":
+        logger.warning("INFERENCE_POOL=process ignorado: o servidor prefork compartilha um modelo só.")
+    os.environ["INFERENCE_POOL"] = "thread"
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")  # tokenizers e fork não combinam
+    if args.workers > 1:
+        os.environ.setdefault("STATS_BACKEND", "sqlite")
+    if os.getenv("STATS_BACKEND", "memory").lower() == "sqlite":
+        path = os.environ.setdefault(
+            "STATS_PATH", os.path.join(tempfile.gettempdir(), f"classemail-stats-{os.getpid()}.sqlite3")
+        )
+        from .stats import SharedStats
+        shared = SharedStats(path)
+        shared.reset()  # números valem para esta execução do servidor
+        shared.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Servidor prefork do classificador")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    ap.add_argument("--model-mode", choices=MODEL_MODES, default="preload")
+    ap.add_argument("--pipeline", help="fábrica do pipeline (modulo:funcao); padrão: load_pipeline")
+    ap.add_argument("--infer-batch", type=int, default=32, help="lote máximo do processo de inferência")
+    ap.add_argument("--keep-alive", type=int, default=5)
+    ap.add_argument("--log-level", default="info")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(process)d %(levelname)s %(message)s")
+    _configure_env(args)
+    Prefork(args).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Window:
+    """Janela deslizante em anel: ``slots`` fatias de ``width`` segundos."""
+
+    def __init__(self, slots: int, width: float):
+        self.slots = slots
+        self.width = width
+        self._ids = [-1] * slots
+        self._count = [0] * slots
+        self._conf = [0.0] * slots
+        self._productive = [0] * slots
+
+    def add(self, now: float, confidence: float, productive: bool):
+        slot_id = int(now // self.width)
+        i = slot_id % self.slots
+        if self._ids[i] != slot_id:
+            self._ids[i] = slot_id
+            self._count[i] = 0
+            self._conf[i] = 0.0
+            self._productive[i] = 0
+        self._count[i] += 1
+        self._conf[i] += confidence
+        self._productive[i] += productive
+
+    def state(self) -> Dict:
+        return {"ids": list(self._ids), "count": list(self._count),
+                "conf": list(self._conf), "productive": list(self._productive)}
+
+    def merge(self, state: Dict):
+        """Soma outra janela de mesma geometria; em cada fatia vale a mais recente."""
+        for i in range(self.slots):
+            other = state["ids"][i]
+            if other > self._ids[i]:
+                self._ids[i] = other
+                self._count[i] = self._conf[i] = self._productive[i] = 0
+            if other == self._ids[i] and other >= 0:
+                self._count[i] += state["count"][i]
+                self._conf[i] += state["conf"][i]
+                self._productive[i] += state["productive"][i]
+
+    def summary(self, now: float) -> Dict:
+        oldest = int(now // self.width) - self.slots + 1
+        count = conf = productive = 0
+        for i in range(self.slots):
+            if self._ids[i] >= oldest:
+                count += self._count[i]
+                conf += self._conf[i]
+                productive += self._productive[i]
+        span = self.slots * self.width
+        return {
+            "count": count,
+            "per_sec": count / span,
+            "average_confidence": conf / count if count else 0.0,
+            "productive_ratio": productive / count if count else 0.0,
+        }
+
+
+class StatsEngine:
+    """
+    Estatísticas de classificação em memória constante.
+
+    - média/variância incrementais (Welford), mínimo e máximo;
+    - histograma de buckets fixos em [0, 1] para p50/p90/p99 da confiança;
+    - janelas deslizantes do último minuto e da última hora;
+    - contadores por categoria e por intenção.
+    Todas as atualizações acontecem sob um lock (requisições concorrentes).
+    """
+
+    def __init__(self, buckets: int = 200):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self._hist = [0] * buckets
+        self.total = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.by_category = Counter()
+        self.by_intent = Counter()
+        self._windows = {"1m": _Window(60, 1.0), "1h": _Window(60, 60.0)}
+
+    def record(self, category: str, confidence: float, intent: Optional[str] = None):
+        confidence = float(confidence)
+        now = time.time()
+        with self._lock:
+            self.total += 1
+            delta = confidence - self._mean
+            self._mean += delta / self.total
+            self._m2 += delta * (confidence - self._mean)
+            self.min = confidence if self.min is None else min(self.min, confidence)
+            self.max = confidence if self.max is None else max(self.max, confidence)
+            self._hist[min(self.buckets - 1, max(0, int(confidence * self.buckets)))] += 1
+            self.by_category[category] += 1
+            if intent:
+                self.by_intent[intent] += 1
+            productive = category == "Produtivo"
+            for window in self._windows.values():
+                window.add(now, confidence, productive)
+
+    def state(self) -> Dict:
+        """Estado completo, serializável em JSON, para somar com o de outros processos."""
+        with self._lock:
+            return {
+                "total": self.total, "mean": self._mean, "m2": self._m2,
+                "min": self.min, "max": self.max, "hist": list(self._hist),
+                "by_category": dict(self.by_category), "by_intent": dict(self.by_intent),
+                "windows": {name: w.state() for name, w in self._windows.items()},
+            }
+
+    def merge(self, state: Dict):
+        """Soma o ``state()`` de outro motor (média/variância pela fórmula de Chan)."""
+        with self._lock:
+            n = state["total"]
+            if n:
+                total = self.total + n
+                delta = state["mean"] - self._mean
+                self._mean += delta * n / total
+                self._m2 += state["m2"] + delta * delta * self.total * n / total
+                self.total = total
+                self.min = state["min"] if self.min is None else min(self.min, state["min"])
+                self.max = state["max"] if self.max is None else max(self.max, state["max"])
+                for i, c in enumerate(state["hist"][:self.buckets]):
+                    self._hist[i] += c
+                self.by_category.update(state["by_category"])
+                self.by_intent.update(state["by_intent"])
+            for name, window in self._windows.items():
+                if name in state.get("windows", {}):
+                    window.merge(state["windows"][name])
+
+    @property
+    def mean(self) -> float:
+        return self._mean if self.total else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self._m2 / (self.total - 1)) if self.total > 1 else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Quantil aproximado pelo histograma (interpolação dentro do bucket)."""
+        with self._lock:
+            if not self.total:
+                return 0.0
+            target = q * self.total
+            seen = 0
+            for i, n in enumerate(self._hist):
+                if n and seen + n >= target:
+                    frac = (target - seen) / n
+                    value = (i + frac) / self.buckets
+                    return min(max(value, self.min), self.max)
+                seen += n
+            return self.max
+
+    def snapshot(self) -> Dict:
+        now = time.time()
+        with self._lock:
+            windows = {name: w.summary(now) for name, w in self._windows.items()}
+            by_category = dict(self.by_category)
+            by_intent = dict(self.by_intent)
+        return {
+            "total": self.total,
+            "by_category": by_category,
+            "by_intent": by_intent,
+            "confidence": {
+                "mean": self.mean,
+                "stddev": self.stddev,
+                "min": self.min,
+                "max": self.max,
+                "p50": self.quantile(0.50),
+                "p90": self.quantile(0.90),
+                "p99": self.quantile(0.99),
+            },
+            "windows": windows,
+        }
+
+
+class SharedStats:
+    """
+    Estatísticas somadas entre processos (vários workers do mesmo servidor).
+
+    Cada processo grava periodicamente o ``state()`` do seu StatsEngine numa
+    linha própria de um SQLite compartilhado; a leitura soma todas as linhas.
+    Linhas de workers que já morreram continuam contando (são classificações
+    feitas por este servidor); ``reset`` limpa a tabela ao subir o servidor.
+    """
+
+    def __init__(self, path: str, worker_id: Optional[str] = None):
+        self.path = path
+        self.worker_id = worker_id or str(os.getpid())
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS worker_stats ("
+            " worker TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional["SharedStats"]:
+        """STATS_BACKEND=memory (padrão) | sqlite, STATS_PATH."""
+        if os.getenv("STATS_BACKEND", "memory").lower() != "sqlite":
+            return None
+        path = os.getenv("STATS_PATH", "classifier_stats.sqlite3")
+        try:
+            return cls(path)
+        except sqlite3.Error as e:
+            logger.warning(f"Estatísticas compartilhadas indisponíveis ({path}): {e}")
+            return None
+
+    def publish(self, engine: StatsEngine):
+        state = json.dumps(engine.state())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO worker_stats (worker, state, updated_at) VALUES (?, ?, ?)",
+                (self.worker_id, state, time.time()),
+            )
+
+    def collect(self, buckets: int = 200) -> StatsEngine:
+        """Um StatsEngine com a soma de todos os processos."""
+        with self._lock:
+            rows = self._conn.execute("SELECT state FROM worker_stats").fetchall()
+        merged = StatsEngine(buckets)
+        for (state,) in rows:
+            merged.merge(json.loads(state))
+        return merged
+
+    def workers(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT worker, updated_at FROM worker_stats ORDER BY worker").fetchall()
+        return [{"worker": w, "updated_at": t} for w, t in rows]
+
+    def reset(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM worker_stats")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import logging
+import os
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+from .metrics import STREAM_RECORDS, count
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+async def ndjson_lines(chunks: AsyncIterator[bytes], max_line: int) -> AsyncIterator[Optional[bytes]]:
+    """
+    Linhas não vazias de um corpo NDJSON que chega em pedaços. Uma linha maior
+    que ``max_line`` vira ``None`` (descartada até o próximo \\n, sem acumular).
+    """
+    buf = bytearray()
+    skipping = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            nl = chunk.find(b"\n", start)
+            if nl < 0:
+                if not skipping:
+                    buf += chunk[start:]
+                    if len(buf) > max_line:
+                        buf.clear()
+                        skipping = True
+                break
+            if skipping:
+                skipping = False
+                yield None
+            else:
+                buf += chunk[start:nl]
+                if len(buf) > max_line:
+                    yield None
+                elif buf.strip():
+                    yield bytes(buf)
+                buf.clear()
+            start = nl + 1
+    if skipping:
+        yield None
+    elif buf.strip():
+        yield bytes(buf)
+
+
+class NDJSONResponse(StreamingResponse):
+    """
+    StreamingResponse que não escuta o ``receive``: o corpo da requisição
+    continua sendo lido pelo próprio stream enquanto a resposta sai (a
+    desconexão do cliente aparece ali, como ClientDisconnect).
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+class StreamClassifier:
+    """
+    Classificação contínua de registros NDJSON ``{"id", "text"}`` numa só conexão.
+
+    Cada linha vira uma tarefa assim que chega (as classificações simultâneas
+    caem no mesmo lote do micro-batcher) e o resultado sai como uma linha
+    ``{"id", ...resultado}`` ao terminar, ou na ordem de entrada com
+    ``ordered``. No máximo ``window`` registros ficam entre lidos e
+    enviados: com a janela cheia a leitura do corpo para, e um consumidor
+    lento segura o produtor pelo próprio TCP em vez de acumular respostas.
+    """
+
+    def __init__(self, process: Callable[[str], Awaitable[Dict]], window: int = 32,
+                 max_line: int = 4 * 1024 * 1024):
+        self.process = process
+        self.window = max(1, window)
+        self.max_line = max_line
+        self.open = 0
+        self.opened = 0
+        self.records = 0
+        self.errors = 0
+        self.peak_pending = 0  # maior número de registros lidos e ainda não enviados numa conexão
+
+    @classmethod
+    def from_env(cls, process: Callable[[str], Awaitable[Dict]]) -> "StreamClassifier":
+        """STREAM_WINDOW (registros em andamento por conexão) e STREAM_MAX_LINE (bytes por linha)."""
+        return cls(
+            process,
+            window=int(os.getenv("STREAM_WINDOW", "32")),
+            max_line=int(os.getenv("STREAM_MAX_LINE", str(4 * 1024 * 1024))),
+        )
+
+    async def _classify(self, record_id, text: str) -> Dict:
+        try:
+            result = await self.process(text)
+        except ValueError as e:
+            return self._error(record_id, str(e))
+        except Exception as e:
+            logger.exception(f"Falha ao classificar o registro {record_id!r}")
+            return self._error(record_id, f"Erro interno: {type(e).__name__}")
+        self.records += 1
+        count(STREAM_RECORDS, "ok")
+        return {"id": record_id, **result}
+
+    def _error(self, record_id, detail: str) -> Dict:
+        self.errors += 1
+        count(STREAM_RECORDS, "error")
+        return {"id": record_id, "error": detail}
+
+    def _parse(self, line: Optional[bytes], lineno: int):
+        """(id, texto) do registro, ou o dict de erro já pronto para enviar."""
+        if line is None:
+            return self._error(lineno, f"Linha maior que {self.max_line} bytes.")
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return self._error(lineno, "JSON inválido.")
+        if not isinstance(record, dict):
+            return self._error(lineno, "Cada linha deve ser um objeto {'id', 'text'}.")
+        record_id = record.get("id", lineno)
+        text = record.get("text")
+        if not isinstance(text, str) or not text.strip():
+            return self._error(record_id, "Campo 'text' ausente.")
+        return record_id, text
+
+    async def _read(self, chunks: AsyncIterator[bytes], out: asyncio.Queue, slots: asyncio.Semaphore,
+                    ordered: bool, tasks: set, state: Dict, pace: Optional[Callable[[], Awaitable]]):
+        lineno = 0
+        try:
+            async for line in ndjson_lines(chunks, self.max_line):
+                lineno += 1
+                if pace is not None:
+                    await pace()  # limite por cliente: sem token, a leitura do corpo espera
+                await slots.acquire()  # janela cheia: para de ler o corpo
+                state["read"] += 1
+                self.peak_pending = max(self.peak_pending, state["read"] - state["sent"])
+                parsed = self._parse(line, lineno)
+                if isinstance(parsed, dict):
+                    out.put_nowait(parsed)
+                    continue
+                task = asyncio.get_running_loop().create_task(self._classify(*parsed))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                if ordered:
+                    out.put_nowait(task)
+                else:
+                    task.add_done_callback(out.put_nowait)
+        except ClientDisconnect:
+            state["disconnected"] = True
+        finally:
+            out.put_nowait(_END)
+
+    async def run(self, chunks: AsyncIterator[bytes], ordered: bool = False,
+                  pace: Optional[Callable[[], Awaitable]] = None) -> AsyncIterator[bytes]:
+        """
+        Linhas NDJSON de resultado para os registros de ``chunks`` (corpo da
+        requisição). ``pace()`` é aguardado antes de cada registro (rate limit).
+        """
+        out: asyncio.Queue = asyncio.Queue()  # limitado pela janela
+        slots = asyncio.Semaphore(self.window)
+        tasks: set = set()
+        state = {"read": 0, "sent": 0, "disconnected": False}
+        reader = asyncio.get_running_loop().create_task(self._read(chunks, out, slots, ordered, tasks, state, pace))
+        self.open += 1
+        self.opened += 1
+        try:
+            reading = True
+            while reading or state["sent"] < state["read"]:
+                item = await out.get()
+                if item is _END:
+                    if state["disconnected"]:
+                        return  # ninguém para receber o resto
+                    reading = False
+                    continue
+                result = item if isinstance(item, dict) else await item
+                yield (json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8")
+                state["sent"] += 1
+                slots.release()
+            await reader  # propaga erro inesperado da leitura
+        finally:
+            self.open -= 1
+            reader.cancel()
+            for task in list(tasks):
+                task.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            "open": self.open,
+            "opened": self.opened,
+            "records": self.records,
+            "errors": self.errors,
+            "window": self.window,
+            "peak_pending": self.peak_pending,
+        }
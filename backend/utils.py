@@ -1,23 +1,20 @@
 import re
-from typing import Dict
+from functools import cached_property, lru_cache
+from typing import Dict, Optional
 import logging
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import RSLPStemmer
-from nltk.tokenize import word_tokenize
-from PyPDF2 import PdfReader
-import io
 import os
 
-logger = logging.getLogger(__name__)
+from .extractors import (  # noqa: F401 -- extração de anexos, reexportada aqui
+    EXTRACT_CHAR_BUDGET,
+    EXTRACT_MAX_PAGES,
+    EXTRACT_TIME_LIMIT,
+    extract_text_from_file,
+    extract_text_with_info,
+    iter_pdf_pages,
+)
+from .responses import RESPONSES
 
-try:
-    if os.getenv("NLTK_DOWNLOAD") == "1":
-        nltk.download('punkt', quiet=True)
-        nltk.download('stopwords', quiet=True)
-        nltk.download('rslp', quiet=True)
-except Exception as e:
-    logger.warning(f"NLTK data indisponível: {e}")
+logger = logging.getLogger(__name__)
 
 INTENT_PATTERNS = [
     ("status", r"\b(status|andamento|situa[cç][aã]o|progresso)\b"),
@@ -51,75 +48,165 @@ ACTION_TRIGGERS = [
     r"\bnf\b", r"\bnota fiscal\b", r"\bfatura\b", r"\bpendente\b",
     r"\batualiza(r|ç[aã]o)\b", r"\bd(ú|u)vida\b",
 ]
+
+# Alternações combinadas, compiladas uma vez. Para a intenção, cada padrão vira
+# um grupo nomeado dentro de um lookahead: em cada posição casa o primeiro
+# padrão (na ordem de INTENT_PATTERNS) que ocorre ali, então o menor índice
+# visto na varredura é a mesma intenção que o laço padrão a padrão devolveria.
+_ACTION_RE = re.compile("|".join(ACTION_TRIGGERS))
+_GREETING_RE = re.compile("|".join(GREETINGS_PATTERNS))
+_INTENT_RE = re.compile("(?=" + "|".join(f"(?P<{name}>{pat})" for name, pat in INTENT_PATTERNS) + ")")
+_INTENT_ORDER = {name: i for i, (name, _) in enumerate(INTENT_PATTERNS)}
+# Campos para os modelos de resposta: número de chamado (#48291, chamado 123)
+# e de NF/fatura; a primeira ocorrência de cada um, numa varredura só
+# Palavra-chave e número podem vir separados por ":" ("chamado: 48291", "NF nº: 123").
+# Número seguido de "/", "-" ou "." e mais dígitos é data, competência ou telefone,
+# não NF/chamado; ano sozinho (2024) não vira NF e "#" sem palavra-chave aceita até 8 dígitos
+_SLOTS_RE = re.compile(
+    r"\b(?:nf-?e?|nota fiscal|fatura|boleto)[:\s]*(?:n[º°o]?\.?[:\s]*)?#?\s*(?!(?:19|20)\d\d\b)"
+    r"(?P<invoice>\d{3,})\b(?![/.-]\d)"
+    r"|(?:\b(?:chamado|ticket|protocolo|solicita[cç][aã]o)[:\s]*(?:n[º°o]?\.?[:\s]*)?#?\s*|#(?=\d{3,8}\b))"
+    r"(?P<ticket>\d{3,})\b(?![/.-]\d)"
+)
+
+
+class TextAnalysis:
+    """
+    Varredura única de um e-mail, compartilhada por classificador e resposta.
+    Cada achado é calculado na primeira vez que é pedido e reaproveitado depois.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lowered = text.lower()
+
+    @cached_property
+    def normalized(self) -> str:
+        # mesmo resultado de re.sub(r"\s+", " ", ...), sem substituir cada espaço simples
+        lowered = self.lowered
+        collapsed = " ".join(lowered.split())
+        if not collapsed:
+            return " " if lowered else ""
+        return (" " if lowered[0].isspace() else "") + collapsed + (" " if lowered[-1].isspace() else "")
+
+    @cached_property
+    def has_question(self) -> bool:
+        return "?" in self.lowered
+
+    @cached_property
+    def action_hit(self) -> Optional[str]:
+        m = _ACTION_RE.search(self.normalized)
+        return m.group() if m else None
+
+    @cached_property
+    def greeting_hit(self) -> Optional[str]:
+        m = _GREETING_RE.search(self.normalized)
+        return m.group() if m else None
+
+    @cached_property
+    def greeting_no_action(self) -> bool:
+        if self.has_question:
+            return False
+        if self.action_hit is not None:
+            return False
+        return self.greeting_hit is not None
+
+    @cached_property
+    def intent(self) -> str:
+        best = len(INTENT_PATTERNS)
+        for m in _INTENT_RE.finditer(self.normalized):
+            best = min(best, _INTENT_ORDER[m.lastgroup])
+            if best == 0:
+                break
+        return INTENT_PATTERNS[best][0] if best < len(INTENT_PATTERNS) else "outro"
+
+    @cached_property
+    def slots(self) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        for m in _SLOTS_RE.finditer(self.normalized):
+            found.setdefault(m.lastgroup, m.group(m.lastgroup))
+            if len(found) == 2:
+                break
+        return found
+
+
+def analyze_text(text: str) -> TextAnalysis:
+    return TextAnalysis(text)
+
+
 def is_greeting_no_action(text: str) -> bool:
-    t = re.sub(r"\s+", " ", text.lower())
-    if "?" in t:  
-        return False
-    if any(re.search(p, t) for p in ACTION_TRIGGERS):
-        return False
-    return any(re.search(p, t) for p in GREETINGS_PATTERNS)
+    return analyze_text(text).greeting_no_action
 
 def detect_intent(text: str) -> str:
-    t = re.sub(r"\s+", " ", text.lower())
-    for name, pat in INTENT_PATTERNS:
-        if re.search(pat, t):
-            return name
-    return "outro"
-
-def suggest_response(category: str, text: str) -> str:
-    """Gera resposta curta, objetiva e segura, sem inventar dados."""
+    return analyze_text(text).intent
+
+def suggest_response(category: str, text: str, analysis: Optional[TextAnalysis] = None) -> str:
+    """Gera resposta curta, objetiva e segura, sem inventar dados (modelos em responses.py)."""
+    if analysis is None:
+        analysis = analyze_text(text)
     if category == "Improdutivo":
-        if is_greeting_no_action(text):
-            return ("Obrigado pela mensagem e pelas felicitações! "
-                    "Agradecemos o contato e permanecemos à disposição.")
-        return ("Obrigado pelo retorno! "
-                "Se precisar de alguma ação específica, é só nos sinalizar.")
-    # Produtivo → escolhe por intenção
-    intent = detect_intent(text)
-    if intent == "status":
-        return ("Claro! Para conferir o status com precisão, poderia informar o número do chamado/solicitação "
-                "e, se possível, o nome do solicitante e a data de abertura? Assim agilizamos o retorno.")
-    if intent == "login":
-        return ("Entendi o problema de acesso. Para avançarmos, envie por favor: usuário/e-mail, sistema/URL, "
-                "data e horário aproximados do erro e, se houver, a mensagem exibida (print ajuda). Vamos verificar.")
-    if intent == "fatura":
-        return ("Recebido sobre a fatura. Para tratarmos, confirme o número/competência, valor e vencimento. "
-                "Se houver comprovante ou boleto atualizado, anexe por gentileza.")
-    if intent == "anexo":
-        return ("Recebemos o(s) arquivo(s). Vamos validar e retornamos com os próximos passos. "
-                "Se houver alguma ação específica esperada, nos informe.")
-    if intent == "prazo":
-        return ("Vamos verificar o cronograma e retornar a previsão. "
-                "Se houver datas críticas, avise para priorizarmos.")
-    if intent == "api":
-        return ("Para a integração via API, compartilharemos endpoint, autenticação e exemplos de payload. "
-                "Avise o caso de uso (consulta/envio) e, se necessário, um IP/caller para liberação.")
-    if intent == "contrato":
-        return ("Vamos checar as assinaturas pendentes do contrato e retornamos com a situação e o próximo passo.")
-    if intent == "reabrir_ticket":
-        return ("Vamos reabrir o ticket. Pode informar se houve alguma mudança antes da recorrência e anexar logs/prints?")
-    if intent == "cadastro":
-        return ("Para atualizar o cadastro, envie os campos a ajustar (endereço, responsáveis, contatos) "
-                "e os documentos, se houver.")
-    if intent == "auditoria":
-        return ("Certo, podemos liberar acesso temporário (leitura) para auditoria. "
-                "Informe o e-mail do usuário e o período desejado.")
-    if intent == "divergencia":
-        return ("Obrigado pelo alerta de divergência. Compartilhe um exemplo (período, filtro e valor esperado) "
-                "para reproduzirmos e corrigirmos.")
-    if intent == "pagamento":
-        return ("Vamos consultar o financeiro sobre a previsão de pagamento e retornamos. "
-                "Se puder, informe número da NF e data de vencimento.")
-    
-    return ("Recebido! Para avançarmos mais rápido, poderia detalhar contexto, objetivo e algum ID (chamado/NF/contrato)?")
+        key = "saudacao" if analysis.greeting_no_action else "improdutivo"
+    else:
+        key = analysis.intent  # Produtivo → escolhe por intenção
+    return RESPONSES.render(key, analysis)
+
+
+_nlp = None
+_stem = None  # stemmer.stem memoizado (vocabulário de e-mail corporativo se repete muito)
+STEM_CACHE_SIZE = int(os.getenv("STEM_CACHE_SIZE", "50000"))
+
+# Pontuação e números viram espaço numa substituição só
+_CLEAN_RE = re.compile(r"[^\w\s]|\d+")
+# Únicos casos em que o word_tokenize do NLTK separa texto já sem pontuação
+# (contrações do Treebank: cannot → can not, gonna → gon na, ...)
+_TREEBANK_SPLITS_RE = re.compile(r"\b(cannot|gimme|gonna|gotta|lemme|wanna)\b", re.I)
+
+
+def get_nlp_resources() -> tuple:
+    """
+    (word_tokenize, stemmer, stopwords) do NLTK, carregados na primeira chamada.
+    O import do NLTK é pesado; adiá-lo deixa o cold start só com o caminho de keywords.
+    """
+    global _nlp
+    if _nlp is None:
+        import nltk
+        from nltk.corpus import stopwords
+        from nltk.stem import RSLPStemmer
+        from nltk.tokenize import word_tokenize
+
+        try:
+            if os.getenv("NLTK_DOWNLOAD") == "1":
+                nltk.download('punkt', quiet=True)
+                nltk.download('stopwords', quiet=True)
+                nltk.download('rslp', quiet=True)
+        except Exception as e:
+            logger.warning(f"NLTK data indisponível: {e}")
+
+        try:
+            stemmer = RSLPStemmer()
+            portuguese_stopwords = set(stopwords.words('portuguese'))
+        except:
+            stemmer = None
+            portuguese_stopwords = set()
+        global _stem
+        _stem = lru_cache(maxsize=STEM_CACHE_SIZE)(stemmer.stem) if stemmer else None
+        _nlp = (word_tokenize, stemmer, portuguese_stopwords)
+    return _nlp
+
 
+def _filter_tokens(tokens, stopwords, stem) -> list:
+    """Stopwords, stemming e tamanho mínimo numa passada só."""
+    out = []
+    append = out.append
+    for token in tokens:
+        if token in stopwords:
+            continue
+        if stem is not None:
+            token = stem(token)
+        if len(token) > 2:
+            append(token)
+    return out
 
-try:
-    stemmer = RSLPStemmer()
-    portuguese_stopwords = set(stopwords.words('portuguese'))
-except:
-    stemmer = None
-    portuguese_stopwords = set()
 
 def get_device_info() -> str:
     """Retorna info do dispositivo sem exigir PyTorch instalado."""
@@ -146,7 +233,7 @@ def get_device_info() -> str:
         return "CPU"
 
 
-def preprocess_text(text: str) -> str:
+def preprocess_text(text: str, analysis: Optional[TextAnalysis] = None) -> str:
     """
     Preprocess email text using NLP techniques:
     - Lowercase conversion
@@ -154,36 +241,30 @@ def preprocess_text(text: str) -> str:
     - Tokenization
     - Remove stopwords
     - Stemming (when available)
+    Reuses ``analysis.lowered`` when the caller already analyzed the text.
     """
     try:
-        
-        text = text.lower()
-        text = re.sub(r'[^\w\s]', ' ', text)  # Remove pontuação
-        text = re.sub(r'\d+', ' ', text)      # Remove números
-        text = re.sub(r'\s+', ' ', text)      # Remove espaços extras
-        text = text.strip()
-        
-        if not text:
+        text = analysis.lowered if analysis is not None else text.lower()
+        # pontuação e números → espaço; split já colapsa e apara os espaços
+        tokens = _CLEAN_RE.sub(' ', text).split()
+        if not tokens:
             return ""
-        
-        try:
-            tokens = word_tokenize(text, language='portuguese')
-        except:
-            
-            tokens = text.split()
-        
-        if portuguese_stopwords:
-            tokens = [token for token in tokens if token not in portuguese_stopwords]
-        
-        if stemmer:
+        text = ' '.join(tokens)
+
+        word_tokenize, stemmer, portuguese_stopwords = get_nlp_resources()
+        # Sem pontuação, o word_tokenize só difere do split nas contrações do Treebank
+        if _TREEBANK_SPLITS_RE.search(text):
             try:
-                tokens = [stemmer.stem(token) for token in tokens]
+                tokens = word_tokenize(text, language='portuguese')
             except:
-                
                 pass
-        
-        tokens = [token for token in tokens if len(token) > 2]
-        
+
+        try:
+            tokens = _filter_tokens(tokens, portuguese_stopwords, _stem if stemmer else None)
+        except:
+            # stemmer falhou: mantém os tokens sem stemming, como antes
+            tokens = _filter_tokens(tokens, portuguese_stopwords, None)
+
         return ' '.join(tokens)
         
     except Exception as e:
@@ -193,58 +274,139 @@ def preprocess_text(text: str) -> str:
         text = re.sub(r'\s+', ' ', text).strip()
         return text
 
-def calculate_keyword_score(text: str) -> Dict:
+PRODUCTIVE_KEYWORDS = (
+    'solicitação', 'solicit', 'pedido', 'requisição', 'requer',
+    'problema', 'erro', 'falha', 'bug', 'defeito', 'issue',
+    'suporte', 'ajuda', 'help', 'auxílio', 'assistência',
+    'dúvida', 'questão', 'pergunta', 'esclarecimento',
+    'status', 'andamento', 'atualização', 'progresso', 'situação',
+    'prazo', 'cronograma', 'deadline', 'entrega', 'conclusão',
+    'sistema', 'aplicação', 'software', 'plataforma', 'versão',
+    'instalação', 'configuração', 'integração', 'api', 'banco',
+    'dados', 'relatório', 'dashboard', 'login', 'acesso',
+    'documento', 'arquivo', 'anexo', 'contrato', 'proposta',
+    'orçamento', 'fatura', 'pagamento', 'cobrança', 'processo',
+    'aprovação', 'autorização', 'validação', 'conferência',
+    'urgente', 'prioridade', 'crítico', 'importante', 'emergência',
+    'imediato', 'asap', 'o quanto antes', 'brevemente'
+)
+
+UNPRODUCTIVE_KEYWORDS = (
+    'obrigado', 'obrigada', 'thanks', 'agradecimento', 'gratidão',
+    'parabéns', 'congratulações', 'felicitações', 'cumprimentos',
+    'feliz natal', 'ano novo', 'happy new year', 'boas festas',
+    'feriado', 'férias', 'vacation', 'aniversário', 'birthday',
+    'casamento', 'formatura', 'aposentadoria', 'festa', 'evento',
+    'cordialmente', 'atenciosamente', 'respeitosamente',
+    'saudações', 'abraços', 'beijos', 'carinho', 'love',
+    'tchau', 'bye', 'falou', 'até mais', 'see you', 'weekend',
+    'fim de semana', 'coffee', 'café', 'almoço', 'lunch',
+    'excellent', 'excelente', 'ótimo', 'perfeito', 'maravilhoso',
+    'fantástico', 'incrível', 'amazing', 'wonderful'
+)
+
+NON_ACTION_WORDS = (
+    'obrigado', 'obrigada', 'agradeço', 'agradecemos',
+    'parabéns', 'boas festas', 'feliz natal', 'feliz ano novo'
+)
+
+
+class KeywordMatcher:
+    """
+    Casador multi-padrão compilado uma única vez.
+
+    Monta um regex em forma de trie (prefixos comuns fatorados) com a união de
+    todas as keywords e varre o texto uma vez. Em cada posição o regex casa a
+    keyword mais longa; as menores que são prefixo dela entram pelo fecho
+    ``_implies``. A busca seguinte recomeça no primeiro deslocamento dentro do
+    match em que outra keyword poderia começar (``_resume``, pré-calculado; o
+    fim do match se nenhuma), então keywords sobrepostas não se perdem e o
+    resultado é o mesmo de ``kw in text`` para cada keyword.
+    """
+
+    def __init__(self, groups: Dict[str, tuple]):
+        self.groups = {name: tuple(kws) for name, kws in groups.items()}
+        keywords = sorted({kw for kws in self.groups.values() for kw in kws})
+        self._regex = re.compile(self._trie_pattern(keywords))
+        # keyword casada -> keywords que são prefixo dela (inclusive ela)
+        self._implies = {
+            kw: frozenset(other for other in keywords if kw.startswith(other))
+            for kw in keywords
+        }
+        # keyword casada -> menor deslocamento em que outra keyword pode começar dentro dela
+        self._resume = {
+            kw: next((i for i in range(1, len(kw))
+                      if any(other.startswith(kw[i:]) or kw[i:].startswith(other) for other in keywords)),
+                     len(kw))
+            for kw in keywords
+        }
+
+    @staticmethod
+    def _trie_pattern(keywords) -> str:
+        trie: Dict = {}
+        for kw in keywords:
+            node = trie
+            for ch in kw:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+
+        def build(node: Dict) -> str:
+            optional = "" in node
+            branches = [re.escape(ch) + build(child)
+                        for ch, child in sorted(node.items()) if ch]
+            if not branches:
+                return ""
+            body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+            if optional:
+                # guloso: prefere a keyword mais longa na mesma posição
+                body = (body if len(branches) == 1 and len(branches[0]) == 1
+                        else "(?:" + body + ")") + "?"
+            return body
+
+        return build(trie)
+
+    def find(self, text: str) -> frozenset:
+        """Conjunto de keywords presentes em ``text`` (semântica de substring)."""
+        found = set()
+        implies, resume = self._implies, self._resume
+        search = self._regex.search
+        m = search(text)
+        while m is not None:
+            kw = m.group()
+            found |= implies[kw]
+            m = search(text, m.start() + resume[kw])
+        return frozenset(found)
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Número de keywords distintas de cada grupo presentes em ``text``."""
+        found = self.find(text)
+        return {name: sum(1 for kw in kws if kw in found)
+                for name, kws in self.groups.items()}
+
+
+KEYWORD_MATCHER = KeywordMatcher({
+    'productive': PRODUCTIVE_KEYWORDS,
+    'unproductive': UNPRODUCTIVE_KEYWORDS,
+    'non_action': NON_ACTION_WORDS,
+})
+
+
+def calculate_keyword_score(text: str, analysis: Optional[TextAnalysis] = None) -> Dict:
     """
     Calculate productivity score based on corporate keywords
     Returns category, confidence, and raw score
     """
 
-    t = text.lower()
-
-    productive_keywords = [
-        'solicitação', 'solicit', 'pedido', 'requisição', 'requer',
-        'problema', 'erro', 'falha', 'bug', 'defeito', 'issue',
-        'suporte', 'ajuda', 'help', 'auxílio', 'assistência',
-        'dúvida', 'questão', 'pergunta', 'esclarecimento',
-        'status', 'andamento', 'atualização', 'progresso', 'situação',
-        'prazo', 'cronograma', 'deadline', 'entrega', 'conclusão',
-        'sistema', 'aplicação', 'software', 'plataforma', 'versão',
-        'instalação', 'configuração', 'integração', 'api', 'banco',
-        'dados', 'relatório', 'dashboard', 'login', 'acesso',
-        'documento', 'arquivo', 'anexo', 'contrato', 'proposta',
-        'orçamento', 'fatura', 'pagamento', 'cobrança', 'processo',
-        'aprovação', 'autorização', 'validação', 'conferência',
-        'urgente', 'prioridade', 'crítico', 'importante', 'emergência',
-        'imediato', 'asap', 'o quanto antes', 'brevemente'
-    ]
-
-    unproductive_keywords = [
-        'obrigado', 'obrigada', 'thanks', 'agradecimento', 'gratidão',
-        'parabéns', 'congratulações', 'felicitações', 'cumprimentos',
-        'feliz natal', 'ano novo', 'happy new year', 'boas festas',
-        'feriado', 'férias', 'vacation', 'aniversário', 'birthday',
-        'casamento', 'formatura', 'aposentadoria', 'festa', 'evento',
-        'cordialmente', 'atenciosamente', 'respeitosamente',
-        'saudações', 'abraços', 'beijos', 'carinho', 'love',
-        'tchau', 'bye', 'falou', 'até mais', 'see you', 'weekend',
-        'fim de semana', 'coffee', 'café', 'almoço', 'lunch',
-        'excellent', 'excelente', 'ótimo', 'perfeito', 'maravilhoso',
-        'fantástico', 'incrível', 'amazing', 'wonderful'
-    ]
-
-    non_action_words = [
-        'obrigado', 'obrigada', 'agradeço', 'agradecemos',
-        'parabéns', 'boas festas', 'feliz natal', 'feliz ano novo'
-    ]
-
-    productive_score = sum(1 for kw in productive_keywords if kw in t)
-    unproductive_score = sum(1 for kw in unproductive_keywords if kw in t)
-
-    for w in non_action_words:
-        if w in t and productive_score > 0:
-            productive_score -= 1
-
-    total_score = productive_score + unproductive_score
+    if analysis is None:
+        analysis = analyze_text(text)
+    t = analysis.lowered
+
+    counts = KEYWORD_MATCHER.count(t)
+    productive_score = counts['productive']
+    unproductive_score = counts['unproductive']
+
+    # cada non-action word presente desconta 1 enquanto houver score produtivo
+    productive_score = max(0, productive_score - counts['non_action'])
 
     if productive_score > unproductive_score:
         category = 'Produtivo'
@@ -256,7 +418,7 @@ def calculate_keyword_score(text: str) -> Dict:
         confidence = min(0.6 + (unproductive_score * 0.08), 0.9)
     else:
         
-        if is_greeting_no_action(t):
+        if analysis.greeting_no_action:
             category = 'Improdutivo'
             raw_score = 0
             confidence = 0.8
@@ -284,25 +446,3 @@ def validate_email_content(text: str) -> bool:
         return False
     
     return True
-
-def extract_text_from_file(file_content: bytes, filename: str) -> str:
-    """Extrai texto de .txt e .pdf (fallback de encoding para .txt)."""
-    fn = filename.lower()
-    if fn.endswith('.pdf'):
-        reader = PdfReader(io.BytesIO(file_content))
-        pages = [(p.extract_text() or "") for p in reader.pages]
-        text = "\n".join(pages).strip()
-        if not text:
-            raise ValueError("Não foi possível extrair texto do PDF (páginas vazias).")
-        return text
-    if fn.endswith('.txt'):
-        try:
-            return file_content.decode('utf-8')
-        except UnicodeDecodeError:
-            for encoding in ['latin1', 'cp1252', 'iso-8859-1']:
-                try:
-                    return file_content.decode(encoding)
-                except Exception:
-                    continue
-            raise ValueError("Não foi possível decodificar o arquivo .txt em nenhum encoding suportado.")
-    raise ValueError(f"Formato de arquivo não suportado: {filename}")
\ No newline at end of file
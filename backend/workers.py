@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturated(RuntimeError):
+    """Todos os workers ocupados e a fila cheia: a chamada é recusada na hora."""
+
+
+class BoundedExecutor:
+    """
+    Pool de threads ou processos com fila limitada, para tirar trabalho
+    bloqueante (inferência, extração de PDF) do event loop.
+
+    Aceita no máximo ``max_workers + max_queue`` tarefas pendentes; acima disso
+    ``run`` levanta PoolSaturated sem enfileirar (o app responde 503).
+    """
+
+    def __init__(self, name: str, kind: str = "thread", max_workers: int = 1,
+                 max_queue: int = 16, initializer=None, initargs=()):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Tipo de pool inválido: {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.capacity = max_workers + max_queue
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.rejected = 0
+        if kind == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=max_workers, initializer=initializer, initargs=initargs
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix=name,
+                initializer=initializer, initargs=initargs,
+            )
+
+    @classmethod
+    def from_env(cls, prefix: str, workers: int = 1, queue: int = 16,
+                 process_initializer=None) -> "BoundedExecutor":
+        """
+        Lê ``{prefix}_POOL`` (thread|process), ``{prefix}_WORKERS`` e ``{prefix}_QUEUE``.
+        ``process_initializer`` só é usado no modo processo (ex.: carregar o modelo em cada worker).
+        """
+        kind = os.getenv(f"{prefix}_POOL", "thread").lower()
+        return cls(
+            name=prefix.lower(),
+            kind=kind,
+            max_workers=int(os.getenv(f"{prefix}_WORKERS", str(workers))),
+            max_queue=int(os.getenv(f"{prefix}_QUEUE", str(queue))),
+            initializer=process_initializer if kind == "process" else None,
+        )
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def run(self, fn, *args, **kwargs):
+        """Executa ``fn(*args, **kwargs)`` no pool e aguarda sem bloquear o loop."""
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PoolSaturated(f"Pool '{self.name}' saturado ({self.capacity} tarefas pendentes).")
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
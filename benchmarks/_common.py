@@ -0,0 +1,194 @@
+"""Utilitários compartilhados pelos benchmarks (execute a partir da raiz do repo)."""
+import io
+import random
+import socket
+import statistics
+import sys
+import time
+import zipfile
+from email.message import EmailMessage
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+# Exemplos do README
+README_EXAMPLES = [
+    ("Olá, equipe! Passando só para desejar um ótimo final de ano e agradecer pelo trabalho de vocês. Abraços!", "Improdutivo"),
+    ("Parabéns pelo excelente trabalho no último trimestre!", "Improdutivo"),
+    ("Obrigado! Era só isso mesmo, bom dia!", "Improdutivo"),
+    ("Poderiam informar o status do chamado #48291? O acesso continua com erro.", "Produtivo"),
+    ("Segue anexo com a fatura. Preciso da aprovação até sexta.", "Produtivo"),
+    ("Conseguem redefinir meu login? Recebo falha de autenticação desde ontem.", "Produtivo"),
+]
+
+_FILLER = (
+    "prezados bom dia conforme conversamos na reunião de ontem seguem os pontos "
+    "discutidos com a equipe de operações e o time comercial sobre o projeto"
+).split()
+
+# Parte dos e-mails chega em inglês (clientes e fornecedores de fora)
+EN_EXAMPLES = [
+    ("Thanks a lot for the great work this quarter, have a nice weekend!", "Improdutivo"),
+    ("Could you check the status of ticket #48291? Login still fails with an error.", "Produtivo"),
+    ("Please find the invoice attached, I need the approval by Friday.", "Produtivo"),
+]
+
+_EN_FILLER = (
+    "hi team as discussed in yesterday's meeting here are the points we covered "
+    "with the operations team and the sales team regarding the project"
+).split()
+
+# Resposta "neutra" do modelo de sentimento; o resto vem de termos do texto
+_STUB_NEGATIVE = ("erro", "falha", "problema", "não consigo", "urgente", "bloquead", "lentidão",
+                  "corromp", "quebr", "divergente", "duplicidade", "inconsistente", "parad")
+_STUB_POSITIVE = ("obrigad", "parabéns", "feliz", "ótim", "excelente", "incrível", "agrade",
+                  "maravilhos", "fantástic", "prazer", "boas festas")
+
+
+def make_email(rng: random.Random, size: int, lang: str = "pt") -> str:
+    """
+    Gera um e-mail sintético de ~``size`` caracteres misturando exemplos e texto
+    neutro. ``lang``: pt, en ou mix (cada trecho sorteia o idioma).
+    """
+    parts = []
+    n = 0
+    while n < size:
+        en = lang == "en" or (lang == "mix" and rng.random() < 0.5)
+        if rng.random() < 0.2:
+            chunk = rng.choice(EN_EXAMPLES if en else README_EXAMPLES)[0]
+        else:
+            chunk = " ".join(rng.choice(_EN_FILLER if en else _FILLER) for _ in range(12)) + "."
+        parts.append(chunk)
+        n += len(chunk) + 1
+    return " ".join(parts)[:size]
+
+
+def corpus(n: int, size: int, seed: int = 42, lang: str = "pt") -> list:
+    rng = random.Random(seed)
+    return [make_email(rng, size, lang) for _ in range(n)]
+
+
+def stub_pipeline(delay_s: float = 0.0):
+    """Modelo léxico determinístico no formato do pipeline do Hugging Face, com latência simulada."""
+    def pipe(texts, batch_size=1, **kwargs):
+        if delay_s:
+            time.sleep(delay_s)
+        out = []
+        for text in texts:
+            t = text.lower()
+            neg = sum(w in t for w in _STUB_NEGATIVE)
+            pos = sum(w in t for w in _STUB_POSITIVE)
+            if neg > pos:
+                out.append({"label": "negative", "score": 0.9})
+            elif pos > neg:
+                out.append({"label": "positive", "score": 0.9})
+            else:
+                out.append({"label": "neutral", "score": 0.6})
+        return out
+    return pipe
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def timeit(fn, items, repeat: int = 3) -> dict:
+    """Roda ``fn`` sobre ``items`` ``repeat`` vezes e devolve ops/s e percentis (ms)."""
+    lat = []
+    for _ in range(repeat):
+        for it in items:
+            t0 = time.perf_counter()
+            fn(it)
+            lat.append((time.perf_counter() - t0) * 1000)
+    lat.sort()
+    total = sum(lat) / 1000
+    return {
+        "ops_per_sec": len(lat) / total if total else float("inf"),
+        "p50_ms": statistics.median(lat),
+        "p99_ms": lat[min(len(lat) - 1, int(len(lat) * 0.99))],
+    }
+
+
+def print_table(rows: list, columns: list):
+    widths = [max(len(str(c)), *(len(_fmt(r.get(c))) for r in rows)) for c in columns]
+    print("  ".join(str(c).ljust(w) for c, w in zip(columns, widths)))
+    for r in rows:
+        print("  ".join(_fmt(r.get(c)).ljust(w) for c, w in zip(columns, widths)))
+
+
+def _fmt(v) -> str:
+    if isinstance(v, float):
+        return f"{v:.3f}"
+    return "" if v is None else str(v)
+
+
+def make_pdf(pages: list, line_chars: int = 90) -> bytes:
+    """Monta um PDF mínimo (Helvetica, uma página por item de ``pages``) sem dependências."""
+    def esc(s: str) -> str:
+        return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    objects = []
+    n_pages = len(pages)
+    font_id = 3 + 2 * n_pages
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(n_pages))
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {n_pages} >>".encode())
+    for i, text in enumerate(pages):
+        lines = [text[j:j + line_chars] for j in range(0, len(text), line_chars)] or [""]
+        ops = ["BT", "/F1 9 Tf", "11 TL", "36 806 Td"]
+        ops += [f"({esc(line)}) '" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", errors="replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def make_docx(paragraphs: list) -> bytes:
+    """Monta um .docx mínimo (só word/document.xml e os manifestos) sem dependências."""
+    body = "".join(f'<w:p><w:r><w:t xml:space="preserve">{escape(p)}</w:t></w:r></w:p>' for p in paragraphs)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml",
+                    '<?xml version="1.0" encoding="UTF-8"?><Types xmlns="http://schemas.openxmlformats.org/'
+                    'package/2006/content-types"><Default Extension="xml" ContentType="application/xml"/>'
+                    '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-'
+                    'officedocument.wordprocessingml.document.main+xml"/></Types>')
+        zf.writestr("word/document.xml",
+                    '<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="http://schemas.openxmlformats.org/'
+                    f'wordprocessingml/2006/main"><w:body>{body}</w:body></w:document>')
+    return buf.getvalue()
+
+
+def make_eml(subject: str, body: str, html: str = "", attachments: list = ()) -> bytes:
+    """E-mail MIME com corpo texto (e HTML alternativo) e anexos ``(nome, bytes)``."""
+    msg = EmailMessage()
+    msg["From"] = "cliente@example.com"
+    msg["To"] = "suporte@example.com"
+    msg["Subject"] = subject
+    msg["Message-ID"] = "<bench@example.com>"
+    msg.set_content(body)
+    if html:
+        msg.add_alternative(html, subtype="html")
+    for name, data in attachments:
+        msg.add_attachment(data, maintype="application", subtype="octet-stream", filename=name)
+    return msg.as_bytes()
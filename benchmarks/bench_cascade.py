@@ -0,0 +1,117 @@
+"""
+Cascata keywords → modelo: fração de chamadas ao modelo evitadas e acurácia
+no corpus rotulado (benchmarks/data/labeled_emails.jsonl).
+
+Compara CASCADE desligado (modelo sempre roda, comportamento antigo) com a
+cascata em alguns cortes de CASCADE_KEYWORD_SCORE. No corte padrão as
+respostas precisam sair idênticas às do modo desligado (sai com erro se não).
+
+``--model stub`` (padrão) usa um modelo léxico determinístico com latência
+simulada; ``--model real`` carrega o pipeline configurado (MODEL_PATH,
+INFERENCE_BACKEND) e precisa dos pesos disponíveis localmente.
+
+    python benchmarks/bench_cascade.py --stub-ms 25
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+os.environ.setdefault("RESULT_CACHE", "off")
+os.environ.setdefault("MICROBATCH", "0")
+
+from _common import ROOT, print_table, stub_pipeline  # noqa: E402
+
+from backend.email_classifier import (  # noqa: E402
+    KEYWORD_DECISIVE_SCORE,
+    CascadePolicy,
+    EmailClassifier,
+    load_pipeline,
+)
+from backend.utils import analyze_text, preprocess_text  # noqa: E402
+
+FIXTURE = ROOT / "benchmarks" / "data" / "labeled_emails.jsonl"
+
+
+class CountingPipeline:
+    def __init__(self, pipe):
+        self.pipe = pipe
+        self.texts = 0
+
+    def __call__(self, texts, **kwargs):
+        self.texts += len(texts)
+        return self.pipe(texts, **kwargs)
+
+
+async def run(pipe, policy: CascadePolicy, rows):
+    clf = EmailClassifier()
+    counting = CountingPipeline(pipe)
+    clf.classifier_pipeline = counting
+    clf.cascade = policy
+    results, lat = [], []
+    for row in rows:
+        text = row["text"]
+        t0 = time.perf_counter()
+        analysis = analyze_text(text)
+        results.append(await clf.classify_email(preprocess_text(text, analysis), text, analysis))
+        lat.append((time.perf_counter() - t0) * 1000)
+    clf.executor.shutdown()
+    lat.sort()
+    return results, counting.texts, lat
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", choices=("stub", "real"), default="stub")
+    ap.add_argument("--stub-ms", type=float, default=25.0, help="latência simulada do forward")
+    ap.add_argument("--scores", type=int, nargs="+", default=[KEYWORD_DECISIVE_SCORE, 2, 1])
+    args = ap.parse_args()
+
+    rows = [json.loads(line) for line in FIXTURE.read_text(encoding="utf-8").splitlines() if line.strip()]
+    pipe = stub_pipeline(args.stub_ms / 1000) if args.model == "stub" else load_pipeline()
+    if pipe is None:
+        print("modelo indisponível (use --model stub)")
+        sys.exit(1)
+
+    baseline, base_calls, base_lat = asyncio.run(run(pipe, CascadePolicy(enabled=False), rows))
+
+    def summarize(name, results, calls, lat):
+        correct = sum(r["category"] == row["label"] for r, row in zip(results, rows))
+        same = sum(
+            (r["category"], r["confidence"]) == (b["category"], b["confidence"])
+            for r, b in zip(results, baseline)
+        )
+        return {
+            "policy": name,
+            "model_calls": calls,
+            "avoided": 1 - calls / base_calls if base_calls else 0.0,
+            "accuracy": correct / len(rows),
+            "same_as_off": same / len(rows),
+            "mean_ms": sum(lat) / len(lat),
+            "p50_ms": lat[len(lat) // 2],
+            "decided_by": dict(Counter(r["decided_by"] for r in results)),
+        }
+
+    table = [summarize("CASCADE=0", baseline, base_calls, base_lat)]
+    failed = False
+    for score in args.scores:
+        results, calls, lat = asyncio.run(run(pipe, CascadePolicy(keyword_score=score), rows))
+        table.append(summarize(f"score>={score}", results, calls, lat))
+        if score >= KEYWORD_DECISIVE_SCORE and table[-1]["same_as_off"] < 1.0:
+            failed = True
+
+    print(f"{len(rows)} e-mails rotulados, modelo={args.model}")
+    print_table(table, ["policy", "model_calls", "avoided", "accuracy", "same_as_off", "mean_ms", "p50_ms"])
+    print()
+    for row in table:
+        print(f"{row['policy']:>10}: {row['decided_by']}")
+    if failed:
+        print("\nERRO: a cascata no corte padrão mudou respostas")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
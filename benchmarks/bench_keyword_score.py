@@ -0,0 +1,70 @@
+"""
+Compara o calculate_keyword_score compilado (uma varredura) com a versão
+anterior (~130 buscas ``kw in t``) em e-mails curtos e de 50 KB.
+
+    python benchmarks/bench_keyword_score.py
+"""
+from _common import corpus, print_table, timeit, README_EXAMPLES
+
+from backend.utils import (
+    NON_ACTION_WORDS,
+    PRODUCTIVE_KEYWORDS,
+    UNPRODUCTIVE_KEYWORDS,
+    calculate_keyword_score,
+    is_greeting_no_action,
+)
+
+
+def legacy_calculate_keyword_score(text: str) -> dict:
+    """Implementação original (listas + uma busca de substring por keyword)."""
+    t = text.lower()
+    productive_keywords = list(PRODUCTIVE_KEYWORDS)
+    unproductive_keywords = list(UNPRODUCTIVE_KEYWORDS)
+    non_action_words = list(NON_ACTION_WORDS)
+
+    productive_score = sum(1 for kw in productive_keywords if kw in t)
+    unproductive_score = sum(1 for kw in unproductive_keywords if kw in t)
+    for w in non_action_words:
+        if w in t and productive_score > 0:
+            productive_score -= 1
+
+    if productive_score > unproductive_score:
+        category, raw_score = 'Produtivo', productive_score
+        confidence = min(0.6 + (productive_score * 0.08), 0.9)
+    elif unproductive_score > productive_score:
+        category, raw_score = 'Improdutivo', unproductive_score
+        confidence = min(0.6 + (unproductive_score * 0.08), 0.9)
+    elif is_greeting_no_action(t):
+        category, raw_score, confidence = 'Improdutivo', 0, 0.8
+    else:
+        category, raw_score, confidence = 'Produtivo', 0, 0.5
+    return {
+        'category': category,
+        'confidence': confidence,
+        'score': raw_score,
+        'productive_matches': productive_score,
+        'unproductive_matches': unproductive_score,
+    }
+
+
+def main():
+    sets = {
+        "short (~200 B)": corpus(300, 200),
+        "50 KB": corpus(20, 50 * 1024),
+    }
+    check = [t for t, _ in README_EXAMPLES] + [t for texts in sets.values() for t in texts]
+    for text in check:
+        lowered = text.lower()
+        assert calculate_keyword_score(lowered) == legacy_calculate_keyword_score(lowered), text[:80]
+    print(f"equivalência OK em {len(check)} textos\n")
+
+    rows = []
+    for name, texts in sets.items():
+        texts = [t.lower() for t in texts]
+        for impl, fn in (("legacy", legacy_calculate_keyword_score), ("compiled", calculate_keyword_score)):
+            rows.append({"corpus": name, "impl": impl, **timeit(fn, texts)})
+    print_table(rows, ["corpus", "impl", "ops_per_sec", "p50_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
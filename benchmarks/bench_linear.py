@@ -0,0 +1,105 @@
+"""
+Etapa linear (backend/linear.py): acurácia x latência contra keywords e transformer.
+
+Validação cruzada em ``--folds`` partes do corpus rotulado (o modelo linear de
+cada parte é treinado nas outras) comparando:
+
+- keywords: só regras (DISABLE_MODEL=1, sem LINEAR_MODEL);
+- linear: só o modelo linear sobre preprocess_text;
+- keywords+linear: classify_email com o linear como terceiro sinal;
+- keywords+transformer: classify_email com o modelo (stub léxico de _common
+  com ``--stub-ms`` de latência, ou o real com ``--model real``);
+- keywords+transformer+linear: os três sinais.
+
+A latência é por e-mail, do texto pré-processado até a decisão.
+
+    python benchmarks/bench_linear.py --folds 5 --stub-ms 25
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("RESULT_CACHE", "off")
+os.environ.setdefault("MICROBATCH", "0")
+
+from _common import ROOT, print_table, stub_pipeline  # noqa: E402
+
+from backend.email_classifier import EmailClassifier, load_pipeline  # noqa: E402
+from backend.linear import POSITIVE, feature_indices, train  # noqa: E402
+from backend.utils import analyze_text, preprocess_text  # noqa: E402
+
+FIXTURE = ROOT / "benchmarks" / "data" / "labeled_emails.jsonl"
+
+
+async def run_classifier(clf, rows):
+    correct, lat = 0, []
+    for row in rows:
+        t0 = time.perf_counter()
+        result = await clf.classify_email(row["processed"], row["text"], analyze_text(row["text"]))
+        lat.append((time.perf_counter() - t0) * 1e6)
+        correct += result["category"] == row["label"]
+    return correct, lat
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--folds", type=int, default=5)
+    ap.add_argument("--model", choices=("stub", "real"), default="stub")
+    ap.add_argument("--stub-ms", type=float, default=25.0)
+    ap.add_argument("--bits", type=int, default=18)
+    ap.add_argument("--epochs", type=int, default=10)
+    args = ap.parse_args()
+
+    rows = [json.loads(line) for line in FIXTURE.read_text(encoding="utf-8").splitlines() if line.strip()]
+    for row in rows:
+        row["processed"] = preprocess_text(row["text"], analyze_text(row["text"]))
+    random.Random(0).shuffle(rows)
+    pipe = stub_pipeline(args.stub_ms / 1000) if args.model == "stub" else load_pipeline()
+    if pipe is None:
+        print("modelo indisponível (use --model stub)")
+        sys.exit(1)
+
+    paths = ["keywords", "linear", "keywords+linear", "keywords+transformer", "keywords+transformer+linear"]
+    correct = {p: 0 for p in paths}
+    lat = {p: [] for p in paths}
+    for fold in range(args.folds):
+        test = rows[fold::args.folds]
+        train_rows = [r for i, r in enumerate(rows) if i % args.folds != fold]
+        examples = [(feature_indices(r["processed"], args.bits), int(r["label"] == POSITIVE)) for r in train_rows]
+        model = train(examples, bits=args.bits, epochs=args.epochs)
+
+        for row in test:
+            t0 = time.perf_counter()
+            category, _ = model.classify(row["processed"])
+            lat["linear"].append((time.perf_counter() - t0) * 1e6)
+            correct["linear"] += category == row["label"]
+
+        for path in ("keywords", "keywords+linear", "keywords+transformer", "keywords+transformer+linear"):
+            clf = EmailClassifier()
+            clf.classifier_pipeline = pipe if "transformer" in path else None
+            clf.linear = model if path.endswith("linear") else None
+            c, fold_lat = asyncio.run(run_classifier(clf, test))
+            clf.executor.shutdown()
+            correct[path] += c
+            lat[path] += fold_lat
+
+    table = []
+    for path in paths:
+        values = sorted(lat[path])
+        table.append({
+            "path": path,
+            "accuracy": correct[path] / len(rows),
+            "mean_us": sum(values) / len(values),
+            "p50_us": values[len(values) // 2],
+            "p99_us": values[min(len(values) - 1, int(len(values) * 0.99))],
+        })
+    print(f"{len(rows)} e-mails, validação cruzada em {args.folds} partes, transformer={args.model}")
+    print_table(table, ["path", "accuracy", "mean_us", "p50_us", "p99_us"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+E-mails longos: LONG_EMAIL_MODE=truncate (512 caracteres) contra chunked
+(histórico citado/assinatura removidos, janelas de tokens, agregação).
+
+Gera threads sintéticas: a resposta mais recente tem um preâmbulo neutro e
+o pedido (com termos de problema) só no fim; abaixo vem o histórico citado
+cheio de agradecimentos. Para cada tamanho total relata a latência do
+modelo (p50), quantas janelas foram ao modelo e em quantos e-mails o modelo
+"viu" o pedido (rótulo negativo no stub). O stub cobra um custo por token,
+como um forward real com padding.
+
+    python benchmarks/bench_long_email.py --sizes 500 2000 8000 32000 128000
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault("RESULT_CACHE", "off")
+os.environ.setdefault("MICROBATCH", "0")
+
+from _common import print_table  # noqa: E402
+
+import backend.chunking as chunking  # noqa: E402
+from backend.email_classifier import EmailClassifier  # noqa: E402
+
+_NEUTRAL = ("conforme conversamos na reunião de ontem seguem os pontos discutidos com a equipe "
+            "de operações e o time comercial sobre o planejamento do próximo trimestre").split()
+REQUEST = "Precisamos de ajuda: o sistema apresenta erro e falha no login desde ontem, está bloqueado."
+HISTORY = "> Obrigado pelo retorno! Parabéns pelo excelente trabalho, ótimo fim de semana a todos.\n"
+
+
+def make_thread(rng: random.Random, size: int) -> str:
+    preamble_words = max(5, size // 3 // 8)
+    reply = "Olá, equipe.\n\n" + " ".join(rng.choice(_NEUTRAL) for _ in range(preamble_words)) + "\n\n" + REQUEST
+    reply += "\n\nAtenciosamente,\n-- \nAna Souza\nCoordenadora de Operações\n\n"
+    reply += "Em qui., 6 de jun. de 2024 às 09:12, Carlos <carlos@empresa.com> escreveu:\n"
+    while len(reply) < size:
+        reply += HISTORY
+    return reply[:max(size, reply.index("Em qui.") + 10)]
+
+
+def stub_pipeline(base_ms: float, per_token_ms: float):
+    def pipe(texts, batch_size=1, **kwargs):
+        # custo de um forward com padding: lote x maior sequência (até 512 tokens)
+        longest = max(min(512, int(len(t.split()) * chunking.TOKENS_PER_WORD) + 2) for t in texts)
+        time.sleep((base_ms + per_token_ms * longest * len(texts)) / 1000)
+        out = []
+        for t in texts:
+            low = t.lower()
+            if "erro" in low or "falha" in low:
+                out.append({"label": "negative", "score": 0.92})
+            elif "obrigado" in low or "parabéns" in low:
+                out.append({"label": "positive", "score": 0.9})
+            else:
+                out.append({"label": "neutral", "score": 0.7})
+        return out
+    return pipe
+
+
+class Recorder:
+    def __init__(self, pipe):
+        self.pipe = pipe
+        self.calls = []
+
+    def __call__(self, texts, **kwargs):
+        outputs = self.pipe(texts, **kwargs)
+        self.calls.append(outputs)
+        return outputs
+
+
+async def measure(mode: str, texts, pipe):
+    chunking.LONG_EMAIL_MODE = mode
+    clf = EmailClassifier()
+    rec = Recorder(pipe)
+    clf.classifier_pipeline = rec
+    lat, windows, saw_request = [], 0, 0
+    for text in texts:
+        inputs = clf._model_inputs(text)
+        windows += len(inputs)
+        t0 = time.perf_counter()
+        outputs = await clf._infer_many(inputs)
+        lat.append((time.perf_counter() - t0) * 1000)
+        saw_request += chunking.aggregate(outputs)["label"] == "negative"
+    clf.executor.shutdown()
+    lat.sort()
+    return {
+        "p50_ms": lat[len(lat) // 2],
+        "p99_ms": lat[min(len(lat) - 1, int(len(lat) * 0.99))],
+        "windows": windows / len(texts),
+        "saw_request": saw_request / len(texts),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 8000, 32000, 128000])
+    ap.add_argument("--n", type=int, default=30, help="e-mails por tamanho")
+    ap.add_argument("--base-ms", type=float, default=3.0)
+    ap.add_argument("--per-token-ms", type=float, default=0.02)
+    args = ap.parse_args()
+
+    pipe = stub_pipeline(args.base_ms, args.per_token_ms)
+    rng = random.Random(11)
+    rows = []
+    for size in args.sizes:
+        texts = [make_thread(rng, size) for _ in range(args.n)]
+        for mode in ("truncate", "chunked"):
+            row = asyncio.run(measure(mode, texts, pipe))
+            rows.append({"chars": size, "mode": mode, **row})
+    print(f"CHUNK_TOKENS={chunking.CHUNK_TOKENS} CHUNK_STRIDE={chunking.CHUNK_STRIDE} "
+          f"CHUNK_MAX={chunking.CHUNK_MAX} CHUNK_AGGREGATE={chunking.CHUNK_AGGREGATE}")
+    print_table(rows, ["chars", "mode", "p50_ms", "p99_ms", "windows", "saw_request"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Custo da instrumentação por etapa: classify_email (sem modelo) sobre o mesmo
+corpus com METRICS_ENABLED=0 e =1, cada modo num subprocesso (o flag é lido no
+import). Também mede o custo isolado de um ``with stage(...)``.
+
+    python benchmarks/bench_metrics_overhead.py --n 2000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from _common import corpus, print_table, timeit
+
+
+def worker(n: int) -> dict:
+    import asyncio
+
+    from backend.email_classifier import EmailClassifier
+    from backend.metrics import stage
+    from backend.utils import analyze_text
+
+    clf = EmailClassifier()
+    clf.cache = None
+    texts = corpus(n, 600, seed=5)
+    loop = asyncio.new_event_loop()
+
+    def classify(text):
+        loop.run_until_complete(clf.classify_email("", text, analyze_text(text)))
+
+    def empty_stage(_):
+        with stage("noop"):
+            pass
+
+    row = timeit(classify, texts, repeat=3)
+    row["stage_ns"] = timeit(empty_stage, range(100000), repeat=3)["p50_ms"] * 1e6
+    return row
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000)
+    ap.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.n)))
+        return
+
+    rows = []
+    for enabled in ("0", "1"):
+        env = {**os.environ, "METRICS_ENABLED": enabled, "DISABLE_MODEL": "1", "MICROBATCH": "0"}
+        proc = subprocess.run([sys.executable, __file__, "--worker", "--n", str(args.n)],
+                              capture_output=True, text=True, env=env, check=True)
+        rows.append({"METRICS_ENABLED": enabled, **json.loads(proc.stdout.strip().splitlines()[-1])})
+    print_table(rows, ["METRICS_ENABLED", "ops_per_sec", "p50_ms", "p99_ms", "stage_ns"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Vazão de classify_email sob concorrência com e sem o micro-batching.
+
+O pipeline stub custa ``--fixed-ms`` por forward + ``--per-item-ms`` por texto,
+imitando o perfil de um transformer (overhead de chamada alto, lote barato).
+
+    python benchmarks/bench_microbatch.py --concurrency 64 --requests 512
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("DISABLE_MODEL", "1")
+
+from _common import corpus, print_table  # noqa: E402
+
+from backend.batching import MicroBatcher  # noqa: E402
+from backend.email_classifier import EmailClassifier  # noqa: E402
+from backend.workers import BoundedExecutor  # noqa: E402
+
+
+def stub_pipeline(fixed_ms: float, per_item_ms: float):
+    def run(texts, **kwargs):
+        time.sleep((fixed_ms + per_item_ms * len(texts)) / 1000)
+        return [{"label": "neutral", "score": 0.6} for _ in texts]
+    return run
+
+
+async def drive(clf: EmailClassifier, texts: list, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    lat = []
+
+    async def one(text):
+        async with sem:
+            t0 = time.perf_counter()
+            await clf.classify_email("", text)
+            lat.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(t) for t in texts))
+    elapsed = time.perf_counter() - t0
+    lat.sort()
+    return {
+        "req_per_sec": len(texts) / elapsed,
+        "p50_ms": lat[len(lat) // 2],
+        "p99_ms": lat[min(len(lat) - 1, int(len(lat) * 0.99))],
+    }
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--requests", type=int, default=512)
+    ap.add_argument("--fixed-ms", type=float, default=20)
+    ap.add_argument("--per-item-ms", type=float, default=1)
+    ap.add_argument("--max-wait-ms", type=float, default=2)
+    ap.add_argument("--max-batch", type=int, default=16)
+    args = ap.parse_args()
+
+    # textos neutros: passam pelo modelo (sem curto-circuito por saudação/keywords)
+    texts = [f"mensagem {i}: " + t for i, t in enumerate(corpus(args.requests, 120))]
+    rows = []
+    for mode in ("per-request", "microbatch"):
+        clf = EmailClassifier()
+        clf.classifier_pipeline = stub_pipeline(args.fixed_ms, args.per_item_ms)
+        # 1 worker, fila grande o bastante para a concorrência do teste (sem 503)
+        clf.executor = BoundedExecutor("inference", max_workers=1, max_queue=args.concurrency)
+        clf.batcher = (
+            MicroBatcher(clf._run_pipeline, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+            if mode == "microbatch" else None
+        )
+        row = {"mode": mode, **(await drive(clf, texts, args.concurrency))}
+        if clf.batcher is not None:
+            st = clf.batcher.stats()
+            row["avg_batch"] = st["avg_batch_size"]
+        rows.append(row)
+        clf.executor.shutdown()
+    print_table(rows, ["mode", "req_per_sec", "p50_ms", "p99_ms", "avg_batch"])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+"""
+Índice de quase-duplicados (backend/neardup.py) com até 1M de entradas.
+
+Preenche o índice com impressões de 64 bits: ``--templates`` modelos
+repetidos com até ``max_distance`` bits trocados (``--template-share`` das
+entradas, como os "status do chamado" em massa) e o resto aleatório. Depois
+mede a busca (match) de quase-duplicados de entradas conhecidas e de
+impressões aleatórias: p50/p99, recall e falsos positivos, além de inserções
+por segundo e memória (RSS) do índice. Por fim, o custo de calcular a
+impressão de e-mails reais (preprocess_text → fingerprint).
+
+    python benchmarks/bench_neardup.py --entries 1000000
+"""
+import argparse
+import random
+import time
+
+from _common import corpus, print_table
+
+from backend.neardup import NearDuplicateIndex
+from backend.utils import analyze_text, preprocess_text
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def flip(rng: random.Random, fp: int, bits: int) -> int:
+    for i in rng.sample(range(64), bits):
+        fp ^= 1 << i
+    return fp
+
+
+def pct(values: list, p: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float("nan")
+
+
+def measure(index: NearDuplicateIndex, queries: list, expect_match: bool) -> dict:
+    lat, found = [], 0
+    for fp in queries:
+        t0 = time.perf_counter()
+        cluster, _ = index.match(fp)
+        lat.append((time.perf_counter() - t0) * 1e6)
+        found += cluster is not None
+    lat.sort()
+    return {
+        "queries": len(queries),
+        "p50_us": pct(lat, 0.5),
+        "p99_us": pct(lat, 0.99),
+        "max_us": lat[-1],
+        ("recall" if expect_match else "false_match"): found / len(queries),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entries", type=int, default=1_000_000)
+    ap.add_argument("--max-distance", type=int, default=3)
+    ap.add_argument("--templates", type=int, default=1000)
+    ap.add_argument("--template-share", type=float, default=0.3)
+    ap.add_argument("--queries", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    d = args.max_distance
+    templates = [rng.getrandbits(64) for _ in range(args.templates)]
+    fps = [
+        flip(rng, rng.choice(templates), rng.randint(0, d)) if rng.random() < args.template_share
+        else rng.getrandbits(64)
+        for _ in range(args.entries)
+    ]
+
+    index = NearDuplicateIndex(max_entries=args.entries, max_distance=d, ttl=1e9)
+    decision = {"category": "Produtivo", "confidence": 0.9}
+    before = rss_mb()
+    started = time.perf_counter()
+    for fp in fps:
+        cluster, _ = index.match(fp)
+        index.add(fp, cluster, decision, "")
+    build_s = time.perf_counter() - started
+    after = rss_mb()
+    print(f"{len(index)} entradas, {index.stats()['clusters']} clusters; "
+          f"{args.entries / build_s:,.0f} match+add/s; RSS do índice ≈ {after - before:.0f} MB")
+
+    # quase-duplicados das entradas mais recentes (as antigas podem ter saído dos baldes cheios)
+    recent = fps[-min(len(fps), 200_000):]
+    near = [flip(rng, rng.choice(recent), rng.randint(1, d)) for _ in range(args.queries)]
+    tmpl = [flip(rng, rng.choice(templates), rng.randint(0, d)) for _ in range(args.queries)]
+    rand = [rng.getrandbits(64) for _ in range(args.queries)]
+    rows = [
+        {"query": "quase-duplicado recente", **measure(index, near, True)},
+        {"query": "modelo repetido", **measure(index, tmpl, True)},
+        {"query": "aleatória", **measure(index, rand, False)},
+    ]
+    print_table(rows, ["query", "queries", "p50_us", "p99_us", "max_us", "recall", "false_match"])
+
+    texts = corpus(500, 600, seed=1) + corpus(500, 2000, seed=2)
+    processed = [preprocess_text(t, analyze_text(t)) for t in texts]
+    for p in processed:  # aquece o cache de hashes por token, como num servidor em uso
+        index.fingerprint(p)
+    t0 = time.perf_counter()
+    for p in processed:
+        index.fingerprint(p)
+    print(f"\nfingerprint: {(time.perf_counter() - t0) / len(processed) * 1e6:.1f} µs por e-mail "
+          f"({sum(len(p.split()) for p in processed) / len(processed):.0f} tokens em média)")
+
+
+if __name__ == "__main__":
+    main()
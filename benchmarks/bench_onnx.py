@@ -0,0 +1,128 @@
+"""
+Backends de inferência em CPU: torch fp32 vs. ONNX Runtime fp32 vs. ONNX int8.
+
+Roda cada backend num subprocesso (RSS isolado) sobre o mesmo corpus e relata
+latência de um texto (p50/p99), vazão em lote, RSS após carregar/rodar e a
+concordância de rótulos (mapeados para categoria) com o torch. Funciona só com
+arquivos locais: ``--model-dir`` é um diretório HF (config, tokenizer, pesos);
+o ``model.onnx`` é exportado lá na primeira execução se não existir.
+
+    python benchmarks/bench_onnx.py --model-dir ./models/roberta-sentiment --threads 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+from _common import corpus, print_table  # noqa: E402
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def build(backend: str, model_dir: str, threads: int):
+    if backend == "torch":
+        import torch
+        from transformers import pipeline
+
+        torch.set_num_threads(threads)
+        return pipeline("sentiment-analysis", model=model_dir, tokenizer=model_dir,
+                        device=-1, max_length=512, truncation=True)
+    from backend.inference import OnnxSentimentPipeline
+
+    return OnnxSentimentPipeline(model_dir, quantize=backend == "onnx-int8", threads=threads)
+
+
+def worker(backend: str, model_dir: str, threads: int, n: int, batch: int) -> dict:
+    from backend.email_classifier import EmailClassifier
+
+    texts = [t[:512] for t in corpus(n, 400, seed=3)]
+    base = rss_mb()
+    t0 = time.perf_counter()
+    pipe = build(backend, model_dir, threads)
+    load_s = time.perf_counter() - t0
+    pipe(texts[:2], batch_size=2)  # warm-up
+
+    lat = []
+    for text in texts[:min(n, 100)]:
+        t0 = time.perf_counter()
+        pipe([text], batch_size=1)
+        lat.append((time.perf_counter() - t0) * 1000)
+    lat.sort()
+
+    t0 = time.perf_counter()
+    outputs = pipe(texts, batch_size=batch)
+    throughput = len(texts) / (time.perf_counter() - t0)
+
+    categories = [EmailClassifier._map_ai_label(o)[0] for o in outputs]
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "p50_ms": lat[len(lat) // 2],
+        "p99_ms": lat[min(len(lat) - 1, int(len(lat) * 0.99))],
+        "batch_per_sec": throughput,
+        "rss_mb": rss_mb() - base,
+        "labels": [o["label"] for o in outputs],
+        "categories": categories,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model-dir", required=True)
+    ap.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--n", type=int, default=256)
+    ap.add_argument("--batch", type=int, default=16)
+    ap.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    ap.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.worker, args.model_dir, args.threads, args.n, args.batch)))
+        return
+
+    if any(b.startswith("onnx") for b in args.backends) and not os.path.exists(
+        os.path.join(args.model_dir, "model.onnx")
+    ):
+        from backend.inference import export_onnx
+
+        print(f"exportando {args.model_dir}/model.onnx ...")
+        export_onnx(args.model_dir)
+
+    results = []
+    for backend in args.backends:
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", backend, "--model-dir", args.model_dir,
+             "--threads", str(args.threads), "--n", str(args.n), "--batch", str(args.batch)],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            print(f"[{backend}] falhou:\n{proc.stderr[-2000:]}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    reference = next((r for r in results if r["backend"] == "torch"), results[0] if results else None)
+    for r in results:
+        same_label = sum(a == b for a, b in zip(r["labels"], reference["labels"]))
+        same_cat = sum(a == b for a, b in zip(r["categories"], reference["categories"]))
+        r["label_agree"] = same_label / len(r["labels"])
+        r["category_agree"] = same_cat / len(r["categories"])
+    print(f"threads={args.threads} n={args.n} batch={args.batch} (concordância vs. {reference['backend'] if reference else '-'})")
+    print_table(results, ["backend", "load_s", "p50_ms", "p99_ms", "batch_per_sec", "rss_mb",
+                          "label_agree", "category_agree"])
+
+
+if __name__ == "__main__":
+    main()
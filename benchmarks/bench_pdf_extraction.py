@@ -0,0 +1,46 @@
+"""
+Extração de PDF: leitura completa (todas as páginas) vs. streaming com
+orçamento de caracteres / limite de páginas.
+
+    python benchmarks/bench_pdf_extraction.py --pages 200
+"""
+import argparse
+import os
+
+os.environ.setdefault("EXTRACT_CACHE", "off")  # cada modo repete o mesmo PDF: mede a extração, não o cache
+
+from _common import corpus, make_pdf, print_table, timeit  # noqa: E402
+
+from backend.utils import extract_text_with_info  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=200)
+    ap.add_argument("--page-chars", type=int, default=3000)
+    args = ap.parse_args()
+
+    pdf = make_pdf(corpus(args.pages, args.page_chars))
+    print(f"PDF sintético: {args.pages} páginas, {len(pdf) / 1024:.0f} KB\n")
+
+    configs = {
+        "full": dict(char_budget=0, max_pages=0, time_limit=0),
+        "budget 20k chars": dict(char_budget=20000, max_pages=0, time_limit=0),
+        "budget 2k chars": dict(char_budget=2000, max_pages=0, time_limit=0),
+        "max 10 pages": dict(char_budget=0, max_pages=10, time_limit=0),
+    }
+    rows = []
+    for name, limits in configs.items():
+        _, info = extract_text_with_info(pdf, "doc.pdf", **limits)
+        rows.append({
+            "mode": name,
+            **timeit(lambda _: extract_text_with_info(pdf, "doc.pdf", **limits), [None], repeat=5),
+            "pages": info["pages"],
+            "chars": info["chars"],
+            "stop": info["stop_reason"],
+        })
+    print_table(rows, ["mode", "ops_per_sec", "p50_ms", "pages", "chars", "stop"])
+
+
+if __name__ == "__main__":
+    main()
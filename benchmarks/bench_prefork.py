@@ -0,0 +1,171 @@
+"""
+Servidor prefork (backend/server.py): memória por worker e vazão agregada
+com 1/2/4/8 workers, modelo carregado antes do fork (preload), num processo
+de inferência (socket) ou em cada worker (per-worker, como ``uvicorn --workers``).
+
+O "modelo" é um stub com ``--model-mb`` de pesos (memória de fato tocada) e
+``--infer-ms`` de CPU por texto, carregado pelo servidor via ``--pipeline``.
+A memória vem de /proc/<pid>/smaps_rollup (Linux), medida depois da carga:
+PSS divide as páginas compartilhadas entre os processos que as usam, USS é o
+que só aquele processo tem. Vazão com vários workers depende de haver CPUs
+livres (o teto é min(workers, núcleos) / infer-ms).
+
+    python benchmarks/bench_prefork.py --workers 1 2 4 8 --seconds 5
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from _common import ROOT, free_port, print_table, stub_pipeline
+
+TEXT = "Bom dia, conforme conversamos na reunião de ontem seguem os pontos do projeto"
+
+
+def ballast_pipeline():
+    """Fábrica usada pelo servidor: pesos falsos de BENCH_MODEL_MB e CPU de BENCH_INFER_MS por texto."""
+    weights = b"\x01" * (int(os.getenv("BENCH_MODEL_MB", "256")) << 20)
+    infer_s = float(os.getenv("BENCH_INFER_MS", "5")) / 1000
+    lexical = stub_pipeline()
+
+    def pipe(texts, batch_size=1, **kwargs):
+        end = time.perf_counter() + infer_s * len(texts)
+        while time.perf_counter() < end:  # forward ocupa a CPU (não só espera)
+            pass
+        return lexical(texts)
+
+    pipe.weights = weights
+    return pipe
+
+
+def smaps(pid: int) -> dict:
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                out[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return out
+
+
+def children(pid: int) -> list:
+    pids = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            pids += [int(p) for p in f.read().split()]
+    return pids
+
+
+def request(conn, body: dict):
+    conn.request("POST", "/api/classify-text", body=json.dumps(body), headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    resp.read()
+    return resp.status
+
+
+def client(port: int, seconds: float, threads: int, seed: int) -> list:
+    """Processo cliente: ``threads`` conexões keep-alive; devolve as latências (ms) dos 200."""
+    lat, lock = [], threading.Lock()
+    end = time.time() + seconds
+
+    def loop(k):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        n = 0
+        while time.time() < end:
+            n += 1
+            t0 = time.perf_counter()
+            status = request(conn, {"text": f"{TEXT} {seed}-{k}-{n}"})
+            if status == 200:
+                with lock:
+                    lat.append((time.perf_counter() - t0) * 1000)
+        conn.close()
+
+    ts = [threading.Thread(target=loop, args=(k,)) for k in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return lat
+
+
+def get_json(port: int, path: str) -> dict:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("GET", path)
+    data = json.loads(conn.getresponse().read())
+    conn.close()
+    return data
+
+
+def wait_ready(port: int, workers: int, timeout: float = 120):
+    deadline = time.time() + timeout
+    ready = 0
+    while time.time() < deadline and ready < 3 * workers:
+        try:
+            ready = ready + 1 if get_json(port, "/api/health").get("models_loaded") else 0
+        except OSError:
+            time.sleep(0.2)
+    if ready < 3 * workers:
+        raise RuntimeError("servidor não ficou pronto")
+
+
+def run(mode: str, workers: int, args) -> dict:
+    port = free_port()
+    env = dict(os.environ, BENCH_MODEL_MB=str(args.model_mb), BENCH_INFER_MS=str(args.infer_ms),
+               RESULT_CACHE="off", PYTHONPATH=os.pathsep.join([str(ROOT), str(ROOT / "benchmarks")]))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "backend.server", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--model-mode", mode, "--pipeline", "bench_prefork:ballast_pipeline",
+         "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        wait_ready(port, workers)
+        with ProcessPoolExecutor(args.clients) as pool:
+            futures = [pool.submit(client, port, args.seconds, args.threads, i) for i in range(args.clients)]
+            lat = sorted(x for f in futures for x in f.result())
+        time.sleep(1.5)  # cada worker publica as estatísticas a cada STATS_FLUSH (1 s)
+        stats = get_json(port, "/api/stats")
+        procs = [smaps(pid) for pid in [proc.pid] + children(proc.pid)]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(30)
+    total_pss = sum(p["Pss"] for p in procs)
+    return {
+        "mode": mode,
+        "workers": workers,
+        "req_per_sec": len(lat) / args.seconds,
+        "p50_ms": lat[len(lat) // 2] if lat else None,
+        "p99_ms": lat[min(len(lat) - 1, int(len(lat) * 0.99))] if lat else None,
+        "pss_total_mb": total_pss,
+        "pss_per_worker_mb": total_pss / workers,
+        "uss_max_mb": max(p["Private_Clean"] + p["Private_Dirty"] for p in procs),
+        "stats_total": stats["total_classifications"],
+        "served": len(lat),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--modes", nargs="+", default=["preload", "socket", "per-worker"])
+    ap.add_argument("--model-mb", type=int, default=256, help="tamanho dos pesos do stub")
+    ap.add_argument("--infer-ms", type=float, default=5.0, help="CPU por texto no stub")
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--clients", type=int, default=2, help="processos cliente")
+    ap.add_argument("--threads", type=int, default=16, help="conexões por processo cliente")
+    args = ap.parse_args()
+
+    rows = [run(mode, n, args) for mode in args.modes for n in args.workers]
+    print(f"modelo stub: {args.model_mb} MB, {args.infer_ms} ms de CPU por texto; {os.cpu_count()} CPUs")
+    print_table(rows, ["mode", "workers", "req_per_sec", "p50_ms", "p99_ms", "pss_total_mb",
+                       "pss_per_worker_mb", "uss_max_mb", "stats_total", "served"])
+
+
+if __name__ == "__main__":
+    main()
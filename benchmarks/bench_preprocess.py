@@ -0,0 +1,117 @@
+"""
+preprocess_text atual (limpeza numa regex, split como tokenizador rápido,
+stemming memoizado, filtros numa passada) contra a versão anterior
+(word_tokenize + três list comprehensions + RSLPStemmer.stem por token).
+
+O corpus é português sintético com frequência de Zipf sobre um vocabulário
+gerado (radicais x sufixos), mais os exemplos do README. Confere saída
+idêntica byte a byte em todo o corpus (sai com erro se divergir) e relata
+tokens/s. Usa os recursos do NLTK que estiverem instalados; sem os dados
+punkt/rslp/stopwords, os dois caminhos caem nos mesmos fallbacks.
+
+    python benchmarks/bench_preprocess.py --n 2000 --size 1500
+"""
+import argparse
+import random
+import re
+import sys
+
+from _common import README_EXAMPLES, print_table, timeit
+
+import backend.utils as utils
+from backend.utils import get_nlp_resources, preprocess_text
+
+_STEMS = (
+    "process", "solicit", "contrat", "pagament", "factur", "atualiz", "verific", "document",
+    "cadastr", "relat", "aprov", "entreg", "acess", "integr", "configur", "reuni", "equip",
+    "client", "fornec", "projet", "prazo", "sistem", "servi", "financ", "comerci", "operac",
+    "planej", "analis", "respond", "envi", "receb", "confirm", "agend", "cancel", "renov",
+)
+_SUFFIXES = (
+    "", "o", "a", "os", "as", "ar", "ado", "ada", "ados", "amento", "amentos", "ação", "ações",
+    "ando", "ou", "aram", "ável", "ização", "imos", "emos", "ia", "ias", "eiro", "ente", "ência",
+)
+_STOP = "de a o que e do da em um para com não uma os no se na por mais as dos como mas ao ele das".split()
+
+
+def synthetic_corpus(n: int, size: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    vocab = [s + x for s in _STEMS for x in _SUFFIXES] + _STOP * 3
+    rng.shuffle(vocab)
+    weights = [1 / (rank + 1) for rank in range(len(vocab))]  # Zipf
+    texts = []
+    for _ in range(n):
+        words, length = [], 0
+        while length < size:
+            if rng.random() < 0.05:
+                w = rng.choice(README_EXAMPLES)[0]
+            else:
+                w = rng.choices(vocab, weights)[0]
+                if rng.random() < 0.1:
+                    w = w.capitalize() + rng.choice((",", ".", ";", " #" + str(rng.randint(1, 99999))))
+            words.append(w)
+            length += len(w) + 1
+        texts.append(" ".join(words))
+    return texts
+
+
+def legacy_preprocess_text(text: str) -> str:
+    """Implementação anterior de preprocess_text."""
+    try:
+        text = text.lower()
+        text = re.sub(r'[^\w\s]', ' ', text)
+        text = re.sub(r'\d+', ' ', text)
+        text = re.sub(r'\s+', ' ', text)
+        text = text.strip()
+        if not text:
+            return ""
+        word_tokenize, stemmer, portuguese_stopwords = get_nlp_resources()
+        try:
+            tokens = word_tokenize(text, language='portuguese')
+        except Exception:
+            tokens = text.split()
+        if portuguese_stopwords:
+            tokens = [token for token in tokens if token not in portuguese_stopwords]
+        if stemmer:
+            try:
+                tokens = [stemmer.stem(token) for token in tokens]
+            except Exception:
+                pass
+        tokens = [token for token in tokens if len(token) > 2]
+        return ' '.join(tokens)
+    except Exception:
+        text = re.sub(r'[^\w\s]', ' ', text.lower())
+        return re.sub(r'\s+', ' ', text).strip()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000)
+    ap.add_argument("--size", type=int, default=1500, help="caracteres por e-mail")
+    args = ap.parse_args()
+
+    texts = synthetic_corpus(args.n, args.size) + [t for t, _ in README_EXAMPLES]
+    _, stemmer, stopwords = get_nlp_resources()
+    print(f"stemmer={'RSLP' if stemmer else 'indisponível'} stopwords={len(stopwords)}")
+
+    mismatches = [t for t in texts if preprocess_text(t) != legacy_preprocess_text(t)]
+    if mismatches:
+        print(f"DIVERGÊNCIA em {len(mismatches)} textos, ex.: {mismatches[0][:120]!r}")
+        sys.exit(1)
+    print(f"saída idêntica em {len(texts)} textos\n")
+
+    n_tokens = sum(len(t.split()) for t in texts)
+    rows = []
+    for name, fn in (("anterior", legacy_preprocess_text), ("atual", preprocess_text)):
+        if utils._stem is not None:
+            utils._stem.cache_clear()  # mede também o aquecimento do memo
+        row = {"impl": name, **timeit(fn, texts, repeat=3)}
+        row["tokens_per_sec"] = row["ops_per_sec"] * n_tokens / len(texts)
+        rows.append(row)
+    print_table(rows, ["impl", "tokens_per_sec", "ops_per_sec", "p50_ms", "p99_ms"])
+    if utils._stem is not None:
+        print(f"\nmemo de stems: {utils._stem.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Cold start: custo de import do app e tempo até a primeira resposta / modelo pronto.
+
+1. ``python -X importtime -c "import backend.app"``: total e módulos mais caros.
+2. Para cada MODEL_LOAD_MODE (eager, background): sobe um uvicorn em subprocesso
+   e mede o tempo até o primeiro 200 em /api/classify-text e até /api/health
+   reportar o modelo pronto (ou indisponível).
+
+    python benchmarks/bench_startup.py --modes eager background
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import time
+
+from _common import ROOT, free_port, print_table
+
+
+def import_profile(top: int) -> list:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.app"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({"module": name.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def get(port: int, method: str, path: str, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request(method, path, body=json.dumps(body) if body else None,
+                     headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        return resp.status, json.loads(resp.read() or b"null")
+    finally:
+        conn.close()
+
+
+def measure_mode(mode: str, timeout: float) -> dict:
+    port = free_port()
+    env = {**os.environ, "MODEL_LOAD_MODE": mode}
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    first_response = model_ready = None
+    state = None
+    try:
+        while time.perf_counter() - t0 < timeout:
+            try:
+                if first_response is None:
+                    status, _ = get(port, "POST", "/api/classify-text", {"text": "Poderiam verificar o status?"})
+                    if status == 200:
+                        first_response = time.perf_counter() - t0
+                _, health = get(port, "GET", "/api/health")
+                state = health.get("model_state")
+                if state in ("ready", "unavailable", "failed", "disabled"):
+                    model_ready = time.perf_counter() - t0
+                    break
+            except (ConnectionError, OSError):
+                pass
+            time.sleep(0.02)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return {"mode": mode, "first_response_s": first_response, "model_settled_s": model_ready, "model_state": state}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--modes", nargs="+", default=["eager", "background"])
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--timeout", type=float, default=300)
+    args = ap.parse_args()
+
+    profile = import_profile(args.top)
+    print("import backend.app (mais caros, cumulativo):")
+    print_table(profile, ["module", "self_ms", "cumulative_ms"])
+    print()
+    print_table([measure_mode(m, args.timeout) for m in args.modes],
+                ["mode", "first_response_s", "model_settled_s", "model_state"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+/classify-stream (NDJSON numa conexão) contra um POST /classify-text por e-mail.
+
+Sobe a API num uvicorn local com um pipeline stub que custa ``--infer-ms``
+por chamada mais ``--per-text-ms`` por texto (o lote amortiza a parte
+fixa, como no forward do RoBERTa) e classifica ``--n`` e-mails:
+
+- requests: ``--concurrency`` conexões keep-alive, um POST por e-mail;
+- stream: uma conexão, corpo chunked escrito por uma thread enquanto outra
+  lê os resultados; latência por registro = envio da linha → resultado.
+
+Com ``--slow-reader-ms`` o leitor do stream dorme entre resultados. Os
+registros em andamento no servidor não passam de STREAM_WINDOW
+(``peak_pending`` do /stats); o excesso fica nos buffers de socket do kernel
+até o escritor bloquear (``max_ahead`` = maior distância entre enviados e
+recebidos vista pelo cliente, que inclui esses buffers).
+
+    python benchmarks/bench_stream.py --n 2000
+    python benchmarks/bench_stream.py --n 300 --slow-reader-ms 20
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("DISABLE_MODEL", "1")
+os.environ.setdefault("RESULT_CACHE", "off")
+
+from _common import corpus, free_port, print_table  # noqa: E402
+
+import uvicorn  # noqa: E402
+
+from backend import app as app_module  # noqa: E402
+
+
+def stub_pipeline(infer_ms: float, per_text_ms: float):
+    def run(texts, **kwargs):
+        time.sleep((infer_ms + per_text_ms * len(texts)) / 1000)
+        return [{"label": "neutral", "score": 0.6} for _ in texts]
+    return run
+
+
+def pct(values: list, p: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float("nan")
+
+
+def run_requests(port: int, texts: list, concurrency: int) -> dict:
+    local = threading.local()
+
+    def one(text):
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = local.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        t0 = time.perf_counter()
+        conn.request("POST", "/api/classify-text", body=json.dumps({"text": text}),
+                     headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status, (time.perf_counter() - t0) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        out = list(pool.map(one, texts))
+    elapsed = time.perf_counter() - started
+    lat = sorted(ms for status, ms in out if status == 200)
+    return {"mode": f"requests x{concurrency}", "ok": len(lat), "emails_per_sec": len(texts) / elapsed,
+            "p50_ms": pct(lat, 0.5), "p99_ms": pct(lat, 0.99), "max_ahead": None}
+
+
+def _read_chunked(f):
+    """Corpo chunked da resposta HTTP/1.1, pedaço a pedaço."""
+    while True:
+        size = int(f.readline().split(b";")[0], 16)
+        if size == 0:
+            f.readline()
+            return
+        yield f.read(size)
+        f.readline()
+
+
+def run_stream(port: int, texts: list, slow_reader_ms: float = 0.0, ordered: bool = False) -> dict:
+    sock = socket.create_connection(("127.0.0.1", port))
+    path = "/api/classify-stream" + ("?ordered=true" if ordered else "")
+    sock.sendall(f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/x-ndjson\r\n"
+                 "Transfer-Encoding: chunked\r\n\r\n".encode())
+    sent_at = {}
+    state = {"sent": 0, "received": 0, "max_ahead": 0}
+
+    def writer():
+        for i, text in enumerate(texts):
+            line = (json.dumps({"id": i, "text": text}, ensure_ascii=False) + "\n").encode("utf-8")
+            sent_at[i] = time.perf_counter()
+            sock.sendall(b"%x\r\n%s\r\n" % (len(line), line))
+            state["sent"] += 1
+            state["max_ahead"] = max(state["max_ahead"], state["sent"] - state["received"])
+        sock.sendall(b"0\r\n\r\n")
+
+    started = time.perf_counter()
+    w = threading.Thread(target=writer, daemon=True)
+    w.start()
+    f = sock.makefile("rb")
+    status = f.readline()
+    while f.readline() not in (b"\r\n", b""):
+        pass
+    lat, errors, buf = [], 0, b""
+    for chunk in _read_chunked(f):
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            record = json.loads(line)
+            state["received"] += 1
+            if "error" in record:
+                errors += 1
+            else:
+                lat.append((time.perf_counter() - sent_at[record["id"]]) * 1000)
+            if slow_reader_ms:
+                time.sleep(slow_reader_ms / 1000)
+    elapsed = time.perf_counter() - started
+    w.join()
+    sock.close()
+    lat.sort()
+    mode = "stream" + (" ordered" if ordered else "") + (f" (leitor {slow_reader_ms:g} ms)" if slow_reader_ms else "")
+    assert status.startswith(b"HTTP/1.1 200"), status
+    return {"mode": mode, "ok": len(lat), "errors": errors, "emails_per_sec": len(texts) / elapsed,
+            "p50_ms": pct(lat, 0.5), "p99_ms": pct(lat, 0.99), "max_ahead": state["max_ahead"]}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=1000)
+    ap.add_argument("--size", type=int, default=600, help="caracteres por e-mail")
+    ap.add_argument("--infer-ms", type=float, default=10)
+    ap.add_argument("--per-text-ms", type=float, default=1)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    ap.add_argument("--slow-reader-ms", type=float, default=0.0)
+    args = ap.parse_args()
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    app_module.classifier.classifier_pipeline = stub_pipeline(args.infer_ms, args.per_text_ms)
+    texts = corpus(args.n, args.size, seed=1)
+
+    rows = [run_requests(port, texts, c) for c in args.concurrency]
+    rows.append(run_stream(port, texts))
+    rows.append(run_stream(port, texts, ordered=True))
+    if args.slow_reader_ms:
+        rows.append(run_stream(port, texts, slow_reader_ms=args.slow_reader_ms))
+    server.should_exit = True
+
+    print(f"{args.n} e-mails de ~{args.size} caracteres; stub {args.infer_ms} ms + {args.per_text_ms} ms/texto; "
+          f"STREAM_WINDOW={app_module.streams.window}")
+    print_table(rows, ["mode", "ok", "errors", "emails_per_sec", "p50_ms", "p99_ms", "max_ahead"])
+    print(f"\nstreams: {app_module.streams.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Pico de memória (tracemalloc) por requisição de upload em /classify-file.
+
+Mede uploads de ~4 MB (.txt e .pdf) passando pelo handler inteiro e a recusa
+de um arquivo acima do limite, comparando com a leitura antiga
+(``await file.read()`` do corpo inteiro antes de checar o tamanho).
+
+    python benchmarks/bench_upload_memory.py
+"""
+import asyncio
+import os
+import tempfile
+import tracemalloc
+
+os.environ.setdefault("DISABLE_MODEL", "1")
+os.environ.setdefault("RESULT_CACHE", "off")
+os.environ.setdefault("EXTRACT_CACHE", "off")  # o mesmo arquivo sobe várias vezes
+
+from _common import corpus, make_pdf, print_table  # noqa: E402
+
+from fastapi import HTTPException, UploadFile  # noqa: E402
+
+from backend import app as app_module  # noqa: E402
+from backend.utils import extract_text_from_file, preprocess_text  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def upload(data: bytes, filename: str, with_size: bool = True) -> UploadFile:
+    # como o Starlette: spool em memória até 1 MB, depois arquivo temporário
+    spool = tempfile.SpooledTemporaryFile(max_size=MB)
+    spool.write(data)
+    spool.seek(0)
+    return UploadFile(spool, size=len(data) if with_size else None, filename=filename)
+
+
+async def legacy_read(file: UploadFile):
+    content = await file.read()
+    if len(content) > 4 * MB:
+        raise HTTPException(status_code=413, detail="Arquivo muito grande (máx 4 MB)")
+    return content
+
+
+async def legacy_classify_file(file: UploadFile):
+    """Fluxo anterior: corpo inteiro, extração, preprocess e classificação normalizando cada um."""
+    content = await legacy_read(file)
+    text = extract_text_from_file(content, file.filename)
+    processed = preprocess_text(text)
+    return await app_module.classifier.classify_email(processed_text=processed, original_text=text)
+
+
+async def measure(handler, file: UploadFile) -> dict:
+    """Pico alocado por ``handler(file)`` (o upload já está no spool, fora da medição)."""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    status = 200
+    try:
+        await handler(file)
+    except HTTPException as e:
+        status = e.status_code
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return {"status": status, "peak_mb": peak / MB}
+
+
+async def main():
+    text = " ".join(corpus(1, 4 * MB - 4096))
+    txt = text.encode("utf-8")[: 4 * MB - 1024]
+    pdf = make_pdf(corpus(1050, 3400))
+    assert len(pdf) <= 4 * MB, len(pdf)
+    oversize = b"x" * (16 * MB)
+
+    rows = []
+    for name, data, fn in (("4 MB .txt", txt, "mail.txt"), (f"{len(pdf) / MB:.1f} MB .pdf", pdf, "mail.pdf")):
+        r = await measure(legacy_classify_file, upload(data, fn))
+        rows.append({"case": name, "path": "legacy handler", **r})
+        r = await measure(app_module.classify_file, upload(data, fn))
+        rows.append({"case": name, "path": "classify-file", **r})
+
+    for with_size in (True, False):
+        label = "16 MB (size known)" if with_size else "16 MB (no size)"
+        r = await measure(legacy_read, upload(oversize, "big.txt", with_size))
+        rows.append({"case": label, "path": "legacy read", **r})
+        r = await measure(lambda f: app_module._read_upload(f, "too big"), upload(oversize, "big.txt", with_size))
+        rows.append({"case": label, "path": "chunked read", **r})
+
+    print_table(rows, ["case", "path", "status", "peak_mb"])
+    app_module.classifier.executor.shutdown()
+    app_module.extract_pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+"""
+Regressão da análise de texto única (TextAnalysis) contra as funções antigas
+(um re.search por padrão, texto re-normalizado a cada chamada).
+
+Compara is_greeting_no_action, detect_intent e suggest_response nos exemplos do
+README e num corpus gerado com os gatilhos de intenção/saudação/ação, confere os
+campos (chamado, NF) extraídos de SLOT_CASES e mede o custo de classificar a
+sugestão pelos dois caminhos. Sai com erro se divergir.
+
+    python benchmarks/check_text_analysis.py --n 20000
+"""
+import argparse
+import random
+import re
+import sys
+
+from _common import README_EXAMPLES, corpus, print_table, timeit
+
+from backend.utils import (
+    ACTION_TRIGGERS,
+    GREETINGS_PATTERNS,
+    INTENT_PATTERNS,
+    analyze_text,
+    detect_intent,
+    is_greeting_no_action,
+    suggest_response,
+)
+
+
+def legacy_is_greeting_no_action(text: str) -> bool:
+    t = re.sub(r"\s+", " ", text.lower())
+    if "?" in t:
+        return False
+    if any(re.search(p, t) for p in ACTION_TRIGGERS):
+        return False
+    return any(re.search(p, t) for p in GREETINGS_PATTERNS)
+
+
+def legacy_detect_intent(text: str) -> str:
+    t = re.sub(r"\s+", " ", text.lower())
+    for name, pat in INTENT_PATTERNS:
+        if re.search(pat, t):
+            return name
+    return "outro"
+
+
+# Termos que disparam cada padrão (com variações de acento/maiúsculas)
+TRIGGER_TERMS = [
+    "status", "andamento", "situação", "situacao", "progresso", "login", "acesso", "403", "senha",
+    "bloqueio", "fatura", "NF", "nota fiscal", "boleto", "pagamento", "cobrança", "vencida",
+    "vencimento", "anexo", "segue em anexo", "seguem em anexo", "arquivos", "documento", "prazo",
+    "deadline", "entrega", "quando", "data prevista", "previsão", "API", "endpoint", "payload",
+    "integração", "contrato", "assinaturas", "pendente", "validar", "reabrir", "reabertura",
+    "voltou a ocorrer", "persiste", "persistiu", "cadastro", "atualização cadastral", "auditoria",
+    "acesso temporário", "perfil leitura", "divergência", "inconsistência", "dashboard", "relatório",
+    "previsão de pagamento", "financeiro", "erro", "chamado", "ticket", "solicitação", "verificar",
+    "poderiam", "enviar", "anexei", "seguem", "dúvida", "duvida", "atualizar",
+    "boas festas", "feliz natal", "feliz ano novo", "parabéns", "parabens", "muito obrigada",
+    "obrigado", "agradeço", "agradecemos", "abraço", "abraços",
+    # quase-acertos que não devem casar por causa do \b
+    "statusX", "apis", "nfe", "reabrirá", "anexos", "obrigados",
+]
+# Texto -> campos esperados em TextAnalysis.slots
+SLOT_CASES = [
+    ("Poderiam verificar o chamado #48291?", {"ticket": "48291"}),
+    ("Segue a fatura 12345 com vencimento amanhã.", {"invoice": "12345"}),
+    ("NF-e nº 000123 e protocolo 98765", {"invoice": "000123", "ticket": "98765"}),
+    ("Abrimos o protocolo 119876543 ontem.", {"ticket": "119876543"}),
+    ("Referente ao chamado: 48291, segue o log.", {"ticket": "48291"}),
+    ("Nota fiscal nº: 7788 e ticket: #5521", {"invoice": "7788", "ticket": "5521"}),
+    ("Fatura: 2024/03 em aberto.", {}),
+    # datas, competências e telefones não são NF nem chamado
+    ("Segue a fatura 2024/03 para conferência.", {}),
+    ("Segue a fatura 2024 do contrato.", {}),
+    ("Fatura 03/2024 em anexo.", {}),
+    ("Me liga no #119876543", {}),
+    ("Chamado 123-4567 é o telefone do suporte.", {}),
+]
+FILLER = "olá equipe bom dia tudo certo por aqui ficamos no aguardo atenciosamente".split()
+
+
+def trigger_corpus(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        words = [rng.choice(TRIGGER_TERMS) for _ in range(rng.randint(0, 4))]
+        words += [rng.choice(FILLER) for _ in range(rng.randint(1, 12))]
+        rng.shuffle(words)
+        sep = rng.choice([" ", "  ", "\n", "\t", ", "])
+        text = sep.join(words) + rng.choice(["", ".", "!", "?", " ok"])
+        texts.append(text.upper() if rng.random() < 0.1 else text)
+    return texts
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20000)
+    args = ap.parse_args()
+
+    texts = [t for t, _ in README_EXAMPLES] + trigger_corpus(args.n) + corpus(200, 2000)
+    mismatches = 0
+    for text in texts:
+        a = analyze_text(text)
+        expected_greeting = legacy_is_greeting_no_action(text)
+        expected_intent = legacy_detect_intent(text)
+        got = (a.greeting_no_action, a.intent, is_greeting_no_action(text), detect_intent(text))
+        if got != (expected_greeting, expected_intent, expected_greeting, expected_intent):
+            mismatches += 1
+            print(f"DIVERGE: {text!r}: {got} != {(expected_greeting, expected_intent)}")
+        for category in ("Produtivo", "Improdutivo"):
+            if suggest_response(category, text) != suggest_response(category, text, a):
+                mismatches += 1
+    for text, expected in SLOT_CASES:
+        if analyze_text(text).slots != expected:
+            mismatches += 1
+            print(f"CAMPOS: {text!r}: {analyze_text(text).slots} != {expected}")
+    if mismatches:
+        print(f"{mismatches} divergências em {len(texts)} textos")
+        sys.exit(1)
+    print(f"OK: {len(texts)} textos idênticos (saudação, intenção e sugestão)\n")
+
+    sample = texts[: min(len(texts), 5000)]
+
+    def legacy(text):
+        legacy_is_greeting_no_action(text)
+        legacy_is_greeting_no_action(text)  # suggest_response repetia a checagem
+        legacy_detect_intent(text)
+
+    def single_pass(text):
+        a = analyze_text(text)
+        a.greeting_no_action
+        a.intent
+
+    print_table(
+        [{"impl": "legacy", **timeit(legacy, sample)}, {"impl": "TextAnalysis", **timeit(single_pass, sample)}],
+        ["impl", "ops_per_sec", "p50_ms", "p99_ms"],
+    )
+
+
+if __name__ == "__main__":
+    main()
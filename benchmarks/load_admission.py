@@ -0,0 +1,146 @@
+"""
+Teste de carga da admissão (backend/admission.py): um cliente inunda a API
+enquanto outros mandam poucas requisições por segundo.
+
+Sobe a API num uvicorn local com um pipeline stub lento (``--infer-ms``) e
+roda a mesma carga duas vezes: sem limites (como antes da admissão) e com
+RATE_LIMIT_RPS por cliente. O inundador usa ``--flood-threads`` conexões com
+a mesma X-API-Key e não respeita o Retry-After; cada cliente bem-comportado
+tem a própria chave (todas em API_KEYS) e manda ``--polite-rps`` req/s. No
+último cenário o inundador troca de chave a cada requisição (chaves fora de
+API_KEYS): elas não ganham balde próprio e caem no do IP dele. Mostra p50/p99
+e taxa de sucesso dos bem-comportados e os códigos recebidos pelo inundador.
+
+    python benchmarks/load_admission.py --seconds 5 --rate 5
+"""
+import argparse
+import http.client
+import json
+import os
+import threading
+import time
+
+os.environ.setdefault("DISABLE_MODEL", "1")
+os.environ.setdefault("RESULT_CACHE", "off")  # textos repetidos não podem virar hits de cache
+
+from _common import free_port, print_table  # noqa: E402
+
+import uvicorn  # noqa: E402
+
+from backend import app as app_module  # noqa: E402
+
+TEXT = "Bom dia, gostaria de saber como ficou aquele assunto da semana passada."
+
+
+def slow_pipeline(infer_ms: float):
+    def run(texts, **kwargs):
+        time.sleep(infer_ms / 1000 * len(texts))
+        return [{"label": "negative", "score": 0.6} for _ in texts]
+    return run
+
+
+def post(conn, key: str, n: int):
+    t0 = time.perf_counter()
+    conn.request("POST", "/api/classify-text", body=json.dumps({"text": f"{TEXT} ({key}-{n})"}),
+                 headers={"Content-Type": "application/json", "X-API-Key": key})
+    resp = conn.getresponse()
+    resp.read()
+    return resp.status, (time.perf_counter() - t0) * 1000
+
+
+def pct(values: list, p: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float("nan")
+
+
+def run_load(port: int, args, flood: bool, rotate: bool = False) -> dict:
+    stop = threading.Event()
+    lock = threading.Lock()
+    polite_lat, polite_codes, flood_codes = [], {}, {}
+
+    def flooder(k):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        n = 0
+        while not stop.is_set():
+            n += 1
+            key = f"flood-{k}-{n}" if rotate else "flood"
+            status, _ = post(conn, key, k * 1_000_000 + n)
+            with lock:
+                flood_codes[status] = flood_codes.get(status, 0) + 1
+
+    def polite(k):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        interval = 1.0 / args.polite_rps
+        n = 0
+        while not stop.is_set():
+            n += 1
+            started = time.perf_counter()
+            status, ms = post(conn, f"client-{k}", n)
+            with lock:
+                polite_codes[status] = polite_codes.get(status, 0) + 1
+                if status == 200:
+                    polite_lat.append(ms)
+            time.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+    threads = [threading.Thread(target=polite, args=(k,), daemon=True) for k in range(args.polite)]
+    if flood:
+        threads += [threading.Thread(target=flooder, args=(k,), daemon=True) for k in range(args.flood_threads)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    polite_lat.sort()
+    sent = sum(polite_codes.values())
+    return {
+        "polite_p50_ms": pct(polite_lat, 0.5),
+        "polite_p99_ms": pct(polite_lat, 0.99),
+        "polite_ok": polite_codes.get(200, 0) / sent if sent else float("nan"),
+        "polite_codes": dict(sorted(polite_codes.items())),
+        "flood_codes": dict(sorted(flood_codes.items())),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--infer-ms", type=float, default=20)
+    ap.add_argument("--flood-threads", type=int, default=32)
+    ap.add_argument("--polite", type=int, default=4, help="clientes bem-comportados")
+    ap.add_argument("--polite-rps", type=float, default=2)
+    ap.add_argument("--rate", type=float, default=5, help="RATE_LIMIT_RPS por cliente no cenário limitado")
+    ap.add_argument("--max-inflight", type=int, default=16)
+    args = ap.parse_args()
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    app_module.classifier.classifier_pipeline = slow_pipeline(args.infer_ms)
+    admission = app_module.admission  # o middleware lê a configuração a cada requisição
+    admission.api_keys = frozenset(["flood"] + [f"client-{k}" for k in range(args.polite)])
+
+    rows = []
+    for name, flood, rotate, rate, inflight in (
+        ("sem carga", False, False, 0.0, 10 ** 6),
+        ("inundação, sem limites", True, False, 0.0, 10 ** 6),
+        ("inundação, com admissão", True, False, args.rate, args.max_inflight),
+        ("inundação, chaves rotativas", True, True, args.rate, args.max_inflight),
+    ):
+        admission.rate, admission.burst, admission.max_in_flight = rate, max(1.0, rate * 2), inflight
+        admission._buckets.clear()
+        rows.append({"scenario": name, **run_load(port, args, flood, rotate)})
+        time.sleep(0.5)  # esvazia o pool entre os cenários
+    server.should_exit = True
+
+    print(f"{args.polite} clientes a {args.polite_rps} req/s; inundador com {args.flood_threads} conexões; "
+          f"infer {args.infer_ms} ms")
+    print_table(rows, ["scenario", "polite_p50_ms", "polite_p99_ms", "polite_ok", "polite_codes", "flood_codes"])
+    print(f"\nadmissão: {admission.stats()}")
+    print(f"baldes ao fim (chaves rotativas não abrem baldes novos): {sorted(admission._buckets)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Teste de carga: latência de /health enquanto /classify-text está saturado.
+
+Sobe a API num uvicorn local com um pipeline stub lento (simula o forward do
+RoBERTa bloqueando por ``--infer-ms``), dispara ``--clients`` threads contra
+/api/classify-text e mede p50/p99 de /api/health antes e durante a carga.
+
+    python benchmarks/load_health.py --clients 32 --seconds 5
+"""
+import argparse
+import http.client
+import json
+import os
+import threading
+import time
+
+os.environ.setdefault("DISABLE_MODEL", "1")
+os.environ.setdefault("RESULT_CACHE", "off")  # textos repetidos não podem virar hits de cache
+
+from _common import free_port, print_table  # noqa: E402
+
+import uvicorn  # noqa: E402
+
+from backend import app as app_module  # noqa: E402
+
+TEXT = "Bom dia, gostaria de saber como ficou aquele assunto da semana passada."
+
+
+def slow_pipeline(infer_ms: float):
+    def run(texts, **kwargs):
+        time.sleep(infer_ms / 1000)  # forward real também libera o GIL em boa parte
+        return [{"label": "neutral", "score": 0.6} for _ in texts]
+    return run
+
+
+def request(port: int, method: str, path: str, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    t0 = time.perf_counter()
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    resp = conn.getresponse()
+    resp.read()
+    conn.close()
+    return resp.status, (time.perf_counter() - t0) * 1000
+
+
+def probe_health(port: int, seconds: float) -> list:
+    lat = []
+    end = time.time() + seconds
+    while time.time() < end:
+        lat.append(request(port, "GET", "/api/health")[1])
+        time.sleep(0.01)
+    return sorted(lat)
+
+
+def pct(values: list, p: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float("nan")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=32)
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--infer-ms", type=float, default=200)
+    args = ap.parse_args()
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    # depois do startup (que roda initialize com DISABLE_MODEL=1)
+    app_module.classifier.classifier_pipeline = slow_pipeline(args.infer_ms)
+
+    idle = probe_health(port, min(2.0, args.seconds))
+
+    codes = {}
+    stop = threading.Event()
+
+    def flood():
+        n = 0
+        while not stop.is_set():
+            n += 1
+            status, _ = request(port, "POST", "/api/classify-text", {"text": f"{TEXT} ({n})"})
+            codes[status] = codes.get(status, 0) + 1
+            if status == 503:
+                time.sleep(0.05)  # cliente educado: respeita o Retry-After (encurtado)
+
+    workers = [threading.Thread(target=flood, daemon=True) for _ in range(args.clients)]
+    for w in workers:
+        w.start()
+    time.sleep(0.5)
+    loaded = probe_health(port, args.seconds)
+    stop.set()
+    for w in workers:
+        w.join()
+    server.should_exit = True
+
+    print_table(
+        [
+            {"phase": "idle", "n": len(idle), "p50_ms": pct(idle, 0.5), "p99_ms": pct(idle, 0.99)},
+            {"phase": "saturated", "n": len(loaded), "p50_ms": pct(loaded, 0.5), "p99_ms": pct(loaded, 0.99)},
+        ],
+        ["phase", "n", "p50_ms", "p99_ms"],
+    )
+    print(f"\n/classify-text status codes: {dict(sorted(codes.items()))}")
+    print(f"inference pool: {app_module.classifier.executor.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Suíte de regressão do pipeline de classificação: velocidade, alocações e acurácia.
+
+Roda preprocess_text, calculate_keyword_score, extract_text_from_file e o
+caminho completo de classify_email (sem modelo, como DISABLE_MODEL=1, e com o
+modelo stub de _common) sobre corpora gerados em pt, en e misturados, de
+vários tamanhos. Para cada caso relata ops/s, p50/p99 e o pico de memória
+alocada por operação (tracemalloc, numa passada separada da cronometrada).
+A acurácia usa o corpus rotulado benchmarks/data/labeled_emails.jsonl.
+
+Os números são comparados com benchmarks/baselines.json e a suíte sai com
+código 1 se houver regressão:
+  - acurácia: qualquer queda (o resultado é determinístico);
+  - alocação: pico por operação acima de ``--alloc-tolerance``;
+  - ops/s: queda acima de ``--tolerance`` (só faz sentido na mesma máquina;
+    ``--no-timing`` pula essa comparação, p.ex. em CI).
+
+    python benchmarks/regression.py                  # compara com o baseline
+    python benchmarks/regression.py --update         # regrava o baseline
+    python benchmarks/regression.py --only keywords --quick
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tracemalloc
+from collections import Counter
+
+os.environ.setdefault("RESULT_CACHE", "off")
+os.environ.setdefault("MICROBATCH", "0")
+os.environ.setdefault("METRICS_ENABLED", "0")
+os.environ.setdefault("EXTRACT_CACHE", "off")  # os casos extract/ repetem o mesmo arquivo
+
+from _common import ROOT, corpus, make_pdf, print_table, stub_pipeline, timeit  # noqa: E402
+
+from backend.email_classifier import EmailClassifier  # noqa: E402
+from backend.utils import (  # noqa: E402
+    analyze_text,
+    calculate_keyword_score,
+    extract_text_from_file,
+    get_nlp_resources,
+    preprocess_text,
+)
+
+FIXTURE = ROOT / "benchmarks" / "data" / "labeled_emails.jsonl"
+BASELINE = ROOT / "benchmarks" / "baselines.json"
+LANGS = ("pt", "en", "mix")
+SIZES = (200, 2000, 20000)
+CATEGORIES = ("Produtivo", "Improdutivo")
+
+
+def _classifier(mode: str) -> EmailClassifier:
+    clf = EmailClassifier()
+    clf.classifier_pipeline = stub_pipeline() if mode == "stub" else None
+    return clf
+
+
+def build_cases(quick: bool):
+    """(nome, função, itens) de cada caso; ``quick`` usa corpora menores."""
+    n = 10 if quick else 40
+    cases = []
+    for lang in LANGS:
+        for size in SIZES:
+            texts = corpus(max(4, n * 200 // size), size, seed=7, lang=lang)
+            cases.append((f"preprocess/{lang}/{size}", preprocess_text, texts))
+            cases.append((f"keywords/{lang}/{size}", calculate_keyword_score, texts))
+
+    text = " ".join(corpus(1, 20000, seed=3, lang="mix"))
+    files = {
+        "txt_utf8": (text.encode("utf-8"), "email.txt"),
+        "txt_latin1": (text.encode("latin-1", errors="replace"), "email.txt"),
+        "pdf_1p": (make_pdf([text[:3000]]), "email.pdf"),
+        "pdf_20p": (make_pdf([text[i:i + 3000] for i in range(0, 60000, 3000)]), "email.pdf"),
+    }
+    for name, item in files.items():
+        cases.append((f"extract/{name}", lambda it: extract_text_from_file(*it), [item] * max(2, n // 4)))
+
+    loop = asyncio.new_event_loop()
+    for mode in ("nomodel", "stub"):
+        clf = _classifier(mode)
+
+        def classify(text, clf=clf):
+            analysis = analyze_text(text)
+            return loop.run_until_complete(clf.classify_email(preprocess_text(text, analysis), text, analysis))
+
+        for lang in LANGS:
+            cases.append((f"classify/{mode}/{lang}/2000", classify, corpus(n, 2000, seed=11, lang=lang)))
+    return cases
+
+
+def measure(fn, items, repeat: int) -> dict:
+    for it in items:  # aquece caches (stemming, regex, imports adiados)
+        fn(it)
+    row = timeit(fn, items, repeat)
+
+    tracemalloc.start()
+    peaks = []
+    for it in items:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        fn(it)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    row["peak_kb"] = sum(peaks) / len(peaks) / 1024
+    return row
+
+
+def accuracy(mode: str) -> dict:
+    rows = [json.loads(line) for line in FIXTURE.read_text(encoding="utf-8").splitlines() if line.strip()]
+    clf = _classifier(mode)
+
+    async def run():
+        out = []
+        for row in rows:
+            analysis = analyze_text(row["text"])
+            out.append(await clf.classify_email(preprocess_text(row["text"], analysis), row["text"], analysis))
+        return out
+
+    results = asyncio.run(run())
+    clf.executor.shutdown()
+    pairs = Counter((row["label"], r["category"]) for row, r in zip(rows, results))
+    out = {"accuracy": sum(pairs[(c, c)] for c in CATEGORIES) / len(rows)}
+    for c in CATEGORIES:
+        predicted = sum(v for (_, p), v in pairs.items() if p == c)
+        actual = sum(v for (a, _), v in pairs.items() if a == c)
+        out[f"precision_{c}"] = pairs[(c, c)] / predicted if predicted else 0.0
+        out[f"recall_{c}"] = pairs[(c, c)] / actual if actual else 0.0
+    return out
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "nltk_data": get_nlp_resources()[1] is not None,
+    }
+
+
+def compare(current: dict, baseline: dict, args) -> list:
+    """Lista de regressões (texto) entre a execução atual e o baseline."""
+    problems = []
+    for name, acc in current["accuracy"].items():
+        old = baseline.get("accuracy", {}).get(name)
+        if old and acc["accuracy"] < old["accuracy"] - 1e-9:
+            problems.append(f"acurácia {name}: {old['accuracy']:.3f} → {acc['accuracy']:.3f}")
+    for name, row in current["cases"].items():
+        old = baseline.get("cases", {}).get(name)
+        if not old:
+            continue
+        if row["peak_kb"] > old["peak_kb"] * (1 + args.alloc_tolerance) + 1:
+            problems.append(f"alocação {name}: {old['peak_kb']:.1f} KB → {row['peak_kb']:.1f} KB por op")
+        if not args.no_timing and row["ops_per_sec"] < old["ops_per_sec"] * (1 - args.tolerance):
+            problems.append(f"velocidade {name}: {old['ops_per_sec']:.0f} → {row['ops_per_sec']:.0f} ops/s")
+    return problems
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--update", action="store_true", help="regrava benchmarks/baselines.json")
+    ap.add_argument("--only", help="roda só os casos cujo nome começa com este prefixo")
+    ap.add_argument("--quick", action="store_true", help="corpora menores (não use com --update)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--tolerance", type=float, default=0.30, help="queda de ops/s aceita")
+    ap.add_argument("--alloc-tolerance", type=float, default=0.20, help="aumento de pico aceito")
+    ap.add_argument("--no-timing", action="store_true", help="não compara ops/s (outra máquina, CI)")
+    args = ap.parse_args()
+
+    current = {"environment": environment(), "cases": {}, "accuracy": {}}
+    rows = []
+    for name, fn, items in build_cases(args.quick):
+        if args.only and not name.startswith(args.only):
+            continue
+        row = measure(fn, items, args.repeat)
+        current["cases"][name] = {k: round(v, 4) for k, v in row.items()}
+        rows.append({"case": name, **row})
+    if rows:
+        print_table(rows, ["case", "ops_per_sec", "p50_ms", "p99_ms", "peak_kb"])
+
+    if not args.only or args.only.startswith("accuracy"):
+        acc_rows = []
+        for mode in ("nomodel", "stub"):
+            acc = accuracy(mode)
+            current["accuracy"][mode] = {k: round(v, 4) for k, v in acc.items()}
+            acc_rows.append({"model": mode, **acc})
+        print()
+        print_table(acc_rows, ["model", "accuracy"] + [f"{m}_{c}" for c in CATEGORIES for m in ("precision", "recall")])
+
+    if args.update:
+        if args.only or args.quick:
+            print("\n--update precisa da suíte completa (sem --only/--quick)")
+            sys.exit(2)
+        BASELINE.write_text(json.dumps(current, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\nbaseline gravado em {BASELINE.relative_to(ROOT)}")
+        return
+
+    if not BASELINE.exists():
+        print("\nsem baseline; rode com --update para criar")
+        sys.exit(2)
+    baseline = json.loads(BASELINE.read_text(encoding="utf-8"))
+    if baseline.get("environment") != current["environment"]:
+        print(f"\naviso: baseline gravado em outro ambiente ({baseline.get('environment')}); "
+              "compare ops/s com cautela ou use --no-timing")
+    problems = compare(current, baseline, args)
+    if problems:
+        print("\nREGRESSÕES:")
+        for p in problems:
+            print(f"  - {p}")
+        sys.exit(1)
+    print("\nsem regressões em relação ao baseline")
+
+
+if __name__ == "__main__":
+    main()